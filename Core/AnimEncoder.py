@@ -0,0 +1,289 @@
+import math
+import struct
+import zlib
+from io import BytesIO
+from pathlib import Path
+from typing import Iterator, Tuple, Optional, Dict, Any, BinaryIO
+
+import numpy as np # Ships with opencv-python
+from PIL import Image, GifImagePlugin
+
+# Optional dependency: video sources need it (pip install opencv-python)
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# ==============================================================================
+#   STREAMING EXPORT SETTINGS
+# ==============================================================================
+# Animated exports (clipboard GIFs) are written one frame at a time: a frame is decoded,
+# scaled, encoded and appended to the open file before the next one is read, so memory
+# stays at about one frame however long the clip is. Pillow's save_all keeps every frame.
+ANIMATED_FORMATS = {"GIF": ".gif", "WebP": ".webp", "APNG": ".png"}
+VIDEO_SOURCES = (".webm", ".mp4", ".mkv")
+MAX_EXPORT_FRAMES = 200        # Longer clips are decimated evenly (timing is kept)
+MAX_EXPORT_DIM = 1024          # Longest side of an unscaled ("Original") export
+MIN_FRAME_DURATION = 20        # ms; shorter (or missing) delays play as 100 ms in browsers
+PALETTE_SAMPLE_FRAMES = 8      # Frames spread over the clip that the shared GIF palette is built from
+PALETTE_SAMPLE_DIM = 96        # Each sample is shrunk to this first (colours survive, pixel count doesn't)
+ALPHA_CUTOFF = 128             # GIF transparency is on/off
+GIF_TRANSPARENT = 255          # Palette index reserved for transparent pixels
+WEBP_EXPORT = {"quality": 85, "method": 4}
+
+# ==============================================================================
+#   FRAME SOURCES
+# ==============================================================================
+
+def _scaled(size: Tuple[int, int], dim: Optional[int]) -> Tuple[int, int]:
+    if not dim: return size
+    ratio = min(dim / size[0], dim / size[1])
+    return max(1, int(size[0] * ratio)), max(1, int(size[1] * ratio))
+
+def _export_dim(size: Tuple[int, int], dim: Optional[int]) -> Optional[int]:
+    """Requested size, or the original capped at MAX_EXPORT_DIM."""
+    if dim: return min(dim, MAX_EXPORT_DIM)
+    return MAX_EXPORT_DIM if max(size) > MAX_EXPORT_DIM else None
+
+def _video_rgba(frame) -> Image.Image:
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGRA2RGBA if frame.shape[2] == 4 else cv2.COLOR_BGR2RGBA))
+
+def iter_export_frames(path: str, dim: Optional[int], max_frames: int = MAX_EXPORT_FRAMES) -> Iterator[Tuple[Image.Image, int]]:
+    """
+    Yields (RGBA frame, duration ms) scaled to 'dim', one at a time. Past 'max_frames',
+    every n-th frame is kept and the skipped frames' time is added to it (skipped frames
+    are not converted or scaled; video frames are not even decoded).
+    """
+    held: Optional[Image.Image] = None
+    held_ms = 0
+
+    if path.lower().endswith(VIDEO_SOURCES):
+        if cv2 is None: raise RuntimeError("opencv-python is not installed")
+        cap = cv2.VideoCapture(path)
+        try:
+            if not cap.isOpened(): raise ValueError("Cannot open video")
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            stride = math.ceil(total / max_frames) if total > max_frames else 1
+            frame_ms = max(MIN_FRAME_DURATION, int(round(1000 / (cap.get(cv2.CAP_PROP_FPS) or 30))))
+            size, i = None, 0
+            while total or i < max_frames: # Unknown length: stop at max_frames
+                if i % stride:
+                    if not cap.grab(): break
+                    held_ms += frame_ms
+                    i += 1
+                    continue
+                ret, frame = cap.read()
+                if not ret: break
+                if held is not None: yield held, held_ms
+                img = _video_rgba(frame)
+                size = size or _scaled(img.size, _export_dim(img.size, dim))
+                held, held_ms = (img.resize(size, Image.Resampling.LANCZOS) if size != img.size else img), frame_ms
+                i += 1
+        finally:
+            cap.release()
+    else:
+        with Image.open(path) as img:
+            total = getattr(img, "n_frames", 1)
+            stride = math.ceil(total / max_frames) if total > max_frames else 1
+            size = _scaled(img.size, _export_dim(img.size, dim))
+            for i in range(total):
+                img.seek(i)
+                img.load() # WebP fills in 'duration' when the frame is decoded
+                duration = img.info.get('duration', 100) or 100
+                duration = duration if duration >= MIN_FRAME_DURATION else 100
+                if i % stride:
+                    held_ms += duration
+                    continue
+                if held is not None: yield held, held_ms
+                frame = img.convert("RGBA") # RGBA for a high-quality resize
+                held, held_ms = (frame.resize(size, Image.Resampling.LANCZOS) if size != frame.size else frame), duration
+
+    if held is not None: yield held, held_ms
+
+def _palette_samples(path: str) -> np.ndarray:
+    """Opaque RGB pixels (N x 3) from PALETTE_SAMPLE_FRAMES frames spread over the clip."""
+    samples = []
+
+    def take(img: Image.Image):
+        img = img.convert("RGBA")
+        img.thumbnail((PALETTE_SAMPLE_DIM, PALETTE_SAMPLE_DIM), Image.Resampling.BILINEAR)
+        px = np.asarray(img).reshape(-1, 4)
+        samples.append(px[px[:, 3] >= ALPHA_CUTOFF, :3])
+
+    if path.lower().endswith(VIDEO_SOURCES):
+        cap = cv2.VideoCapture(path)
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            for target in sorted({i * total // PALETTE_SAMPLE_FRAMES for i in range(PALETTE_SAMPLE_FRAMES)}) if total else [0]:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                ret, frame = cap.read()
+                if ret: take(_video_rgba(frame))
+        finally:
+            cap.release()
+    else:
+        with Image.open(path) as img:
+            total = getattr(img, "n_frames", 1)
+            for target in sorted({i * total // PALETTE_SAMPLE_FRAMES for i in range(PALETTE_SAMPLE_FRAMES)}):
+                img.seek(target)
+                take(img)
+
+    return np.concatenate(samples) if samples else np.zeros((0, 3), np.uint8)
+
+def build_gif_palette(path: str) -> bytes:
+    """
+    One 768-byte palette for every frame of the GIF: 255 colours median-cut from the sampled
+    pixels, plus GIF_TRANSPARENT. A shared palette avoids per-frame palettes (which flicker
+    and make each frame carry its own 768-byte table).
+    """
+    pixels = _palette_samples(path)
+    if not len(pixels): pixels = np.zeros((1, 3), np.uint8)
+    sample = Image.fromarray(np.ascontiguousarray(pixels.reshape(1, -1, 3)), "RGB")
+    palette = sample.quantize(GIF_TRANSPARENT, method=Image.Quantize.MEDIANCUT).getpalette()[:GIF_TRANSPARENT * 3]
+    palette += [0] * (GIF_TRANSPARENT * 3 - len(palette))
+    return bytes(palette + palette[:3]) # The transparent slot repeats colour 0 (see _GifWriter.add)
+
+# ==============================================================================
+#   CONTAINER WRITERS (One frame in, appended to the open file)
+# ==============================================================================
+
+class _GifWriter:
+    def __init__(self, fp: BinaryIO, palette: bytes):
+        self.fp = fp
+        self.palette = palette
+        self.map_image = Image.new("P", (1, 1))
+        self.map_image.putpalette(palette)
+        self.started = False
+        self.elapsed_ms = 0
+        self.written_cs = 0
+
+    def add(self, frame: Image.Image, duration: int):
+        if not self.started:
+            # Header + global palette (256 colours) + loop forever
+            self.fp.write(b"GIF89a" + struct.pack("<HHBBB", frame.width, frame.height, 0xF7, 0, 0) + self.palette)
+            self.fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+            self.started = True
+
+        mapped = frame.convert("RGB").quantize(palette=self.map_image, dither=Image.Dither.FLOYDSTEINBERG)
+        idx = np.array(mapped)
+        idx[idx == GIF_TRANSPARENT] = 0 # Same colour; the slot means "transparent" below
+        idx[np.asarray(frame.getchannel("A")) < ALPHA_CUTOFF] = GIF_TRANSPARENT
+        mapped.frombytes(idx.tobytes())
+
+        # GIF delays are centiseconds: round the running total so long clips don't drift
+        self.elapsed_ms += duration
+        delay_cs = max(2, round(self.elapsed_ms / 10) - self.written_cs)
+        self.written_cs += delay_cs
+        for block in GifImagePlugin.getdata(mapped, duration=delay_cs * 10, disposal=2, transparency=GIF_TRANSPARENT):
+            self.fp.write(block)
+
+    def close(self):
+        self.fp.write(b";")
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+def _iter_chunks(data: bytes, start: int) -> Iterator[Tuple[bytes, bytes]]:
+    """(tag, payload) of PNG (big-endian) chunks."""
+    pos = start
+    while pos + 8 <= len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        yield tag, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+class _ApngWriter:
+    """Each frame is encoded as a PNG by Pillow; its IDAT data is re-wrapped as APNG frame data."""
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.seq = 0
+        self.frames = 0
+        self.actl_offset = 0
+
+    def add(self, frame: Image.Image, duration: int):
+        buffer = BytesIO()
+        frame.save(buffer, "PNG", compress_level=6)
+        chunks = list(_iter_chunks(buffer.getvalue(), 8))
+        if not self.frames:
+            self.fp.write(b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", next(d for t, d in chunks if t == b"IHDR")))
+            self.actl_offset = self.fp.tell()
+            self.fp.write(_png_chunk(b"acTL", struct.pack(">II", 0, 0))) # Frame count patched in close()
+
+        # fcTL: full-canvas frame, delay in ms, no disposal, replace (don't blend)
+        self.fp.write(_png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.seq, frame.width, frame.height, 0, 0, duration, 1000, 0, 0)))
+        self.seq += 1
+        for tag, data in chunks:
+            if tag != b"IDAT": continue
+            if not self.frames:
+                self.fp.write(_png_chunk(b"IDAT", data)) # First frame doubles as the static image
+            else:
+                self.fp.write(_png_chunk(b"fdAT", struct.pack(">I", self.seq) + data))
+                self.seq += 1
+        self.frames += 1
+
+    def close(self):
+        self.fp.write(_png_chunk(b"IEND", b""))
+        end = self.fp.tell()
+        self.fp.seek(self.actl_offset)
+        self.fp.write(_png_chunk(b"acTL", struct.pack(">II", self.frames, 0)))
+        self.fp.seek(end)
+
+def _riff_chunk(tag: bytes, data: bytes) -> bytes:
+    return tag + struct.pack("<I", len(data)) + data + (b"\0" if len(data) % 2 else b"")
+
+class _WebpWriter:
+    """Each frame is encoded as a still WebP by Pillow; its bitstream chunks become one ANMF frame."""
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.started = False
+
+    def add(self, frame: Image.Image, duration: int):
+        if not self.started:
+            canvas = struct.pack("<I", frame.width - 1)[:3] + struct.pack("<I", frame.height - 1)[:3]
+            self.fp.write(b"RIFF\0\0\0\0WEBP") # RIFF size patched in close()
+            self.fp.write(_riff_chunk(b"VP8X", bytes([0x12, 0, 0, 0]) + canvas)) # Animation + alpha
+            self.fp.write(_riff_chunk(b"ANIM", struct.pack("<IH", 0, 0)))        # Transparent background, loop forever
+            self.started = True
+
+        buffer = BytesIO()
+        frame.save(buffer, "WEBP", **WEBP_EXPORT)
+        data, pos, bitstream = buffer.getvalue(), 12, b""
+        while pos + 8 <= len(data):
+            tag, length = data[pos:pos + 4], struct.unpack("<I", data[pos + 4:pos + 8])[0]
+            if tag in (b"ALPH", b"VP8 ", b"VP8L"): bitstream += data[pos:pos + 8 + length + (length % 2)]
+            pos += 8 + length + (length % 2)
+
+        header = b"\0\0\0\0\0\0" + struct.pack("<I", frame.width - 1)[:3] + struct.pack("<I", frame.height - 1)[:3]
+        header += struct.pack("<I", min(duration, 0xFFFFFF))[:3] + bytes([0x02]) # Don't blend, no disposal
+        self.fp.write(_riff_chunk(b"ANMF", header + bitstream))
+
+    def close(self):
+        end = self.fp.tell()
+        self.fp.seek(4)
+        self.fp.write(struct.pack("<I", end - 8))
+        self.fp.seek(end)
+
+# ==============================================================================
+#   EXPORT (Picklable, for the process pool)
+# ==============================================================================
+
+def encode_animation(path: str, output: Path, dim: Optional[int] = None, fmt: str = ".gif",
+                     max_frames: int = MAX_EXPORT_FRAMES) -> Dict[str, Any]:
+    """
+    Streams an animated sticker (GIF/WebP/APNG or video) into an animated '.gif', '.webp'
+    or '.png' (APNG) at 'output', scaled to fit 'dim' (None: original, capped at MAX_EXPORT_DIM).
+    GIFs share one palette built from a sample of frames before encoding starts.
+    Returns {"frames", "duration"} (duration in ms).
+    """
+    frames, total_ms = 0, 0
+    with open(output, "wb") as fp:
+        if fmt == ".gif": writer = _GifWriter(fp, build_gif_palette(path))
+        elif fmt == ".png": writer = _ApngWriter(fp)
+        elif fmt == ".webp": writer = _WebpWriter(fp)
+        else: raise ValueError(f"Unsupported animated format: {fmt}")
+
+        for frame, duration in iter_export_frames(path, dim, max_frames):
+            writer.add(frame, duration)
+            frames += 1
+            total_ms += duration
+        if not frames: raise ValueError("No frames to export")
+        writer.close()
+    return {"frames": frames, "duration": total_ms}
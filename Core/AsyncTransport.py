@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable
+
+# Optional dependency: the Threaded engine is used when aiohttp is missing.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from Core.Config import logger, sticker_file_stem
+from Core.Network import RetryPolicy, parse_retry_after
+from Core.Transcode import transcode_sticker, is_raw_format
+
+class AsyncTransport:
+    """
+    The Async Engine.
+
+    Optional asyncio/aiohttp transport for StickerClient.
+    1. One event loop runs on a daemon thread and owns a single pooled ClientSession,
+       so connections are kept alive across requests and across packs.
+       Requests share the client's RetryPolicy (backoff + jitter) and HttpStats.
+    2. Hundreds of getFile/download requests can be in flight without one thread each.
+    3. CPU-bound decode/encode work is handed to the client's process pool (StickerClient.transcoder);
+       a download keeps its network slot until an encode slot is free (backpressure).
+    """
+
+    def __init__(self, client, max_concurrency: int = 64, max_connections: int = 100, max_per_host: int = 32):
+        self.client = client # Reference to StickerClient (URLs + shared format handling)
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_available() -> bool:
+        return aiohttp is not None
+
+    # ==========================================================================
+    #   EVENT LOOP & SESSION
+    # ==========================================================================
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Starts the background event loop on first use."""
+        with self._lock:
+            if self._loop and self._loop.is_running():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            threading.Thread(target=run, daemon=True, name="AsyncTransport").start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def _run(self, coro) -> Any:
+        """Blocks the calling (worker) thread until the coroutine finishes on the loop."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=30,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @staticmethod
+    def _timeout(timeout) -> "aiohttp.ClientTimeout":
+        """Accepts the client's (connect, read) tuples."""
+        connect, read = timeout if isinstance(timeout, tuple) else (None, timeout)
+        return aiohttp.ClientTimeout(total=(connect or 0) + read, sock_connect=connect)
+
+    async def _request(self, url: str, kind: str, params: Optional[Dict[str, Any]], timeout, as_json: bool,
+                       retry_statuses: frozenset = RetryPolicy.RETRY_STATUSES):
+        """
+        GET with retries (same policy as the Threaded engine). Returns (status, body),
+        body being decoded JSON or raw bytes. Raises the last error if every attempt failed.
+        """
+        policy = self.client.http.policy
+        stats = self.client.http.stats
+        session = await self._get_session()
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                async with session.get(url, params=params, timeout=self._timeout(timeout)) as resp:
+                    body = await (resp.json(content_type=None) if as_json else resp.read())
+                    status, headers = resp.status, resp.headers
+                if status not in retry_statuses or attempt >= policy.max_retries:
+                    stats.record(kind, time.monotonic() - start, attempt, status < 400)
+                    return status, body
+                wait = policy.delay(attempt, parse_retry_after(headers, body if as_json else None))
+                reason = f"HTTP {status}"
+
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                if attempt >= policy.max_retries:
+                    stats.record(kind, time.monotonic() - start, attempt, False)
+                    raise
+                wait = policy.delay(attempt)
+                reason = type(e).__name__
+
+            attempt += 1
+            logger.debug(f"Retrying {kind} request in {wait:.2f}s ({reason}, attempt {attempt}/{policy.max_retries})")
+            await asyncio.sleep(wait)
+
+    def close(self):
+        """Closes the pooled session and stops the loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+
+        if loop and loop.is_running():
+            async def shutdown():
+                if self._session and not self._session.closed:
+                    await self._session.close()
+            try:
+                asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+            except Exception as e:
+                logger.warning(f"Async transport shutdown error: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+
+        self._session = None
+
+    # ==========================================================================
+    #   TELEGRAM API INTERACTION
+    # ==========================================================================
+
+    def get_sticker_set(self, clean_name: str) -> Optional[Dict[str, Any]]:
+        """Raw getStickerSet call. Returns the decoded JSON, or None on network errors."""
+        return self._run(self._get_sticker_set(clean_name))
+
+    async def _get_sticker_set(self, clean_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            # 429 is left to StickerClient.get_pack_by_name (shared api_limiter)
+            _, data = await self._request(
+                f"{self.client.base_url}/getStickerSet", "api", {"name": clean_name},
+                self.client.API_TIMEOUT, as_json=True, retry_statuses=RetryPolicy.SERVER_ERRORS
+            )
+            return data
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Network Connection Error: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected API Error (Decoder/Logic): {e}")
+            return None
+
+    def download_pack(self, stickers: List[Dict[str, Any]], base_path: Path, progress_callback: Optional[Callable[[int, int], None]] = None,
+                      on_sticker: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Downloads every sticker concurrently. progress_callback(completed, total) and
+        on_sticker(sticker) as in the Threaded engine.
+        """
+        self._run(self._download_pack(stickers, base_path, progress_callback, on_sticker))
+
+    async def _download_pack(self, stickers: List[Dict[str, Any]], base_path: Path, progress_callback: Optional[Callable[[int, int], None]],
+                             on_sticker: Optional[Callable[[Dict[str, Any]], None]] = None):
+        total = len(stickers)
+        completed = 0
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        encode_slots = asyncio.Semaphore(self.client.PIPELINE_DEPTH)
+
+        # Tasks are created just ahead of the limiter (not all upfront), so the
+        # client's priority hints can still reorder the stickers not yet started
+        waiting = list(enumerate(stickers))
+        window = self.max_concurrency + self.client.PIPELINE_DEPTH
+        running = set()
+
+        while waiting or running:
+            while waiting and len(running) < window:
+                index, sticker = self.client._next_download(base_path.name, waiting)
+                running.add(asyncio.create_task(self._download_single_sticker(limiter, encode_slots, sticker, index, base_path, on_sticker)))
+
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    task.result()
+                    completed += 1
+                    if progress_callback: progress_callback(completed, total)
+                except Exception as e:
+                    logger.error(f"Async Task Error: {e}")
+                self.client.telemetry.sticker_done(base_path.name)
+
+    async def _download_single_sticker(self, limiter: asyncio.Semaphore, encode_slots: asyncio.Semaphore, sticker: Dict[str, Any], index: int, base_path: Path,
+                                       on_sticker: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Coroutine to download a single sticker, then convert it in the process pool."""
+        telemetry = self.client.telemetry
+        pack = base_path.name
+        try:
+            file_id = sticker.get('file_id')
+            if not file_id: return
+
+            async with limiter:
+                # A. Get link
+                start = time.perf_counter()
+                _, file_info = await self._request(f"{self.client.base_url}/getFile", "getFile", {"file_id": file_id}, self.client.API_TIMEOUT, as_json=True)
+                telemetry.record(pack, "getFile", time.perf_counter() - start)
+                if not file_info.get("ok"): return
+
+                remote_file_path = file_info['result']['file_path']
+                download_url = f"{self.client.file_base_url}/{remote_file_path}"
+
+                # B. Download bytes
+                start = time.perf_counter()
+                status, content = await self._request(download_url, "file", None, self.client.FILE_TIMEOUT, as_json=False)
+                if status != 200: return
+                telemetry.record(pack, "transfer", time.perf_counter() - start, len(content))
+
+                if is_raw_format(remote_file_path, self.client.storage_profile):
+                    # Nothing to decode, just write (default thread executor keeps the loop free);
+                    # the sticker dict is only updated here, on the loop
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        None, self.client._write_sticker_content, sticker, index, base_path, remote_file_path, content
+                    )
+                    self.client._apply_transcode_result(sticker, result)
+                    telemetry.record_result(pack, result)
+                    if on_sticker: on_sticker(sticker)
+                    return
+                
+                # Don't release the network slot until the encoders can take the bytes
+                await encode_slots.acquire()
+
+            # C. Convert & Save (CPU-bound, off the event loop)
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self.client.transcoder.executor,
+                    transcode_sticker, content, remote_file_path, str(base_path),
+                    sticker_file_stem(sticker, index), None, self.client.storage_profile # None: detect animation from the bytes
+                )
+            finally:
+                encode_slots.release()
+            
+            self.client._apply_transcode_result(sticker, result)
+            telemetry.record_result(pack, result)
+            if on_sticker: on_sticker(sticker)
+
+        except Exception as e:
+            logger.error(f"Error processing sticker {index} (ID: {sticker.get('file_id')}): {e}")
@@ -1,11 +1,11 @@
 import requests
 import json
 import time
-from io import BytesIO
-from PIL import Image
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Callable, Union
+from typing import Optional, List, Dict, Any, Callable, Union, Tuple
 
 # --- UPDATED IMPORTS ---
 from Core.Config import (
@@ -14,8 +14,18 @@ from Core.Config import (
     BASE_DIR, 
     save_json, 
     load_json, 
+    sticker_file_stem,
+    find_sticker_file,
+    find_sticker_thumbnail,
+    remove_sticker_thumbnail,
+    THUMBNAIL_FOLDER,
+    THUMBNAIL_EXTENSIONS,
     logger
 )
+from Core.AsyncTransport import AsyncTransport
+from Core.Network import TokenBucket, HttpTransport, RetryPolicy
+from Core.Telemetry import DownloadTelemetry
+from Core.Transcode import TranscodePool, transcode_sticker, is_raw_format, write_atomic, STORAGE_PROFILES, DEFAULT_STORAGE_PROFILE
 
 class StickerClient:
     """
@@ -24,17 +34,52 @@ class StickerClient:
     This class handles all communication with the Telegram API.
     It is responsible for:
     1. Fetching sticker pack metadata.
-    2. Downloading raw image files using MULTITHREADING.
-    3. Converting/Saving to local library (.webp/.gif).
+    2. Downloading raw image files using MULTITHREADING (or the optional Async engine).
+    3. Converting/Saving to local library (.webp/.gif) in a PROCESS POOL.
     4. Auto-tagging stickers.
     5. Managing the 'library.json' database file.
     """
 
+    # Telegram allows ~30 API calls/sec per bot; stay under it for bulk metadata checks
+    API_RATE_PER_SEC = 20
+    MAX_RATE_LIMIT_RETRIES = 5
+    
+    # Download pipeline: network threads -> bounded queue -> encode processes
+    NETWORK_WORKERS = 8
+    PIPELINE_DEPTH = 32
+    
+    # (connect, read) timeouts: API calls answer fast, file transfers may be slow
+    API_TIMEOUT = (5, 10)
+    FILE_TIMEOUT = (5, 30)
+
     def __init__(self, token: str = ""):
         self.token = token
         self.base_url = ""
         self.file_base_url = ""
-        self.session = requests.Session()
+        
+        # Pooled keep-alive session with retry/backoff + stats. Sized for the download
+        # workers plus the update checker, which run at the same time against the same host.
+        self.http = HttpTransport(pool_size=self.NETWORK_WORKERS * 2)
+        
+        # Download Engine: "Threaded" (requests) or "Async" (aiohttp, optional)
+        self.transport_name = "Threaded"
+        self.async_transport: Optional[AsyncTransport] = None
+        
+        # Shared limiter for getStickerSet (honors Telegram's 'retry_after' on 429)
+        self.api_limiter = TokenBucket(self.API_RATE_PER_SEC)
+        
+        # CPU-bound decode/encode, shared by both engines (created on first download)
+        self.transcoder = TranscodePool()
+        
+        # Per-stage timing (getFile / transfer / encode / write), per pack and per session
+        self.telemetry = DownloadTelemetry()
+        
+        # How static stickers are stored: "Passthrough", "Fast" or "Archival"
+        self.storage_profile = DEFAULT_STORAGE_PROFILE
+        
+        # Download order hints from the UI: pack t_name -> {file_stem: rank} (lower rank = sooner)
+        self._priority: Dict[str, Dict[str, int]] = {}
+        self._priority_lock = threading.Lock()
         
         if self.token:
             self.update_urls()
@@ -51,6 +96,28 @@ class StickerClient:
         self.token = new_token
         self.update_urls()
 
+    def set_transport(self, name: str):
+        """Selects the download engine. Falls back to 'Threaded' if aiohttp is missing."""
+        if name == "Async" and not AsyncTransport.is_available():
+            logger.warning("Async engine requested but 'aiohttp' is not installed. Using Threaded engine.")
+            name = "Threaded"
+            
+        if name == "Async" and self.async_transport is None:
+            self.async_transport = AsyncTransport(self)
+        elif name != "Async" and self.async_transport is not None:
+            self.async_transport.close()
+            self.async_transport = None
+            
+        self.transport_name = name
+
+    def get_network_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-kind request counters (count, retries, failures, latency) since startup."""
+        return self.http.stats.snapshot()
+
+    def set_storage_profile(self, name: str):
+        """Selects how static stickers are written (see Core/Transcode.py STORAGE_PROFILES)."""
+        self.storage_profile = name if name in STORAGE_PROFILES else DEFAULT_STORAGE_PROFILE
+
     # ==========================================================================
     #   TELEGRAM API INTERACTION
     # ==========================================================================
@@ -68,15 +135,39 @@ class StickerClient:
 
         logger.info(f"Fetching pack info for ID: {clean_name}")
 
-        try:
-            response = self.session.get(f"{self.base_url}/getStickerSet", params={"name": clean_name}, timeout=10)
-            data = response.json()
+        for _ in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            self.api_limiter.acquire()
+            data = self._fetch_sticker_set(clean_name)
+            if data is None: return None
             
             if data.get("ok"):
                 return data["result"]
-            else:
-                logger.warning(f"API Error for {clean_name}: {data.get("description")}")
-                return None
+            
+            # 429 Too Many Requests: stall every caller for 'retry_after', then retry
+            retry_after = (data.get("parameters") or {}).get("retry_after")
+            if data.get("error_code") == 429 and retry_after:
+                logger.warning(f"Rate limited by Telegram, retrying '{clean_name}' in {retry_after}s")
+                self.api_limiter.pause(float(retry_after))
+                continue
+                
+            logger.warning(f"API Error for {clean_name}: {data.get("description")}")
+            return None
+
+        logger.error(f"Giving up on '{clean_name}' after repeated rate limits.")
+        return None
+
+    def _fetch_sticker_set(self, clean_name: str) -> Optional[Dict[str, Any]]:
+        """Raw getStickerSet call. Returns the decoded JSON, or None on network errors."""
+        if self.async_transport:
+            return self.async_transport.get_sticker_set(clean_name)
+
+        try:
+            # 429 is left to get_pack_by_name so the shared api_limiter stalls every caller
+            response = self.http.get(
+                f"{self.base_url}/getStickerSet", "api", params={"name": clean_name},
+                timeout=self.API_TIMEOUT, retry_statuses=RetryPolicy.SERVER_ERRORS
+            )
+            return response.json()
                 
         except requests.RequestException as e:
             logger.error(f"Network Connection Error: {e}")
@@ -85,9 +176,35 @@ class StickerClient:
             logger.error(f"Unexpected API Error (Decoder/Logic): {e}")
             return None
 
-    def download_pack(self, pack_name: str, stickers: List[Dict[str, Any]], progress_callback: Optional[Callable[[int, int], None]] = None) -> Optional[Path]:
+    def set_download_priority(self, hints: Dict[str, List[str]]):
+        """
+        Replaces the priority hints: pack t_name -> sticker file stems, most urgent first
+        (e.g. the selected sticker, then the visible page). Running downloads pick them up
+        on their next fetch, so hinted stickers jump ahead of the rest of the pack.
         """
-        Downloads every sticker in a list using MULTITHREADING.
+        with self._priority_lock:
+            self._priority = {pack: {stem: rank for rank, stem in enumerate(stems)} for pack, stems in hints.items() if stems}
+
+    def _next_download(self, pack_name: str, waiting: List[tuple]) -> tuple:
+        """Pops the (index, sticker) to fetch next: the best-ranked hinted sticker, else pack order."""
+        with self._priority_lock:
+            ranks = self._priority.get(pack_name)
+        if ranks:
+            best = min(range(len(waiting)), key=lambda pos: ranks.get(waiting[pos][1].get('file_stem'), len(ranks)))
+            return waiting.pop(best)
+        return waiting.pop(0)
+
+    def download_pack(self, pack_name: str, stickers: List[Dict[str, Any]], progress_callback: Optional[Callable[[int, int], None]] = None,
+                      on_sticker: Optional[Callable[[Dict[str, Any]], None]] = None) -> Optional[Path]:
+        """
+        Downloads every sticker in a list as a TWO-STAGE PIPELINE:
+        1. Network stage: worker threads (or the Async engine) fetch raw bytes.
+        2. Encode stage: a process pool (one worker per core) decodes/converts them.
+        The stages are joined by a bounded queue, so fast networks cannot pile up
+        undecoded bytes in memory (backpressure) and encoding never starves the downloads.
+        Stickers already stored on disk are skipped (no getFile, no bytes).
+        Fetch order follows set_download_priority(); on_sticker(sticker) fires (from a worker
+        thread) as each file lands, so the UI can update that card in place.
         """
         if not self.token: return None
 
@@ -95,93 +212,267 @@ class StickerClient:
         base_path = BASE_DIR / LIBRARY_FOLDER / pack_name
         base_path.mkdir(parents=True, exist_ok=True)
 
+        # Drop leftovers of interrupted writes
+        for part in base_path.glob("*.part"):
+            try: part.unlink()
+            except Exception as e: logger.warning(f"Could not remove partial file {part}: {e}")
+
+        # Pin each sticker to its file name so later reorders never rename files on disk,
+        # then skip everything already stored (resume after crash / restart)
+        pending = []
+        for index, sticker in enumerate(stickers):
+            sticker['file_stem'] = sticker_file_stem(sticker, index)
+            if not self._is_already_stored(sticker, index, base_path):
+                pending.append((index, sticker))
+
         total = len(stickers)
-        completed = 0
-        logger.info(f"Starting PARALLEL download for '{pack_name}' ({total} stickers)...")
+        skipped = total - len(pending)
+        if skipped:
+            logger.info(f"Skipping {skipped}/{total} stickers already on disk for '{pack_name}'")
+            if progress_callback: progress_callback(skipped, total)
+        if not pending: return base_path
+
+        self.telemetry.start_pack(pack_name, len(pending))
+        if self.async_transport:
+            logger.info(f"Starting ASYNC download for '{pack_name}' ({len(pending)} stickers)...")
+            self.async_transport.download_pack(
+                [s for _, s in pending], base_path,
+                (lambda c, t: progress_callback(skipped + c, total)) if progress_callback else None, on_sticker
+            )
+        else:
+            logger.info(f"Starting PARALLEL download for '{pack_name}' ({len(pending)} stickers)...")
+            self._run_pipeline(pending, base_path, lambda c: progress_callback(skipped + c, total) if progress_callback else None, on_sticker)
         
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            futures = []
-            for index, sticker in enumerate(stickers):
-                futures.append(
-                    executor.submit(self._download_single_sticker, sticker, index, base_path)
-                )
+        self.telemetry.finish_pack(pack_name)
+        logger.info(f"Network stats: {self.http.stats.summary()}")
+        return base_path
+
+    def download_thumbnails(self, pack_name: str, stickers: List[Dict[str, Any]], progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Fetches the small thumbnail Telegram attaches to every sticker (~128px WebP/JPEG)
+        into '<pack>/.thumbs', all in parallel and stored as-is (no decode).
+        They make a new pack browsable within seconds, before any full file has arrived.
+        Returns how many stickers have a thumbnail on disk.
+        """
+        if not self.token: return 0
+
+        thumb_path = BASE_DIR / LIBRARY_FOLDER / pack_name / THUMBNAIL_FOLDER
+        thumb_path.mkdir(parents=True, exist_ok=True)
+
+        pending, ready = [], 0
+        for index, sticker in enumerate(stickers):
+            sticker['file_stem'] = sticker_file_stem(sticker, index)
+            thumb = sticker.get('thumbnail') or sticker.get('thumb') # 'thumb' before Bot API 6.6
+            if not thumb or not thumb.get('file_id'): continue
+            if find_sticker_file(pack_name, sticker, index):
+                remove_sticker_thumbnail(thumb_path.parent, sticker['file_stem']) # Left over from before the full file
+                ready += 1
+            elif find_sticker_thumbnail(pack_name, sticker, index):
+                ready += 1
+            else:
+                pending.append((index, sticker, thumb))
+        if not pending: return ready
+
+        def fetch(index: int, sticker: Dict[str, Any], thumb: Dict[str, Any]) -> bool:
+            fetched = self._fetch_sticker_bytes(thumb, index, pack_name)
+            if fetched is None: return False
+            remote_file_path, content = fetched
+            ext = Path(remote_file_path).suffix.lower()
+            write_atomic(thumb_path / f"{sticker['file_stem']}{ext if ext in THUMBNAIL_EXTENSIONS else THUMBNAIL_EXTENSIONS[0]}", content)
+            return True
+
+        start = time.perf_counter()
+        total, done = len(pending), 0
+        with ThreadPoolExecutor(max_workers=self.NETWORK_WORKERS, thread_name_prefix="ThumbFetch") as network:
+            for future in [network.submit(fetch, *job) for job in pending]:
+                try:
+                    if future.result(): ready += 1
+                except Exception as e:
+                    logger.warning(f"Thumbnail failed for '{pack_name}': {e}")
+                done += 1
+                if progress_callback: progress_callback(done, total)
+
+        logger.info(f"Thumbnails for '{pack_name}': {ready}/{len(stickers)} in {time.perf_counter() - start:.1f}s")
+        return ready
+
+    def _run_pipeline(self, pending: List[tuple], base_path: Path, on_progress: Callable[[int], None],
+                      on_sticker: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Network threads put (index, sticker, remote_file_path, content) into 'encode_queue';
+        this thread feeds the queue into the process pool and applies the results.
+        Fetches are submitted a few at a time (not all upfront) so priority hints can reorder them.
+        on_progress(n) receives the number of finished stickers (saved or failed).
+        """
+        pack = base_path.name
+        encode_queue: "queue.Queue" = queue.Queue(maxsize=self.PIPELINE_DEPTH)
+        written_queue: "queue.Queue" = queue.Queue() # Raw files written by network threads, applied here
+        max_in_flight = self.transcoder.workers * 2
+        max_fetching = self.NETWORK_WORKERS * 2 # Keeps every network thread busy without committing the order
+        completed = 0
+        in_flight: Dict[Future, tuple] = {}
+        waiting = list(pending)
+
+        def network_stage(index: int, sticker: Dict[str, Any]) -> bool:
+            """True if the bytes were handed to the encode stage."""
+            fetched = self._fetch_sticker_bytes(sticker, index, pack)
+            if fetched is None: return False
             
-            for future in as_completed(futures):
+            remote_file_path, content = fetched
+            if is_raw_format(remote_file_path, self.storage_profile):
+                # Nothing to decode: write straight from the network thread, apply on the coordinator
+                result = self._write_sticker_content(sticker, index, base_path, remote_file_path, content)
+                written_queue.put((sticker, result))
+                return False
+            
+            encode_queue.put((index, sticker, remote_file_path, content)) # Blocks while encoders are behind
+            return True
+
+        def collect(done_futures):
+            nonlocal completed
+            for future in done_futures:
+                index, sticker = in_flight.pop(future)
                 try:
-                    future.result()
-                    completed += 1
-                    if progress_callback: progress_callback(completed, total)
+                    result = future.result()
+                    self._apply_transcode_result(sticker, result)
+                    self.telemetry.record_result(pack, result)
+                    if on_sticker: on_sticker(sticker)
                 except Exception as e:
-                    logger.error(f"Thread Execution Error: {e}")
+                    logger.error(f"Error processing sticker {index} (ID: {sticker.get('file_id')}): {e}")
+                self.telemetry.sticker_done(pack)
+                completed += 1
+                on_progress(completed)
 
-        return base_path
+        def apply_written():
+            while True:
+                try:
+                    sticker, result = written_queue.get_nowait()
+                except queue.Empty:
+                    return
+                self._apply_transcode_result(sticker, result)
+                self.telemetry.record_result(pack, result)
+                if on_sticker: on_sticker(sticker)
 
-    def _download_single_sticker(self, sticker: Dict[str, Any], index: int, base_path: Path):
-        """Worker function to download and convert a single sticker."""
+        with ThreadPoolExecutor(max_workers=self.NETWORK_WORKERS, thread_name_prefix="StickerFetch") as network:
+            net_futures = set()
+
+            while waiting or net_futures or not encode_queue.empty() or in_flight or not written_queue.empty():
+                # 0. Top up the network stage, most urgent sticker first
+                while waiting and len(net_futures) < max_fetching:
+                    net_futures.add(network.submit(network_stage, *self._next_download(pack, waiting)))
+
+                # 1. Network jobs that ended without producing work (errors / raw writes)
+                for future in [f for f in net_futures if f.done()]:
+                    net_futures.discard(future)
+                    try:
+                        queued = future.result()
+                    except Exception as e:
+                        logger.error(f"Thread Execution Error: {e}")
+                        queued = False
+                    if not queued:
+                        self.telemetry.sticker_done(pack)
+                        completed += 1
+                        on_progress(completed)
+
+                # 2. Hand queued bytes to the process pool, never more than it can chew
+                while len(in_flight) < max_in_flight:
+                    try:
+                        index, sticker, remote_file_path, content = encode_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    future = self.transcoder.submit(
+                        transcode_sticker, content, remote_file_path, str(base_path),
+                        sticker_file_stem(sticker, index), None, self.storage_profile # None: animation is detected from the bytes
+                    )
+                    in_flight[future] = (index, sticker)
+
+                # 3. Apply finished encodes and raw writes (sticker dicts are only mutated on this thread)
+                apply_written()
+                if in_flight:
+                    done, _ = wait(list(in_flight), timeout=0.05, return_when=FIRST_COMPLETED)
+                    collect(done)
+                elif net_futures and encode_queue.empty():
+                    wait(net_futures, timeout=0.05, return_when=FIRST_COMPLETED)
+
+    def _fetch_sticker_bytes(self, sticker: Dict[str, Any], index: int, pack: str) -> Optional[Tuple[str, bytes]]:
+        """Network stage: getFile + download. Returns (remote_file_path, content) or None."""
         try:
             file_id = sticker.get('file_id')
-            if not file_id: return
+            if not file_id: return None
             
             # A. Get link
-            file_info_resp = self.session.get(f"{self.base_url}/getFile", params={"file_id": file_id}, timeout=10)
+            start = time.perf_counter()
+            file_info_resp = self.http.get(f"{self.base_url}/getFile", "getFile", params={"file_id": file_id}, timeout=self.API_TIMEOUT)
             file_info = file_info_resp.json()
+            self.telemetry.record(pack, "getFile", time.perf_counter() - start)
             
-            if not file_info.get("ok"): return
+            if not file_info.get("ok"): return None
                 
             remote_file_path = file_info['result']['file_path']
             download_url = f"{self.file_base_url}/{remote_file_path}"
             
             # B. Download bytes
-            img_response = self.session.get(download_url, timeout=15)
-            if img_response.status_code != 200: return
-
-            # --- CRITICAL FIX START: Handle special formats directly ---
-            if 'tags' not in sticker: sticker['tags'] = []
-
-            # 1. TGS (Telegram Animated Sticker - Lottie JSON)
-            if remote_file_path.endswith(".tgs"):
-                output_path = base_path / f"sticker_{index}.tgs"
-                with open(output_path, "wb") as f:
-                    f.write(img_response.content)
-                if "Animated" not in sticker['tags']: sticker['tags'].append("Animated")
-                return # Stop processing, PIL cannot open this
-
-            # 2. WebM (Video Sticker)
-            if remote_file_path.endswith(".webm"):
-                output_path = base_path / f"sticker_{index}.webm"
-                with open(output_path, "wb") as f:
-                    f.write(img_response.content)
-                # CHANGED: Replaced "Video" tag with "Animated" to unify formats
-                if "Animated" not in sticker['tags']: sticker['tags'].append("Animated")
-                return # Stop processing, PIL cannot open this
-            # --- CRITICAL FIX END ---
-
-            img_data = BytesIO(img_response.content)
+            start = time.perf_counter()
+            img_response = self.http.get(download_url, "file", timeout=self.FILE_TIMEOUT)
+            if img_response.status_code != 200: return None
+            self.telemetry.record(pack, "transfer", time.perf_counter() - start, len(img_response.content))
             
-            # C. Save Standard Images (WebP, JPG, PNG)
-            is_animated = getattr(sticker, "is_animated", False)
-            
-            with Image.open(img_data) as image:
-                if is_animated:
-                    output_path = base_path / f"sticker_{index}.gif"
-                    if "Animated" not in sticker['tags']: sticker['tags'].append("Animated")
-                    
-                    if image.format != 'GIF':
-                        try: 
-                            image.save(output_path, "GIF", save_all=True, loop=0)
-                        except Exception as e: 
-                            # Fallback if conversion fails, log it
-                            logger.warning(f"GIF conversion failed for sticker {index}, saving raw bytes: {e}")
-                            with open(output_path, 'wb') as f: f.write(img_response.content)
-                    else:
-                        image.save(output_path)
-                else:
-                    output_path = base_path / f"sticker_{index}.webp"
-                    if "Static" not in sticker['tags']: sticker['tags'].append("Static")
-                    image.save(output_path, "WEBP", quality=90, method=6)
+            return remote_file_path, img_response.content
                 
         except Exception as e:
-            logger.error(f"Error processing sticker {index} (ID: {sticker.get('file_id')}): {e}")
+            logger.error(f"Error downloading sticker {index} (ID: {sticker.get('file_id')}): {e}")
+            return None
+
+    def _write_sticker_content(self, sticker: Dict[str, Any], index: int, base_path: Path, remote_file_path: str, content: bytes) -> Dict[str, Any]:
+        """
+        Converts & saves downloaded bytes in the calling thread, without touching the sticker dict
+        (the caller applies the result on the thread that owns it).
+        The pipeline runs the same transcode_sticker() in the process pool instead.
+        """
+        return transcode_sticker(
+            content, remote_file_path, str(base_path),
+            sticker_file_stem(sticker, index), None, self.storage_profile
+        )
+
+    @staticmethod
+    def _apply_transcode_result(sticker: Dict[str, Any], result: Dict[str, Any]):
+        """Copies what a transcode worker produced back onto the sticker dict."""
+        if 'tags' not in sticker: sticker['tags'] = []
+        if result['tag'] not in sticker['tags']: sticker['tags'].append(result['tag'])
+        sticker['stored'] = {
+            "file": result['file'],
+            "size": result['size'],
+            "unique_id": sticker.get('file_unique_id'),
+            "profile": result.get('profile')
+        }
+
+    # ==========================================================================
+    #   RESUME HELPERS (Skip-Existing / Atomic Writes)
+    # ==========================================================================
+
+    @staticmethod
+    def _record_stored(sticker: Dict[str, Any], output_path: Path):
+        """Remembers which file this sticker produced, so later runs can skip it."""
+        sticker['stored'] = {
+            "file": output_path.name,
+            "size": output_path.stat().st_size,
+            "unique_id": sticker.get('file_unique_id')
+        }
+
+    def _is_already_stored(self, sticker: Dict[str, Any], index: int, base_path: Path) -> bool:
+        """True if the sticker's file is on disk and matches what was recorded."""
+        stored = sticker.get('stored')
+        if stored:
+            if stored.get('unique_id') != sticker.get('file_unique_id'): return False
+            p = base_path / stored.get('file', '')
+            return p.is_file() and p.stat().st_size == stored.get('size')
+        
+        # No record (older library, or the app closed before saving): final names are only
+        # ever produced by an atomic rename, so an existing file is a complete one.
+        p = find_sticker_file(base_path.name, sticker, index)
+        if p and p.stat().st_size > 0:
+            self._record_stored(sticker, p)
+            return True
+        return False
 
     # ==========================================================================
     #   DATABASE HELPER
@@ -0,0 +1,155 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+from PIL import Image
+
+from Core.Config import BASE_DIR, CACHE_FOLDER, logger, find_sticker_file
+from Core.Transcode import part_path
+from Core.AnimEncoder import encode_animation, ANIMATED_FORMATS, VIDEO_SOURCES
+
+# Optional dependency: video stickers are copied as-is without it (pip install opencv-python)
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# ==============================================================================
+#   CLIPBOARD CACHE SETTINGS
+# ==============================================================================
+# Converted copies ("Copy" at a size, WebP -> PNG, WebM -> GIF) are kept between sessions,
+# so copying a sticker again is a file lookup. Temp/ is wiped on start, hence Cache/.
+CLIPBOARD_DIR = BASE_DIR / CACHE_FOLDER / "clipboard"
+CLIPBOARD_SIZES = {"Large": 1024, "Big": 512, "Normal": 256, "Small": 128, "Tiny": 64}
+CLIPBOARD_CACHE_BYTES = 256 * 1024 * 1024 # Least recently copied files go first past either limit
+CLIPBOARD_CACHE_FILES = 400
+PREWARM_LIMIT = 40                        # Favorites + most used stickers converted in the background
+# Animated copies: "GIF" pastes everywhere; "WebP" / "APNG" keep full colour and alpha.
+# APNG names are tagged so they never pass for a static PNG of the same sticker.
+ANIMATED_NAME_SUFFIX = {".gif": ".gif", ".webp": ".webp", ".png": "_apng.png"}
+
+def target_dim(size_label: str) -> Optional[int]:
+    """'Big (512px)' -> 512; 'Original' -> None."""
+    return CLIPBOARD_SIZES.get(size_label.split(" ")[0])
+
+def output_format(path: str, size_label: str, animated_format: str = "GIF") -> Optional[str]:
+    """
+    File name suffix of the converted copy ('.png' for stills, ANIMATED_NAME_SUFFIX for
+    animations), or None when the original is copied as-is.
+    """
+    p = path.lower()
+    animated = ANIMATED_NAME_SUFFIX[ANIMATED_FORMATS.get(animated_format, ".gif")]
+    if p.endswith(VIDEO_SOURCES): return animated if cv2 is not None else None
+    try:
+        with Image.open(path) as img: # Header only
+            if getattr(img, "is_animated", False):
+                return animated if target_dim(size_label) or not p.endswith(animated) else None
+    except Exception:
+        return None
+    return ".png" if target_dim(size_label) or p.endswith(".webp") else None
+
+def cache_path(path: str, size_label: str, animated_format: str = "GIF") -> Optional[Path]:
+    """
+    Cache file for (source path, mtime, size label, output format), or None if the original
+    is copied as-is. Keeps the sticker's stem, so pasted files still read 'sticker_3.gif'.
+    """
+    source = Path(path)
+    try:
+        st = source.stat()
+    except OSError:
+        return None
+    path_id = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:12]
+    version = hashlib.sha1(f"{st.st_mtime_ns}|{st.st_size}".encode("ascii")).hexdigest()[:8]
+    name = f"{source.stem}_{path_id}_{version}_{target_dim(size_label) or 'orig'}"
+
+    # An earlier conversion answers without opening the source (animated WebP headers are not cheap)
+    for fmt in (ANIMATED_NAME_SUFFIX[ANIMATED_FORMATS.get(animated_format, ".gif")], ".png"):
+        hit = CLIPBOARD_DIR / (name + fmt)
+        if hit.exists(): return hit
+    fmt = output_format(path, size_label, animated_format)
+    return CLIPBOARD_DIR / (name + fmt) if fmt else None
+
+# ==============================================================================
+#   CONVERSION (Runs inside the process pool for prewarming - must stay picklable)
+# ==============================================================================
+
+def _convert_still(path: str, output: Path, dim: Optional[int]):
+    with Image.open(path) as img:
+        if dim:
+            # LANCZOS is the high-quality setting for both up/downscaling in Pillow
+            ratio = min(dim / img.width, dim / img.height)
+            img = img.resize((int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS)
+        img.save(output, "PNG") # WebP -> PNG for compatibility
+
+def convert_for_clipboard(path: str, size_label: str, animated_format: str = "GIF") -> str:
+    """
+    Path to paste for 'path' at 'size_label': the cached conversion (made now if missing)
+    or the original when no conversion is needed. Animations are streamed into
+    'animated_format' ("GIF", "WebP" or "APNG"). Raises if the conversion fails.
+    """
+    output = cache_path(path, size_label, animated_format)
+    if output is None: return path
+    if output.exists():
+        try: os.utime(output) # LRU: mtime is the last copy
+        except OSError: pass
+        return str(output)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = part_path(output)
+    try:
+        if output.name.endswith(".png") and not output.name.endswith(ANIMATED_NAME_SUFFIX[".png"]):
+            _convert_still(path, tmp_path, target_dim(size_label))
+        else:
+            encode_animation(path, tmp_path, target_dim(size_label), output.suffix)
+        os.replace(tmp_path, output)
+    except BaseException as e:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        # A concurrent conversion of the same copy won the rename (and may hold the file open on Windows)
+        if not (isinstance(e, OSError) and output.exists()): raise
+    trim_clipboard_cache()
+    return str(output)
+
+# ==============================================================================
+#   LRU LIMITS & PREWARM
+# ==============================================================================
+
+def trim_clipboard_cache(max_bytes: int = CLIPBOARD_CACHE_BYTES, max_files: int = CLIPBOARD_CACHE_FILES) -> int:
+    """Deletes the least recently copied files until both limits hold. Returns files removed."""
+    try:
+        entries = []
+        for entry in os.scandir(CLIPBOARD_DIR):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    except OSError:
+        return 0
+    entries.sort(reverse=True) # Newest first
+    total, removed = 0, 0
+    for n, (_, size, file_path) in enumerate(entries):
+        total += size
+        if n >= max_files or total > max_bytes:
+            try:
+                os.remove(file_path)
+                removed += 1
+            except OSError:
+                pass
+    if removed: logger.info(f"Clipboard cache: removed {removed} least recently used files")
+    return removed
+
+def prewarm_sources(library: List[Dict[str, Any]], limit: int = PREWARM_LIMIT) -> List[str]:
+    """Files of favorite stickers, then the most used ones, up to 'limit'."""
+    ranked = []
+    for pack in library:
+        for i, s in enumerate(pack.get('stickers', [])):
+            if s.get('is_favorite') or s.get('usage_count', 0) > 0:
+                ranked.append((bool(s.get('is_favorite')), s.get('usage_count', 0), pack['t_name'], s, i))
+    ranked.sort(key=lambda r: (r[0], r[1]), reverse=True)
+
+    sources = []
+    for _, _, tname, sticker, idx in ranked:
+        if len(sources) >= limit: break
+        found = find_sticker_file(tname, sticker, idx)
+        if found: sources.append(str(found))
+    return sources
@@ -4,7 +4,7 @@ import shutil
 import logging
 import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 # ==============================================================================
 #   LOGGING CONFIGURATION
@@ -22,8 +22,17 @@ logger = logging.getLogger("StickerManager")
 BASE_DIR = Path.cwd()
 SETTINGS_FILE  = "settings.json"
 LIBRARY_FILE   = "library.json"
+QUEUE_FILE     = "queue.json"
 LIBRARY_FOLDER = "Library"
 TEMP_FOLDER    = "Temp"
+CACHE_FOLDER   = "Cache"   # Regenerable data (thumbnails); safe to delete
+
+# Every format a sticker can be stored as on disk
+STICKER_EXTENSIONS = [".png", ".gif", ".webp", ".webm", ".mp4", ".tgs"]
+
+# Telegram's small per-sticker previews, kept in a hidden folder inside each pack
+THUMBNAIL_FOLDER = ".thumbs"
+THUMBNAIL_EXTENSIONS = [".webp", ".jpg"]
 
 # ==============================================================================
 #   THREAD SAFETY
@@ -39,6 +48,16 @@ DEFAULT_SETTINGS: Dict[str, Any] = {
     "nsfw_enabled": False,
     "show_favorites_only": False,
     "custom_theme_data": {},
+    # Download Engine: "Threaded" (requests) or "Async" (requires aiohttp)
+    "download_engine": "Threaded",
+    # Storage Profile: "Passthrough" (keep Telegram's WebP), "Fast" or "Archival" (lossless re-encode)
+    "storage_profile": "Passthrough",
+    # Card Images: small gallery thumbnails are cropped from one sprite sheet per pack
+    "thumbnail_atlas": True,
+    # Animation Quality per layout mode: "Full", "Balanced" (adapts to the page), "Saver", "Hover Only" or "Off"
+    "animation_quality": {"Large": "Balanced", "Normal": "Balanced", "Small": "Balanced", "List": "Balanced"},
+    # Clipboard Animations: animated stickers are copied as "GIF" (pastes everywhere), "WebP" or "APNG"
+    "clipboard_format": "GIF",
     # Added for Phase 5: Storage for "All Stickers" and "Collection" covers
     "custom_covers": {
         "virtual_all_stickers": "",  # Path to cover for All Stickers
@@ -109,4 +128,39 @@ def load_json(filename: str) -> Any:
             return json.load(f)
     except Exception as e:
         logger.error(f"Error loading {filename}: {e}")
-        return {}
\ No newline at end of file
+        return {}
+
+# ==============================================================================
+#   STICKER FILE RESOLUTION
+# ==============================================================================
+
+def sticker_file_stem(sticker: Dict[str, Any], index: int) -> str:
+    """
+    Returns the on-disk file name (without extension) of a sticker.
+    Older libraries have no 'file_stem' and use the position in the pack.
+    """
+    return sticker.get('file_stem') or f"sticker_{index}"
+
+def find_sticker_file(pack_tname: str, sticker: Dict[str, Any], index: int, extensions: Optional[List[str]] = None) -> Optional[Path]:
+    """Returns the first existing file for a sticker, checking extensions in order."""
+    base = BASE_DIR / LIBRARY_FOLDER / pack_tname
+    stem = sticker_file_stem(sticker, index)
+    for ext in (extensions or STICKER_EXTENSIONS):
+        p = base / f"{stem}{ext}"
+        if p.exists(): return p
+    return None
+
+def find_sticker_thumbnail(pack_tname: str, sticker: Dict[str, Any], index: int) -> Optional[Path]:
+    """Returns the downloaded Telegram thumbnail of a sticker (shown until the full file lands)."""
+    base = BASE_DIR / LIBRARY_FOLDER / pack_tname / THUMBNAIL_FOLDER
+    stem = sticker_file_stem(sticker, index)
+    for ext in THUMBNAIL_EXTENSIONS:
+        p = base / f"{stem}{ext}"
+        if p.exists(): return p
+    return None
+
+def remove_sticker_thumbnail(pack_folder: Path, stem: str):
+    """Deletes a sticker's Telegram thumbnail (its full file is stored, or it left the pack)."""
+    for ext in THUMBNAIL_EXTENSIONS:
+        try: (pack_folder / THUMBNAIL_FOLDER / f"{stem}{ext}").unlink()
+        except OSError: pass
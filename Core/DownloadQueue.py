@@ -0,0 +1,181 @@
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Deque
+
+from Core.Config import QUEUE_FILE, save_json, load_json, logger
+
+# Item lifecycle: pending -> metadata (new/sync) -> downloading -> done | failed
+QUEUE_STATES = ["pending", "metadata", "downloading", "done", "failed"]
+ACTIVE_STATES = {"metadata", "downloading"}
+
+# Tasks that start by asking Telegram for the sticker set
+METADATA_TASKS = {"new", "sync"}
+
+class DownloadQueue:
+    """
+    The Ledger.
+    Ordered, thread-safe download queue persisted to QUEUE_FILE on every change,
+    so a crash or app close never loses queued work.
+
+    Items are plain dicts: {"id", "type", "key", "label", "payload", "state", "error", "added"}.
+    'key' is the pack's t_name (or the import sources) and is used for de-duplication.
+    'payload' is JSON-safe (URL, t_name or paths); keys starting with "_" stay in memory only.
+    """
+
+    HISTORY_SIZE = 50 # Finished items kept for the queue panel
+
+    def __init__(self, path: str = QUEUE_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.items: List[Dict[str, Any]] = []          # Active + pending, in run order
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=self.HISTORY_SIZE)
+        self._ids = itertools.count(1)
+
+        # Batch counters for the "[Pack X/Y]" prefix (reset when the queue drains)
+        self.batch_total = 0
+        self.batch_done = 0
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.items)
+
+    # ==========================================================================
+    #   PERSISTENCE
+    # ==========================================================================
+
+    def save(self):
+        # The write stays under the lock: concurrent saves finishing out of order could
+        # otherwise leave an older snapshot on disk (e.g. a finished item back as pending)
+        with self.lock:
+            data = [{k: v for k, v in item.items() if not k.startswith("_")} for item in self.items]
+            data += [{k: v for k, v in item.items() if not k.startswith("_")} for item in self.history if item["state"] == "failed"]
+            save_json({"items": data}, self.path)
+
+    def load(self) -> int:
+        """Restores the saved queue. Interrupted items go back to 'pending'. Returns how many will run."""
+        saved = load_json(self.path)
+        restored = 0
+        with self.lock:
+            for item in saved.get("items", []) if isinstance(saved, dict) else []:
+                if not isinstance(item, dict) or not item.get("key") or self._find_key(item["key"]): continue
+                item["id"] = self._next_id()
+                if item.get("state") == "failed":
+                    self.history.append(item)
+                    continue
+                item["state"] = "pending"
+                item["error"] = ""
+                self.items.append(item)
+                self.batch_total += 1
+                restored += 1
+        if restored: logger.info(f"Download queue: restored {restored} unfinished items")
+        return restored
+
+    # ==========================================================================
+    #   QUEUE OPERATIONS (Any thread)
+    # ==========================================================================
+
+    def _next_id(self) -> str:
+        return f"q{next(self._ids)}"
+
+    def _find_key(self, key: str) -> Optional[Dict[str, Any]]:
+        return next((i for i in self.items if i["key"] == key), None)
+
+    def _find_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return next((i for i in self.items if i["id"] == item_id), None)
+
+    def add(self, type_: str, key: str, label: str, payload: Any, **memory) -> Optional[Dict[str, Any]]:
+        """Appends a pending item, or returns None if the same key is already queued or running."""
+        with self.lock:
+            existing = self._find_key(key)
+            if existing:
+                # A queued sync may still pick up newer metadata from the update checker
+                if existing["state"] == "pending" and memory.get("_remote"): existing["_remote"] = memory["_remote"]
+                return None
+            item = {"id": self._next_id(), "type": type_, "key": key, "label": label, "payload": payload,
+                    "state": "pending", "error": "", "added": time.time()}
+            item.update(memory)
+            self.items.append(item)
+            self.batch_total += 1
+        self.save()
+        return item
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Marks the first pending item as started and returns it (None when nothing is pending)."""
+        with self.lock:
+            item = next((i for i in self.items if i["state"] == "pending"), None)
+            if item is None: return None
+            item["state"] = "metadata" if item["type"] in METADATA_TASKS else "downloading"
+            self.batch_done += 1
+        self.save()
+        return item
+
+    def set_state(self, item: Dict[str, Any], state: str):
+        with self.lock:
+            if item["state"] == state: return
+            item["state"] = state
+        self.save()
+
+    def finish(self, item: Dict[str, Any], ok: bool, error: str = ""):
+        with self.lock:
+            item["state"] = "done" if ok else "failed"
+            item["error"] = "" if ok else (error or item.get("error") or "Failed")
+            item.pop("_remote", None)
+            if item in self.items: self.items.remove(item)
+            self.history.appendleft(item)
+        self.save()
+
+    def reset_batch(self):
+        with self.lock:
+            self.batch_total = len(self.items)
+            self.batch_done = 0
+
+    # ==========================================================================
+    #   USER ACTIONS (Queue panel)
+    # ==========================================================================
+
+    def move(self, item_id: str, offset: int) -> bool:
+        """Moves a pending item up (<0) or down (>0) among pending items; large offsets clamp (to top/bottom)."""
+        with self.lock:
+            item = self._find_id(item_id)
+            if not item or item["state"] != "pending": return False
+            pending = [i for i in self.items if i["state"] == "pending"]
+            new_pos = max(0, min(len(pending) - 1, pending.index(item) + offset))
+            pending.remove(item)
+            pending.insert(new_pos, item)
+            self.items = [i for i in self.items if i["state"] != "pending"] + pending
+        self.save()
+        return True
+
+    def cancel(self, item_id: str) -> bool:
+        """Drops a pending item (running items cannot be interrupted mid-pack)."""
+        with self.lock:
+            item = self._find_id(item_id)
+            if not item or item["state"] != "pending": return False
+            self.items.remove(item)
+            self.batch_total = max(self.batch_total - 1, self.batch_done)
+        self.save()
+        return True
+
+    def retry(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Re-queues a failed item from the history."""
+        with self.lock:
+            item = next((i for i in self.history if i["id"] == item_id and i["state"] == "failed"), None)
+            if not item: return None
+            self.history.remove(item)
+        return self.add(item["type"], item["key"], item["label"], item["payload"])
+
+    def clear_history(self):
+        with self.lock:
+            self.history.clear()
+        self.save()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copies for the UI thread."""
+        with self.lock:
+            return {
+                "items": [dict(i) for i in self.items],
+                "history": [dict(i) for i in self.history],
+                "batch_total": self.batch_total, "batch_done": self.batch_done
+            }
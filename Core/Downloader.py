@@ -2,77 +2,158 @@ import threading
 import random
 import unicodedata
 import time
+import hashlib
+import shutil
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 
 # Local Imports
-from Core.Config import logger, LIBRARY_FOLDER, BASE_DIR
+from Core.Config import logger, LIBRARY_FOLDER, BASE_DIR, STICKER_EXTENSIONS, sticker_file_stem, find_sticker_file, remove_sticker_thumbnail
+from Core.DownloadQueue import DownloadQueue
+from Core.Importer import iter_import_files, pack_title, unique_local_tname
+from Core.Transcode import transcode_sticker
+from Core import Lottie
+from Core.ThumbCache import (build_thumbnails, has_thumbnails, build_atlas, library_sources, ATLAS_TIERS,
+                             render_video_preview, cached_video_preview, video_sources, video_preview_available)
+
+# Sticker keys owned by the user (never overwritten by Telegram metadata)
+USER_STICKER_FIELDS = {"tags", "custom_name", "is_favorite", "usage_count", "last_used", "file_stem"}
+
+def build_emoji_tag(emoji: Optional[str]) -> Optional[str]:
+    """Auto-tag for a sticker emoji, e.g. '😀 - Grinning Face'."""
+    if not emoji: return None
+    emoji = emoji.strip()
+    if not emoji: return None
+    try:
+        name = unicodedata.name(emoji[0]).title()
+        return f"{emoji} - {name}"
+    except Exception:
+        return emoji
+
+def sticker_key(sticker: Dict[str, Any]) -> Optional[str]:
+    """Stable identity of a sticker across updates (file_id rotates, file_unique_id does not)."""
+    return sticker.get('file_unique_id') or sticker.get('file_id')
 
 class DownloadManager:
     """
     Handles the background download queue for Sticker Packs.
     Runs on a separate thread to keep the UI responsive.
+    The queue itself (Core.DownloadQueue) is persisted, so unfinished work survives restarts.
     """
 
     def __init__(self, app_instance):
         self.app = app_instance # Reference to main app (to access client/library)
-        self.queue: List[Dict[str, Any]] = []
+        self.queue = DownloadQueue()
         self.is_running: bool = False
-        
-        # Queue Statistics
-        self.total_packs_queued: int = 0
-        self.packs_processed: int = 0
+        self.active_item: Optional[Dict[str, Any]] = None
 
-    def add_to_queue(self, url_or_data: Any, type_: str = "new"):
+    def add_to_queue(self, url_or_data: Any, type_: str = "new") -> bool:
         """
-        Adds a task to the download queue.
-        type_: 'new' (URL string) or 'update' (Pack Data Dict)
+        Adds a task to the download queue. Returns False if the pack is already queued.
+        type_: 'new' (URL string), 'update' (Pack Data Dict, full re-download),
+               'sync' ({"pack": Pack Data Dict, "remote": optional getStickerSet result})
+               or 'import' (list of local folder / archive paths)
         """
-        self.queue.append({"type": type_, "payload": url_or_data})
-        self.total_packs_queued += 1
+        memory = {}
+        if type_ == "new":
+            payload = url_or_data.strip() # Full URL is kept for the metadata lookup
+            key = label = payload.split('/')[-1]
+        elif type_ == "update":
+            key = payload = url_or_data['t_name']
+            label = url_or_data.get('name', key)
+        elif type_ == "sync":
+            key = payload = url_or_data['pack']['t_name']
+            label = url_or_data['pack'].get('name', key)
+            if url_or_data.get("remote"): memory["_remote"] = url_or_data["remote"]
+        elif type_ == "import":
+            payload = list(url_or_data)
+            key = "import:" + "|".join(payload)
+            label = ", ".join(Path(p).name for p in payload[:3]) + (f" (+{len(payload) - 3})" if len(payload) > 3 else "")
+        else:
+            raise ValueError(f"Unknown task type: {type_}")
+        
+        if self.queue.add(type_, key, label, payload, **memory) is None:
+            logger.info(f"Already queued: {key}")
+            return False
         
-        if not self.is_running:
-            self.start_worker()
+        self.start_worker()
+        return True
+
+    def restore_queue(self) -> int:
+        """Loads the queue saved by a previous session and resumes it. Returns restored item count."""
+        restored = self.queue.load()
+        if restored: self.start_worker()
+        return restored
 
     def start_worker(self):
-        """Starts the background thread."""
-        self.is_running = True
+        """Starts the background thread (no-op if it is already running)."""
+        with self.queue.lock:
+            if self.is_running: return
+            self.is_running = True
         threading.Thread(target=self._worker_loop, daemon=True).start()
 
     def _worker_loop(self):
         """Main loop that processes the queue."""
-        # Import UI helpers inside thread to avoid circular imports during startup
-        # (This is safe because _worker_loop runs after App init)
-        
-        while self.queue:
-            self.packs_processed += 1
-            task = self.queue.pop(0)
-            
-            # Create a prefix like "[Pack 1/5]"
-            queue_status = f"[Pack {self.packs_processed}/{self.total_packs_queued}]"
+        while True:
+            # Claiming and stopping happen under the queue lock, so an item added
+            # while the worker is shutting down is never stranded.
+            with self.queue.lock:
+                item = self.queue.claim_next()
+                if item is None:
+                    self.is_running = False
+                    self.queue.reset_batch()
+                    break
+                # Create a prefix like "[Pack 1/5]"
+                queue_status = f"[Pack {self.queue.batch_done}/{max(self.queue.batch_total, self.queue.batch_done)}]"
             
+            self.active_item = item
+            ok, error = False, ""
             try:
-                if task["type"] == "new":
-                    self._process_new_pack(task["payload"], queue_status)
-                elif task["type"] == "update":
-                    self._process_existing_pack(task["payload"], queue_status)
+                ok = self._run_task(item, queue_status)
             except Exception as e:
                 # CRITICAL FIX: Log the full error stack trace for debugging
                 logger.error(f"Critical Queue Worker Error: {e}", exc_info=True)
                 self._safe_toast("Queue Error", f"Process failed: {str(e)}")
+                error = str(e)
+            finally:
+                self.active_item = None
+                self.queue.finish(item, ok, error)
         
         # Finished Batch
-        self.is_running = False
-        self.packs_processed = 0
-        self.total_packs_queued = 0
         self._safe_status("Idle")
 
+    def _run_task(self, item: Dict[str, Any], prefix: str) -> bool:
+        """Resolves the saved payload against the live library and runs the handler."""
+        type_, payload = item["type"], item["payload"]
+        if type_ == "new":
+            return self._process_new_pack(payload, prefix)
+        if type_ == "import":
+            return self._process_local_import(payload, prefix)
+        
+        pack = next((p for p in self.app.library_data if p.get('t_name') == payload), None)
+        if pack is None:
+            logger.warning(f"Queue: skipping '{payload}', not in library")
+            return self._fail("Pack is no longer in the library")
+        if type_ == "update":
+            return self._process_existing_pack(pack, prefix)
+        return self._process_delta_pack({"pack": pack, "remote": item.get("_remote")}, prefix)
+
+    def _set_stage(self, state: str):
+        """Moves the running item to 'downloading' etc. (shown in the queue panel)."""
+        if self.active_item: self.queue.set_state(self.active_item, state)
+
+    def _fail(self, reason: str) -> bool:
+        """Records why the running item failed (shown in the queue panel). Always returns False."""
+        if self.active_item: self.active_item["error"] = reason
+        return False
+
     # ==========================================================================
     #   TASK HANDLERS
     # ==========================================================================
 
-    def _process_new_pack(self, url: str, prefix: str):
+    def _process_new_pack(self, url: str, prefix: str) -> bool:
         """Step 1: Fetch Metadata -> Step 2: Download Files"""
         self._safe_status(f"{prefix} Fetching Metadata: {url}")
         
@@ -83,14 +164,18 @@ class DownloadManager:
             if not data:
                 logger.warning(f"Metadata fetch failed for URL: {url}")
                 self._safe_toast("Failed", f"Invalid Pack or API Error: {url}")
-                return
+                return self._fail("Invalid pack or API error")
 
             # 2. Check Duplicates
             # Using 't_name' (telegram unique name) to prevent duplicate folders
-            if any(p.get('t_name') == data.get('name') for p in self.app.library_data):
+            existing = next((p for p in self.app.library_data if p.get('t_name') == data.get('name')), None)
+            if existing:
+                # Registered before an interrupted download: finish it instead of skipping
+                if not existing.get('downloaded', True):
+                    return self._process_existing_pack(existing, prefix)
                 logger.info(f"Pack already exists: {data.get('name')}")
                 self._safe_toast("Skipped", f"Already exists: {data.get('title')}")
-                return
+                return True
 
             # 3. Create Database Entry
             new_pack = {
@@ -111,15 +196,8 @@ class DownloadManager:
             # Auto-tagging based on Emoji
             for s in new_pack['stickers']:
                 s['tags'] = []
-                emoji = s.get('emoji')
-                if emoji:
-                    emoji = emoji.strip()
-                    try:
-                        name = unicodedata.name(emoji[0]).title()
-                        tag_str = f"{emoji} - {name}"
-                    except Exception:
-                        tag_str = emoji 
-                    s['tags'].append(tag_str)
+                tag_str = build_emoji_tag(s.get('emoji'))
+                if tag_str: s['tags'].append(tag_str)
                 s['usage_count'] = 0
                 s['is_favorite'] = False
 
@@ -132,56 +210,46 @@ class DownloadManager:
             self.app.after(0, self.app.refresh_view)
             
             # 4. Download Content
-            self._process_existing_pack(new_pack, prefix)
+            return self._process_existing_pack(new_pack, prefix)
 
         except Exception as e:
             logger.error(f"Error processing new pack '{url}': {e}", exc_info=True)
             self._safe_toast("Error", f"Failed to add pack: {url}")
+            return self._fail(str(e))
 
-    def _process_existing_pack(self, pack_obj: Dict[str, Any], prefix: str):
+    def _process_existing_pack(self, pack_obj: Dict[str, Any], prefix: str) -> bool:
         """Downloads the actual images for a known pack object."""
         name = pack_obj.get('name', 'Unknown')
         t_name = pack_obj.get('t_name', 'Unknown')
+        self._set_stage("downloading")
         
         try:
             # Custom callback to show "Pack X/Y" AND "Sticker A/B"
             def update_prog(curr, total):
                 pct = curr / total if total > 0 else 0
                 msg = f"{prefix} Downloading '{name}': Sticker {curr}/{total}"
+                live = self.app.client.telemetry.format_pack_status(t_name)
+                if live: msg += f" • {live}"
                 self._safe_status(msg, pct)
 
+            # Thumbnails first: the pack is browsable while full files are still downloading
+            if not pack_obj.get('downloaded', True):
+                def thumb_prog(curr, total):
+                    self._safe_status(f"{prefix} Previews for '{name}': {curr}/{total}", curr / total if total > 0 else 0)
+                if self.app.client.download_thumbnails(t_name, pack_obj['stickers'], progress_callback=thumb_prog):
+                    self.app.after(0, self.app.refresh_view)
+
             # Call the heavy network function in Backend
-            path = self.app.client.download_pack(t_name, pack_obj['stickers'], progress_callback=update_prog)
+            path = self.app.client.download_pack(t_name, pack_obj['stickers'], progress_callback=update_prog, on_sticker=self._safe_card_update)
             
             if not path:
                  logger.error(f"Download returned no path for {t_name}")
                  self._safe_toast("Error", f"Download failed for {name}")
-                 return
+                 return self._fail("Download failed")
                  
             pack_obj['downloaded'] = True
             
-            # Post-Process: Check file types to tag 'Static' vs 'Animated'
-            path_obj = Path(path)
-            if path_obj.exists():
-                for i, s in enumerate(pack_obj['stickers']):
-                    webp_p = path_obj / f"sticker_{i}.webp"
-                    gif_p = path_obj / f"sticker_{i}.gif"
-                    
-                    if webp_p.exists():
-                        if "Static" not in s['tags']: s['tags'].append("Static")
-                    elif gif_p.exists():
-                         if "Animated" not in s['tags']: s['tags'].append("Animated")
-
-                # Set Thumbnail if missing
-                if not pack_obj.get('thumbnail_path'):
-                    valid_exts = {'.png', '.gif', '.webp'}
-                    try:
-                        imgs = [p.name for p in path_obj.iterdir() if p.suffix.lower() in valid_exts]
-                        if imgs: 
-                            pack_obj['temp_thumbnail'] = str(path_obj / random.choice(imgs))
-                    except Exception as e:
-                        logger.warning(f"Thumbnail selection error: {e}")
-
+            self._post_process_pack(pack_obj, Path(path))
             self.app.client.save_library(self.app.library_data)
             
             # Finalize
@@ -190,10 +258,316 @@ class DownloadManager:
             # Refresh logic
             self.app.after(0, lambda: self.app.logic.apply_filters())
             self.app.after(0, self.app.refresh_view)
+            return True
 
         except Exception as e:
             logger.error(f"Error downloading pack '{name}': {e}", exc_info=True)
             self._safe_toast("Error", f"Download crashed for {name}")
+            return self._fail(str(e))
+
+    def _process_delta_pack(self, payload: Dict[str, Any], prefix: str) -> bool:
+        """
+        Syncs a known pack with Telegram, matching stickers by file_unique_id.
+        Only added stickers (or ones missing on disk) are downloaded. Existing stickers
+        keep their user metadata and file names, so reorders never rename files.
+        """
+        pack_obj = payload["pack"]
+        remote = payload.get("remote")
+        name = pack_obj.get('name', 'Unknown')
+        t_name = pack_obj.get('t_name', 'Unknown')
+        
+        try:
+            # 1. Fetch Metadata (unless the update checker already did)
+            if not remote:
+                self._safe_status(f"{prefix} Fetching Metadata: {name}")
+                remote = self.app.client.get_pack_by_name(t_name)
+                if not remote:
+                    logger.warning(f"Metadata fetch failed for pack: {t_name}")
+                    self._safe_toast("Failed", f"Invalid Pack or API Error: {name}")
+                    return self._fail("Invalid pack or API error")
+            
+            # 2. Diff
+            merged, to_download, removed = self._merge_remote_stickers(t_name, pack_obj.get('stickers', []), remote.get('stickers', []))
+            logger.info(f"Delta for '{t_name}': {len(to_download)} to download, {len(removed)} removed, {len(merged)} total")
+            changed = bool(to_download or removed) or [sticker_key(s) for s in pack_obj.get('stickers', [])] != [sticker_key(s) for s in merged]
+            
+            # 3. Commit metadata first (single assignment so the UI never sees a half-merged list).
+            # File names are persisted before any bytes move, so an interrupted sync resumes cleanly.
+            pack_obj['stickers'] = merged
+            pack_obj['count'] = len(merged)
+            if changed: pack_obj['updated'] = datetime.now().strftime("%Y-%m-%d")
+            if to_download: pack_obj['downloaded'] = False
+            self.app.client.save_library(self.app.library_data)
+            
+            # 4. Drop files of stickers removed from the Telegram pack (with their TGS preview and thumbnail)
+            base = BASE_DIR / LIBRARY_FOLDER / t_name
+            for s in removed:
+                for ext in STICKER_EXTENSIONS + [Lottie.PREVIEW_SUFFIX]:
+                    f = base / f"{s['file_stem']}{ext}"
+                    try:
+                        if f.exists(): f.unlink()
+                    except Exception as e:
+                        logger.warning(f"Could not remove old sticker file {f}: {e}")
+                remove_sticker_thumbnail(base, s['file_stem'])
+            
+            # 5. Download only what is new or missing
+            self._set_stage("downloading")
+            if to_download:
+                def update_prog(curr, total):
+                    pct = curr / total if total > 0 else 0
+                    msg = f"{prefix} Updating '{name}': Sticker {curr}/{total}"
+                    live = self.app.client.telemetry.format_pack_status(t_name)
+                    if live: msg += f" • {live}"
+                    self._safe_status(msg, pct)
+                
+                path = self.app.client.download_pack(t_name, to_download, progress_callback=update_prog, on_sticker=self._safe_card_update)
+                if not path:
+                    logger.error(f"Download returned no path for {t_name}")
+                    self._safe_toast("Error", f"Update failed for {name}")
+                    return self._fail("Download failed")
+            
+            pack_obj['downloaded'] = True
+            pack_obj['last_checked'] = time.time() # The update checker skips this pack for a while
+            self._post_process_pack(pack_obj, base)
+            self.app.client.save_library(self.app.library_data)
+            
+            # Finalize
+            if changed:
+                self._safe_toast("Updated", f"{name}: +{len(to_download)} / -{len(removed)}")
+            else:
+                self._safe_toast("Up to date", f"No changes: {name}")
+            
+            self.app.after(0, lambda: self.app.logic.apply_filters())
+            self.app.after(0, self.app.refresh_view)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error syncing pack '{name}': {e}", exc_info=True)
+            self._safe_toast("Error", f"Update crashed for {name}")
+            return self._fail(str(e))
+
+    def _process_local_import(self, paths: List[str], prefix: str) -> bool:
+        """
+        Imports folders / zip / tar archives as local packs.
+        Files are streamed one by one from the source and converted in the shared
+        process pool (same transcode_sticker() as downloads, bounded in flight);
+        all new packs are registered with a single library save at the end.
+        """
+        client = self.app.client
+        max_in_flight = client.transcoder.workers * 2
+        taken = {p.get('t_name') for p in self.app.library_data}
+        
+        packs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        seen: Dict[str, set] = {} # t_name -> content hashes (skip duplicate files)
+        in_flight: Dict[Future, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        counts = {"imported": 0, "failed": 0, "duplicates": 0}
+        started = time.monotonic()
+        
+        def collect(done_futures):
+            for future in done_futures:
+                pack, sticker = in_flight.pop(future)
+                try:
+                    result = future.result()
+                    client._apply_transcode_result(sticker, result)
+                    client.telemetry.record_result(pack['t_name'], result)
+                    counts["imported"] += 1
+                except Exception as e:
+                    logger.warning(f"Import: could not convert '{sticker.get('custom_name')}': {e}")
+                    counts["failed"] += 1
+            
+            done = counts["imported"] + counts["failed"]
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self._safe_status(f"{prefix} Importing: {done} files ({len(packs)} packs) • {rate:.1f} files/s")
+        
+        for source_str in paths:
+            source = Path(source_str)
+            self._safe_status(f"{prefix} Importing: {source.name}")
+            try:
+                for group, file_name, content in iter_import_files(source):
+                    pack = packs.get((source_str, group))
+                    if pack is None:
+                        title = pack_title(source, group)
+                        t_name = unique_local_tname(title, taken)
+                        (BASE_DIR / LIBRARY_FOLDER / t_name).mkdir(parents=True, exist_ok=True)
+                        now = datetime.now().strftime("%Y-%m-%d")
+                        pack = {
+                            "name": title, "count": 0, "color": "gray",
+                            "t_name": t_name, "url": "", "source": "local",
+                            "stickers": [], "added": now, "updated": now,
+                            "downloaded": True, "tags": [], "is_favorite": False, "linked_packs": []
+                        }
+                        packs[(source_str, group)] = pack
+                        seen[t_name] = set()
+                        client.telemetry.start_pack(t_name, 0)
+                    
+                    digest = hashlib.sha1(content).hexdigest()
+                    if digest in seen[pack['t_name']]:
+                        counts["duplicates"] += 1
+                        continue
+                    seen[pack['t_name']].add(digest)
+                    
+                    index = len(pack['stickers'])
+                    name_stem = Path(file_name).stem
+                    sticker = {
+                        "file_id": None, "file_unique_id": f"local_{digest}",
+                        "emoji": "", "custom_name": name_stem,
+                        "tags": [], "usage_count": 0, "is_favorite": False,
+                        "file_stem": f"sticker_{index}"
+                    }
+                    # Emoji in the file name (common in exported sticker sets) -> same auto-tag as Telegram
+                    emoji = next((ch for ch in name_stem if unicodedata.category(ch) == "So"), None)
+                    tag_str = build_emoji_tag(emoji)
+                    if tag_str:
+                        sticker['emoji'] = emoji
+                        sticker['tags'].append(tag_str)
+                    pack['stickers'].append(sticker)
+                    
+                    # Backpressure: never hold more than max_in_flight files in memory
+                    while len(in_flight) >= max_in_flight:
+                        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                        collect(done)
+                    
+                    future = client.transcoder.submit(
+                        transcode_sticker, content, file_name.lower(),
+                        str(BASE_DIR / LIBRARY_FOLDER / pack['t_name']), sticker['file_stem'],
+                        None, client.storage_profile
+                    )
+                    in_flight[future] = (pack, sticker)
+            
+            except Exception as e:
+                logger.error(f"Import failed for '{source}': {e}", exc_info=True)
+                self._safe_toast("Import Error", f"Could not read: {source.name}")
+        
+        if in_flight:
+            collect(wait(list(in_flight)).done)
+        
+        # Finalize: drop stickers that failed to convert, drop empty packs
+        new_packs = []
+        for pack in packs.values():
+            pack['stickers'] = [s for s in pack['stickers'] if s.get('stored')]
+            pack['count'] = len(pack['stickers'])
+            path = BASE_DIR / LIBRARY_FOLDER / pack['t_name']
+            client.telemetry.finish_pack(pack['t_name'])
+            if not pack['stickers']:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            self._post_process_pack(pack, path)
+            new_packs.append(pack)
+        
+        if new_packs:
+            self.app.library_data.extend(new_packs)
+            self.app.client.save_library(self.app.library_data) # One save for the whole batch
+        
+        logger.info(f"Local import: {counts['imported']} stickers in {len(new_packs)} packs, "
+                    f"{counts['failed']} failed, {counts['duplicates']} duplicates skipped")
+        self._safe_toast("Import Complete", f"{counts['imported']} stickers in {len(new_packs)} packs"
+                         + (f" ({counts['failed']} failed)" if counts['failed'] else ""))
+        
+        self.app.after(0, lambda: self.app.logic.apply_filters())
+        self.app.after(0, self.app.refresh_view)
+        return bool(new_packs) or not counts["failed"] or self._fail("No file could be imported")
+
+    def _merge_remote_stickers(self, t_name: str, local: List[Dict[str, Any]], remote: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Builds the new sticker list in remote order.
+        Returns (merged, to_download, removed). 'removed' entries carry their 'file_stem'.
+        """
+        # Index local stickers by identity (remember their current file names)
+        local_by_key: Dict[str, Dict[str, Any]] = {}
+        unmatched: List[Dict[str, Any]] = []
+        for i, s in enumerate(local):
+            s['file_stem'] = sticker_file_stem(s, i)
+            key = sticker_key(s)
+            if key and key not in local_by_key: local_by_key[key] = s
+            else: unmatched.append(s)
+        
+        reserved = {s['file_stem'] for s in local}
+        merged: List[Dict[str, Any]] = []
+        to_download: List[Dict[str, Any]] = []
+        new_items: List[Tuple[int, Dict[str, Any]]] = []
+        
+        for pos, r in enumerate(remote):
+            existing = local_by_key.pop(sticker_key(r), None)
+            
+            if existing:
+                # Refresh Telegram fields (file_id rotates), keep user fields
+                old_tag = build_emoji_tag(existing.get('emoji'))
+                for k, v in r.items():
+                    if k not in USER_STICKER_FIELDS: existing[k] = v
+                
+                new_tag = build_emoji_tag(existing.get('emoji'))
+                tags = existing.setdefault('tags', [])
+                if new_tag != old_tag:
+                    if old_tag in tags: tags.remove(old_tag)
+                    if new_tag and new_tag not in tags: tags.append(new_tag)
+                
+                merged.append(existing)
+                if not find_sticker_file(t_name, existing, pos):
+                    to_download.append(existing)
+            else:
+                s = {k: v for k, v in r.items() if k not in USER_STICKER_FIELDS}
+                tag_str = build_emoji_tag(s.get('emoji'))
+                s['tags'] = [tag_str] if tag_str else []
+                s['usage_count'] = 0
+                s['is_favorite'] = False
+                merged.append(s)
+                to_download.append(s)
+                new_items.append((pos, s))
+        
+        # Name new stickers: keep 'sticker_<position>' when free, else the next free number
+        base = BASE_DIR / LIBRARY_FOLDER / t_name
+        def is_free(stem):
+            return stem not in reserved and not any((base / f"{stem}{ext}").exists() for ext in STICKER_EXTENSIONS)
+        
+        next_num = len(local) + len(remote)
+        for pos, s in new_items:
+            stem = f"sticker_{pos}"
+            while not is_free(stem):
+                stem = f"sticker_{next_num}"
+                next_num += 1
+            s['file_stem'] = stem
+            reserved.add(stem)
+        
+        removed = list(local_by_key.values()) + unmatched
+        return merged, to_download, removed
+
+    def _post_process_pack(self, pack_obj: Dict[str, Any], path_obj: Path):
+        """
+        Finishes a pack on disk: tags 'Static' / 'Animated' from the files, picks a thumbnail
+        if missing, then queues card thumbnails, atlases and video previews in the encode pool.
+        """
+        if not path_obj.exists(): return
+        
+        for i, s in enumerate(pack_obj['stickers']):
+            stem = sticker_file_stem(s, i)
+            webp_p = path_obj / f"{stem}.webp"
+            gif_p = path_obj / f"{stem}.gif"
+            
+            if webp_p.exists():
+                if "Static" not in s['tags']: s['tags'].append("Static")
+            elif gif_p.exists():
+                 if "Animated" not in s['tags']: s['tags'].append("Animated")
+
+        # Set Thumbnail if missing
+        if not pack_obj.get('thumbnail_path'):
+            valid_exts = {'.png', '.gif', '.webp'}
+            try:
+                imgs = [p.name for p in path_obj.iterdir() if p.suffix.lower() in valid_exts and not Lottie.is_preview_file(p)]
+                if imgs: 
+                    pack_obj['temp_thumbnail'] = str(path_obj / random.choice(imgs))
+            except Exception as e:
+                logger.warning(f"Thumbnail selection error: {e}")
+
+        # Pre-scale card thumbnails in the encode pool (not awaited; cards fall back to lazy generation)
+        for source in library_sources(path_obj):
+            if not has_thumbnails(source): self.app.client.transcoder.submit(build_thumbnails, source)
+        # Then the pack's atlases (queued behind the thumbnails; unchanged cells are reused)
+        for tier in ATLAS_TIERS:
+            self.app.client.transcoder.submit(build_atlas, str(path_obj), tier)
+        # Video stickers: sampled preview + poster, so cards never open the video itself
+        if video_preview_available():
+            for source in video_sources(path_obj):
+                if not cached_video_preview(source): self.app.client.transcoder.submit(render_video_preview, source)
 
     # ==========================================================================
     #   THREAD-SAFE UI HELPERS
@@ -204,5 +578,9 @@ class DownloadManager:
         from UI.ViewUtils import ToastNotification
         self.app.after(0, lambda: ToastNotification(self.app, title, msg))
 
+    def _safe_card_update(self, sticker):
+        """A sticker file landed: swap its card (and the detail panel) to it without a full refresh_view."""
+        self.app.after(0, lambda: self.app.card_manager.on_sticker_downloaded(sticker) if hasattr(self.app, 'card_manager') else None)
+
     def _safe_status(self, msg, progress=None):
         self.app.after(0, lambda: self.app.update_status_bar(msg, progress))
\ No newline at end of file
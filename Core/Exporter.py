@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Tuple, List, Dict, Any, Optional, Callable
+
+from Core.Config import logger, find_sticker_file
+from Core.Transcode import part_path
+
+# ==============================================================================
+#   EXPORT SETTINGS
+# ==============================================================================
+# Sticker files are already compressed (WebP, WebM, GIF, PNG, gzipped TGS), so they
+# are stored as-is; only the manifest is deflated.
+EXPORT_FORMATS = {".zip": "zip", ".tar": "tar"}
+CHUNK_SIZE = 256 * 1024             # Copy buffer per file (memory stays flat regardless of export size)
+MANIFEST_NAME = "manifest.json"
+MANIFEST_SPOOL = 1024 * 1024        # Manifest is spooled to a temp file past this size
+PROGRESS_INTERVAL = 0.2             # Seconds between progress callbacks
+
+# Per-sticker fields copied into the manifest
+MANIFEST_STICKER_FIELDS = ("custom_name", "emoji", "tags", "is_favorite", "usage_count", "last_used", "file_unique_id")
+MANIFEST_PACK_FIELDS = ("name", "url", "tags", "source", "added", "updated", "is_favorite", "custom_collection_name")
+
+# (sticker_dict, pack_tname, index_in_pack) - same shape as app.filtered_stickers
+ExportItem = Tuple[Dict[str, Any], str, int]
+
+def export_format(dest: Path) -> Optional[str]:
+    return EXPORT_FORMATS.get(dest.suffix.lower())
+
+def pack_items(packs: Iterable[Dict[str, Any]]) -> List[ExportItem]:
+    """Flattens packs into export items, in pack order."""
+    return [(s, p['t_name'], i) for p in packs for i, s in enumerate(p.get('stickers', []))]
+
+class ExportCancelled(Exception):
+    pass
+
+# ==============================================================================
+#   ARCHIVE WRITERS
+# ==============================================================================
+
+class _Sink:
+    """Tracks member names, so two files never share one (extraction would overwrite one)."""
+    def __init__(self):
+        self.names = set()
+
+    def unique_name(self, arcname: str) -> str:
+        """'pack/sticker_3.webp' -> 'pack/sticker_3_2.webp' if taken (case-insensitive, like Windows/macOS)."""
+        stem, dot, ext = arcname.rpartition(".")
+        if not dot or "/" in ext: stem, ext = arcname, ""
+        candidate, n = arcname, 2
+        while candidate.lower() in self.names:
+            candidate = f"{stem}_{n}.{ext}" if ext else f"{stem}_{n}"
+            n += 1
+        self.names.add(candidate.lower())
+        return candidate
+
+class _ZipSink(_Sink):
+    def __init__(self, path: Path):
+        super().__init__()
+        self.archive = zipfile.ZipFile(path, "w", allowZip64=True)
+
+    def add_file(self, arcname: str, source: Path, size: int):
+        info = zipfile.ZipInfo.from_file(source, arcname)
+        info.compress_type = zipfile.ZIP_STORED
+        with open(source, "rb") as src, self.archive.open(info, "w", force_zip64=size > 0x7FFFFFFF) as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+    def add_stream(self, arcname: str, stream, size: int):
+        info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with self.archive.open(info, "w", force_zip64=size > 0x7FFFFFFF) as dst:
+            shutil.copyfileobj(stream, dst, CHUNK_SIZE)
+
+    def close(self):
+        self.archive.close()
+
+class _TarSink(_Sink):
+    def __init__(self, path: Path):
+        super().__init__()
+        self.archive = tarfile.open(path, "w", format=tarfile.PAX_FORMAT) # Uncompressed: members are compressed already
+
+    def add_file(self, arcname: str, source: Path, size: int):
+        info = self.archive.gettarinfo(str(source), arcname)
+        with open(source, "rb") as src:
+            self.archive.addfile(info, src)
+
+    def add_stream(self, arcname: str, stream, size: int):
+        info = tarfile.TarInfo(arcname)
+        info.size = size
+        info.mtime = int(time.time())
+        self.archive.addfile(info, stream)
+
+    def close(self):
+        self.archive.close()
+
+# ==============================================================================
+#   EXPORT
+# ==============================================================================
+
+def export_stickers(items: List[ExportItem], packs: Dict[str, Dict[str, Any]], dest: Path,
+                    on_progress: Optional[Callable[[int, int, int], None]] = None,
+                    cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Streams sticker files into a zip/tar at 'dest' plus a manifest.json (names, tags, usage).
+    Files are copied in CHUNK_SIZE blocks and manifest entries are spooled to a temp file,
+    so memory does not grow with the number of stickers.
+    The archive is written to a '.part' file beside 'dest' and renamed when complete.
+
+    packs: t_name -> pack dict, for the per-pack manifest section.
+    on_progress(done, total, bytes_written) is called from this thread, throttled.
+    Returns {"exported", "missing", "bytes"}; raises ExportCancelled if 'cancel' is set.
+    """
+    fmt = export_format(dest)
+    if not fmt: raise ValueError(f"Unsupported export format: {dest.suffix}")
+
+    tmp_path = part_path(dest)
+    sink = _ZipSink(tmp_path) if fmt == "zip" else _TarSink(tmp_path)
+    exported, missing, written = 0, 0, 0
+    used_packs: Dict[str, None] = {} # Insertion-ordered set of exported packs
+    last_report = 0.0
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=MANIFEST_SPOOL, mode="w+b") as manifest:
+            manifest.write(b'{"stickers": [')
+
+            for n, (sticker, tname, idx) in enumerate(items, start=1):
+                if cancel is not None and cancel.is_set(): raise ExportCancelled()
+
+                source = find_sticker_file(tname, sticker, idx)
+                if source is None:
+                    missing += 1
+                else:
+                    size = source.stat().st_size
+                    arcname = sink.unique_name(f"{tname}/{source.name}")
+                    sink.add_file(arcname, source, size)
+
+                    entry = {"file": arcname, "pack": tname, "index": idx, "size": size}
+                    entry.update({k: sticker[k] for k in MANIFEST_STICKER_FIELDS if k in sticker})
+                    manifest.write((b"," if exported else b"") + json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+                    used_packs.setdefault(tname)
+                    exported += 1
+                    written += size
+
+                now = time.monotonic()
+                if on_progress and (now - last_report >= PROGRESS_INTERVAL or n == len(items)):
+                    last_report = now
+                    on_progress(n, len(items), written)
+
+            pack_meta = {t: {k: packs[t][k] for k in MANIFEST_PACK_FIELDS if k in packs.get(t, {})} for t in used_packs}
+            manifest.write(b'], "packs": ' + json.dumps(pack_meta, ensure_ascii=False).encode("utf-8"))
+            manifest.write(b', "exported": ' + json.dumps(datetime.now().strftime("%Y-%m-%d %H:%M")).encode("utf-8"))
+            manifest.write(b', "count": ' + str(exported).encode("ascii") + b"}")
+
+            manifest_size = manifest.tell()
+            manifest.seek(0)
+            sink.add_stream(MANIFEST_NAME, manifest, manifest_size)
+
+        sink.close()
+        os.replace(tmp_path, dest)
+    except BaseException:
+        try: sink.close()
+        except Exception: pass
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+    logger.info(f"Exported {exported} stickers ({missing} missing) to {dest}")
+    return {"exported": exported, "missing": missing, "bytes": written}
@@ -0,0 +1,105 @@
+import os
+import re
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Tuple, List, Dict, Any, Set
+
+from Core.Config import STICKER_EXTENSIONS, BASE_DIR, LIBRARY_FOLDER, logger
+
+# ==============================================================================
+#   LOCAL IMPORT SOURCES (Folders & Archives)
+# ==============================================================================
+# Every folder that directly contains sticker files becomes one pack.
+# Archives are read member by member (nothing is extracted to disk first).
+
+IMPORT_EXTENSIONS = set(STICKER_EXTENSIONS) | {".jpg", ".jpeg"}
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MAX_IMPORT_FILE_SIZE = 64 * 1024 * 1024 # Skip anything larger (not a sticker)
+
+# Dropped by every source: OS metadata and hidden files
+_IGNORED_PARTS = {"__MACOSX", ".DS_Store", "Thumbs.db"}
+
+def is_archive(path: Path) -> bool:
+    return path.is_file() and path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+def archive_stem(path: Path) -> str:
+    """'Backup.tar.gz' -> 'Backup'."""
+    name = path.name
+    for suffix in sorted(ARCHIVE_SUFFIXES, key=len, reverse=True):
+        if name.lower().endswith(suffix): return name[:-len(suffix)]
+    return path.stem
+
+def _wanted(rel_path: PurePosixPath) -> bool:
+    if any(part in _IGNORED_PARTS or part.startswith(".") for part in rel_path.parts): return False
+    return rel_path.suffix.lower() in IMPORT_EXTENSIONS
+
+def iter_import_files(source: Path) -> Iterator[Tuple[str, str, bytes]]:
+    """
+    Yields (group, file_name, content) one file at a time.
+    'group' is the folder inside the source ("" for its root), used to split packs.
+    """
+    if source.is_dir():
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                full = Path(root) / name
+                rel = PurePosixPath(full.relative_to(source).as_posix())
+                if not _wanted(rel) or full.stat().st_size > MAX_IMPORT_FILE_SIZE: continue
+                try:
+                    yield str(rel.parent) if str(rel.parent) != "." else "", rel.name, full.read_bytes()
+                except OSError as e:
+                    logger.warning(f"Import: could not read {full}: {e}")
+
+    elif source.name.lower().endswith(".zip"):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                rel = PurePosixPath(info.filename)
+                if info.is_dir() or not _wanted(rel) or info.file_size > MAX_IMPORT_FILE_SIZE: continue
+                try:
+                    with archive.open(info) as f:
+                        yield str(rel.parent) if str(rel.parent) != "." else "", rel.name, f.read()
+                except (zipfile.BadZipFile, OSError, RuntimeError) as e: # RuntimeError: encrypted member
+                    logger.warning(f"Import: skipping {info.filename} in {source.name}: {e}")
+
+    elif is_archive(source):
+        # Tar members are consumed in stream order, so compressed tars are decompressed once
+        with tarfile.open(source, "r:*") as archive:
+            for member in archive:
+                rel = PurePosixPath(member.name)
+                if not member.isfile() or not _wanted(rel) or member.size > MAX_IMPORT_FILE_SIZE: continue
+                f = archive.extractfile(member)
+                if f is None: continue
+                with f:
+                    yield str(rel.parent) if str(rel.parent) != "." else "", rel.name, f.read()
+
+    else:
+        raise ValueError(f"Not a folder or supported archive: {source}")
+
+# ==============================================================================
+#   PACK NAMING
+# ==============================================================================
+
+def pack_title(source: Path, group: str) -> str:
+    """Folder name of the group, or the source's own name for files at its root."""
+    if group: return PurePosixPath(group).name
+    return archive_stem(source) if source.is_file() else source.name
+
+def unique_local_tname(title: str, taken: Set[str]) -> str:
+    """Folder-safe 'local_<slug>' that clashes with no pack and no existing Library folder."""
+    slug = re.sub(r"[^\w-]+", "_", title, flags=re.UNICODE).strip("_").lower()[:40] or "pack"
+    base = f"local_{slug}"
+    candidate, n = base, 2
+    while candidate in taken or (BASE_DIR / LIBRARY_FOLDER / candidate).exists():
+        candidate = f"{base}_{n}"
+        n += 1
+    taken.add(candidate)
+    return candidate
+
+def sources_summary(paths: List[str]) -> Dict[str, Any]:
+    """Splits user-picked paths into importable sources and rejected ones."""
+    ok, rejected = [], []
+    for p in paths:
+        path = Path(p)
+        (ok if path.is_dir() or is_archive(path) else rejected).append(path)
+    return {"sources": ok, "rejected": rejected}
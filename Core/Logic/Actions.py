@@ -1,9 +1,15 @@
 import random
+import re
+import threading
 import webbrowser
 from datetime import datetime
 from pathlib import Path
+from tkinter import filedialog
 
-from Core.Config import BASE_DIR, LIBRARY_FOLDER
+from Core.Config import find_sticker_file, logger
+from Core.ClipboardCache import convert_for_clipboard, prewarm_sources
+from Core.Exporter import export_stickers, pack_items, ExportCancelled
+from Core.Telemetry import format_bytes
 from UI.ViewUtils import copy_to_clipboard, open_file_location, resize_image_to_temp, ToastNotification
 
 class ActionManager:
@@ -15,6 +21,31 @@ class ActionManager:
 
     def __init__(self, app):
         self.app = app
+        
+        # Export runs on its own thread, one at a time
+        self.export_thread = None
+        self.export_cancel = threading.Event()
+
+        # "Clipboard Animations" setting: "GIF", "WebP" or "APNG"
+        self.clipboard_format = "GIF"
+        # (copy size, format) pairs whose clipboard conversions were prewarmed this session
+        self._prewarmed = set()
+
+    def prewarm_clipboard(self, size_label: str = "Original"):
+        """
+        Converts favorite and most used stickers for 'size_label' in the encode pool (any thread),
+        so copying them is a cache hit. Runs once per size per session.
+        """
+        animated_format = self.clipboard_format
+        if (size_label, animated_format) in self._prewarmed: return
+        self._prewarmed.add((size_label, animated_format))
+
+        def task():
+            sources = prewarm_sources(self.app.library_data)
+            for source in sources:
+                self.app.client.transcoder.submit(convert_for_clipboard, source, size_label, animated_format)
+            if sources: logger.info(f"Clipboard cache: prewarming {len(sources)} stickers at '{size_label}'")
+        threading.Thread(target=task, daemon=True).start()
 
     def copy_sticker(self):
         """Copies the currently selected sticker to the clipboard."""
@@ -30,7 +61,7 @@ class ActionManager:
         if hasattr(self.app, 'details_manager'):
             size_label = self.app.details_manager.sticker_layout.size_var.get()
         
-        final_path = resize_image_to_temp(path, size_label)
+        final_path = resize_image_to_temp(path, size_label, self.clipboard_format)
         if final_path:
             copy_to_clipboard(final_path)
             
@@ -46,6 +77,7 @@ class ActionManager:
             # SUCCESS NOTIFICATION with DETAILS
             sticker_name = data.get('custom_name', 'Sticker')
             ToastNotification(self.app, "Copied", f"'{sticker_name}' ({size_label}) copied to clipboard.")
+            self.prewarm_clipboard(size_label) # First copy at a new size: convert the usual picks too
 
     def show_file(self):
         """Opens the file explorer to the selected sticker's location."""
@@ -66,12 +98,8 @@ class ActionManager:
         # choice tuple: (sticker_data, pack_tname, index_in_pack)
         
         # Resolve full path
-        base = BASE_DIR / LIBRARY_FOLDER / choice[1]
-        final_path = None
-        for ext in [".png", ".gif", ".webp"]:
-            p = base / f"sticker_{choice[2]}{ext}"
-            if p.exists(): 
-                final_path = str(p); break
+        p = find_sticker_file(choice[1], choice[0], choice[2], [".png", ".gif", ".webp"])
+        final_path = str(p) if p else None
         
         # Update Logic State
         # Item format: (sticker_data, idx, path, pack_tname)
@@ -82,4 +110,80 @@ class ActionManager:
         self.app.logic.current_sticker_path = final_path
         
         # Refresh UI to show the selection
-        self.app.details_manager.update_details_panel()
\ No newline at end of file
+        self.app.details_manager.update_details_panel()
+
+    # ==========================================================================
+    #   EXPORT (Archives)
+    # ==========================================================================
+
+    def _export_source(self, scope: str):
+        """Returns (title, export items) for 'pack', 'collection' or 'view' (what the grid currently shows)."""
+        logic = self.app.logic
+        if scope == "pack" and logic.current_pack_data:
+            tags = logic.current_pack_data.get('tags', [])
+            if "System" in tags and "Aggregated" in tags: # Virtual 'All Stickers' pack
+                return "All Stickers", pack_items(self.app.library_data)
+            return logic.current_pack_data.get('name', "Pack"), pack_items([logic.current_pack_data])
+        
+        if scope == "collection" and logic.selected_collection_data:
+            return logic.selected_collection_data['name'], pack_items(logic.selected_collection_data['packs'])
+        
+        if scope == "view":
+            title = self.app.header_title_label.cget("text") or "Export"
+            if self.app.view_mode in ["library", "collection"]:
+                packs = []
+                for item in self.app.filtered_library:
+                    packs.extend(item['packs'] if item.get("type") == "folder" else [item])
+                return title, pack_items(packs)
+            return title, list(self.app.filtered_stickers)
+        
+        return None, []
+
+    def export_stickers(self, scope: str):
+        """
+        Asks for a destination, then streams the scope's stickers into a zip/tar in the background.
+        Calling it again while an export is running cancels that export.
+        """
+        if self.export_thread and self.export_thread.is_alive():
+            self.export_cancel.set()
+            ToastNotification(self.app, "Cancelling", "Stopping the running export...")
+            return
+        
+        title, items = self._export_source(scope)
+        if not items:
+            ToastNotification(self.app, "Nothing to Export", "No stickers in this view.")
+            return
+        
+        safe_name = re.sub(r'[\\/:*?"<>|]+', "_", title).strip() or "Stickers"
+        path = filedialog.asksaveasfilename(
+            parent=self.app, title=f"Export {len(items)} Stickers", defaultextension=".zip",
+            initialfile=f"{safe_name}.zip", filetypes=[("Zip Archive", "*.zip"), ("Tar Archive", "*.tar")]
+        )
+        if not path: return
+        
+        dest = Path(path)
+        if dest.suffix.lower() not in (".zip", ".tar"): dest = dest.with_suffix(".zip")
+        packs = {p['t_name']: p for p in self.app.library_data}
+        self.export_cancel.clear()
+        
+        def on_progress(done, total, written):
+            self.app.after(0, lambda: self.app.update_status_bar(
+                f"Exporting {done}/{total} • {format_bytes(written)}", done / total))
+        
+        def run():
+            try:
+                result = export_stickers(items, packs, dest, on_progress, self.export_cancel)
+                msg = f"{result['exported']} stickers ({format_bytes(result['bytes'])}) to {dest.name}"
+                if result['missing']: msg += f" • {result['missing']} missing"
+                self.app.after(0, lambda: ToastNotification(self.app, "Export Complete", msg))
+            except ExportCancelled:
+                self.app.after(0, lambda: ToastNotification(self.app, "Export Cancelled", dest.name))
+            except Exception as e:
+                logger.error(f"Export failed: {e}", exc_info=True)
+                err = str(e)
+                self.app.after(0, lambda: ToastNotification(self.app, "Export Failed", err))
+            finally:
+                self.app.after(0, lambda: self.app.update_status_bar("Ready"))
+        
+        self.export_thread = threading.Thread(target=run, daemon=True, name="StickerExport")
+        self.export_thread.start()
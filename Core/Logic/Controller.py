@@ -1,7 +1,8 @@
 import customtkinter as ctk
 import random
 from Core.Config import SETTINGS_FILE, save_json, load_json
-from UI.ViewUtils import apply_theme_palette
+from UI.ViewUtils import apply_theme_palette, AtlasLoader
+from UI.CardsPanel.Utils import CardUtils, DEFAULT_ANIMATION_QUALITY
 
 # --- Import New Sub-Managers ---
 from .Library import LibraryManager
@@ -66,11 +67,16 @@ class AppLogic:
         self.app_token = data.get("token", "")
         if hasattr(self.app, 'client'): 
             self.app.client.set_token(self.app_token)
+            self.app.client.set_transport(data.get("download_engine", "Threaded"))
+            self.app.client.set_storage_profile(data.get("storage_profile", "Passthrough"))
             
         self.current_theme_name = data.get("theme_name", "Classic")
         apply_theme_palette(self.current_theme_name) 
         
         self.nsfw_enabled = data.get("nsfw_enabled", False)
+        AtlasLoader.enabled = data.get("thumbnail_atlas", True)
+        CardUtils.animation_quality = {**DEFAULT_ANIMATION_QUALITY, **data.get("animation_quality", {})}
+        self.actions.clipboard_format = data.get("clipboard_format", "GIF")
         
         # Load Custom Covers into memory
         self.custom_covers = data.get("custom_covers", {})
@@ -84,6 +90,11 @@ class AppLogic:
             "token": self.app.client.token if hasattr(self.app, 'client') else "",
             "theme_name": self.current_theme_name,
             "nsfw_enabled": self.nsfw_enabled,
+            "download_engine": self.app.client.transport_name if hasattr(self.app, 'client') else "Threaded",
+            "storage_profile": self.app.client.storage_profile if hasattr(self.app, 'client') else "Passthrough",
+            "thumbnail_atlas": AtlasLoader.enabled,
+            "animation_quality": CardUtils.animation_quality,
+            "clipboard_format": self.actions.clipboard_format,
             # Preserve any unknown data that might be in the file
             "custom_theme_data": load_json(SETTINGS_FILE).get("custom_theme_data", {}),
             # Save memory cache back to file
@@ -221,6 +232,8 @@ class AppLogic:
     def show_file(self): return self.actions.show_file()
     def open_url(self, e=None): return self.actions.open_url(e)
     def select_random_sticker(self): return self.actions.select_random_sticker()
+    def export_stickers(self, scope): return self.actions.export_stickers(scope)
+    def prewarm_clipboard(self, size_label="Original"): return self.actions.prewarm_clipboard(size_label)
 
     # ==========================================================================
     #   DELEGATES: UPDATER (Network)
@@ -228,6 +241,10 @@ class AppLogic:
 
     def add_pack_from_url(self, urls): return self.updater.add_pack_from_url(urls)
     def trigger_redownload(self): return self.updater.trigger_redownload()
+    def resume_incomplete_downloads(self): return self.updater.resume_incomplete_downloads()
+    def import_local(self, paths): return self.updater.import_local(paths)
+    def open_queue(self): return self.updater.open_queue()
+    def update_download_priority(self): return self.updater.update_download_priority()
     def update_all_packs(self): return self.updater.update_all_packs()
 
     # ==========================================================================
@@ -266,6 +283,7 @@ class AppLogic:
             self.app.card_manager.highlight_selected_cards()
         if hasattr(self.app, 'details_manager'): 
             self.app.details_manager.update_details_panel()
+        self.update_download_priority()
 
     def open_collection(self, folder_data):
         self.current_collection_data = folder_data
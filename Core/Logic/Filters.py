@@ -370,7 +370,7 @@ class FilterManager:
         
     def get_most_used_stickers(self, limit=10):
         # Scan entire library for usage stats
-        from Core.Config import BASE_DIR, LIBRARY_FOLDER # Import here to avoid cycle
+        from Core.Config import find_sticker_file # Import here to avoid cycle
         
         all_s = []
         for p in self.app.library_data:
@@ -382,13 +382,8 @@ class FilterManager:
         
         results = []
         for s, tname, pname, idx in all_s[:limit]:
-            base = BASE_DIR / LIBRARY_FOLDER / tname
-            path_str = None
-            for ext in [".png", ".gif", ".webp"]:
-                p_check = base / f"sticker_{idx}{ext}"
-                if p_check.exists(): 
-                    path_str = str(p_check)
-                    break
+            p_check = find_sticker_file(tname, s, idx, [".png", ".gif", ".webp"])
+            path_str = str(p_check) if p_check else None
                     
             results.append({
                 "name": s.get('custom_name', "Sticker"), 
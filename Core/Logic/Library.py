@@ -3,7 +3,8 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 from Core.Config import save_json, load_json, SETTINGS_FILE, logger
-from UI.ViewUtils import COLORS, is_system_tag, ToastNotification
+from Core.ThumbCache import drop_pack_thumbnails
+from UI.ViewUtils import COLORS, is_system_tag, ToastNotification, AtlasLoader
 from UI.DetailPanel.Elements import update_fav_btn
 
 class LibraryManager:
@@ -474,6 +475,9 @@ class LibraryManager:
     def perform_remove(self):
         if self.app.logic.current_pack_data in self.app.library_data:
             self.app.library_data.remove(self.app.logic.current_pack_data)
+            pack_tname = self.app.logic.current_pack_data.get('t_name', '')
+            drop_pack_thumbnails(pack_tname)
+            AtlasLoader.invalidate(pack_tname) # Decoded sheets live in memory, not in the dropped folder
             
             # TRIGGER REBUILD: Ensure tags from this deleted pack are removed from global list
             self._rebuild_tag_cache()
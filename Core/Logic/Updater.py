@@ -1,7 +1,11 @@
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Union, List
 
-from Core.Downloader import DownloadManager
+from Core.Config import logger, sticker_file_stem
+from Core.Downloader import DownloadManager, sticker_key
+from Core.Importer import sources_summary
 from UI.ViewUtils import ToastNotification
 
 class UpdateManager:
@@ -10,6 +14,10 @@ class UpdateManager:
     Responsible for interfacing with the DownloadManager and checking for updates.
     """
 
+    # Bulk check tuning
+    CHECK_WORKERS = 8                 # Parallel getStickerSet calls (rate limited by StickerClient)
+    RECHECK_INTERVAL = 6 * 60 * 60    # Skip packs checked in the last 6 hours
+
     def __init__(self, app):
         self.app = app
         # Initialize the heavy-lifting Downloader (which runs in its own thread)
@@ -41,69 +49,165 @@ class UpdateManager:
             existing = next((p for p in self.app.library_data if p['t_name'] == potential_name), None)
             
             if existing:
-                self.downloader.add_to_queue(existing, "update")
-                existing_updated = True
+                if self.downloader.add_to_queue({"pack": existing}, "sync"):
+                    existing_updated = True
                 # Notify per-pack only if singular, else wait for summary
                 if len(urls) == 1:
                     ToastNotification(self.app, "Duplicate", f"Updating existing pack: {existing['name']}")
-            else:
-                self.downloader.add_to_queue(clean_url, "new")
+            elif self.downloader.add_to_queue(clean_url, "new"):
                 queued_count += 1
         
         # Summary Notification
         if queued_count > 0:
-            ToastNotification(self.app, "Queue Started", f"Processing {len(urls)} packs")
+            ToastNotification(self.app, "Queue Started", f"Processing {queued_count} packs")
         elif len(urls) > 1 and existing_updated:
             ToastNotification(self.app, "Updates Queued", "Refreshing existing packs.")
+        elif len(urls) > 1:
+            ToastNotification(self.app, "Already Queued", "These packs are already in the download queue.")
 
     def trigger_redownload(self):
         """Forces a re-download of the currently viewed pack."""
         if self.app.logic.current_pack_data:
-            self.downloader.add_to_queue(self.app.logic.current_pack_data, "update")
-            # SUCCESS NOTIFICATION HERE
-            ToastNotification(self.app, "Queued", "Download Queued Successfully.")
+            if self.app.logic.current_pack_data.get('source') == "local":
+                ToastNotification(self.app, "Local Pack", "Imported packs have no Telegram source.")
+                return
+            if self.downloader.add_to_queue(self.app.logic.current_pack_data, "update"):
+                # SUCCESS NOTIFICATION HERE
+                ToastNotification(self.app, "Queued", "Download Queued Successfully.")
+            else:
+                ToastNotification(self.app, "Already Queued", "This pack is already in the download queue.")
             
+    def resume_incomplete_downloads(self):
+        """
+        Restores the download queue saved by the last session (interrupted items restart),
+        then queues any pack still marked as not downloaded that the saved queue missed.
+        """
+        if not self.app.client.token: return
+        
+        restored = self.downloader.restore_queue()
+        pending = [p for p in self.app.library_data if not p.get('downloaded', True) and p.get('source') != "local"]
+        added = sum(1 for pack in pending if self.downloader.add_to_queue(pack, "update")) # Already-restored packs dedupe
+        
+        if restored + added:
+            ToastNotification(self.app, "Resuming", f"Resuming {restored + added} unfinished downloads.")
+
+    def open_queue(self):
+        self.app.popup_manager.open_queue_modal(self.downloader)
+
+    def update_download_priority(self):
+        """
+        Tells the downloader what the user is looking at: the selected sticker first,
+        then the stickers on the current gallery page. Those are fetched before the rest of their pack
+        (hints are kept, so a download that starts later still honors them).
+        """
+        hints = {}
+        for sticker, idx, _, pack_tname in self.app.logic.selected_stickers[-1:]:
+            hints.setdefault(pack_tname, []).append(sticker_file_stem(sticker, idx))
+        if self.app.view_mode not in ["library", "collection"]:
+            for sticker, pack_tname, idx in self.app.logic.get_current_page_items():
+                hints.setdefault(pack_tname, []).append(sticker_file_stem(sticker, idx))
+        self.app.client.set_download_priority(hints)
+
+    def import_local(self, paths: List[str]):
+        """Queues folders / zip / tar archives for import as local packs (no token needed)."""
+        summary = sources_summary(paths)
+        if summary["rejected"]:
+            names = ", ".join(p.name for p in summary["rejected"][:3])
+            ToastNotification(self.app, "Skipped", f"Not a folder or archive: {names}")
+        if not summary["sources"]: return
+        
+        if not self.downloader.add_to_queue([str(p) for p in summary["sources"]], "import"):
+            ToastNotification(self.app, "Already Queued", "These sources are already being imported.")
+            return
+        ToastNotification(self.app, "Import Started", f"Importing {len(summary['sources'])} source(s)")
+
     def update_all_packs(self):
         """Opens the update modal which runs _run_update_check."""
         self.app.popup_manager.open_update_modal(self._run_update_check)
 
-    def _run_update_check(self, progress_callback, status_callback, finish_callback):
+    def _run_update_check(self, progress_callback, status_callback, finish_callback, detail_callback=None):
         """
         Background task to check every pack in the library against the Telegram API.
-        If the sticker count differs, it queues an update.
+        If the sticker set differs (added, removed, reordered or edited), it queues a delta sync.
+        
+        - Metadata is fetched by a bounded pool of workers (rate limited by StickerClient).
+        - Packs checked within RECHECK_INTERVAL are skipped; 'last_checked' is persisted per pack
+          (for changed packs, by the delta sync once it completes).
+        - Throughput and ETA are reported through detail_callback.
         """
         def _check():
-            total = len(self.app.library_data)
+            now = time.time()
+            packs = [p for p in self.app.library_data if p.get('source') != "local"] # Local imports have no Telegram set
+            due = [p for p in packs if now - p.get('last_checked', 0) >= self.RECHECK_INTERVAL]
+            skipped = len(packs) - len(due)
+            total = len(due)
+            
             updates_found = 0
+            failed = 0
+            done = 0
+            started = time.monotonic()
             
-            for i, pack in enumerate(self.app.library_data):
-                if status_callback: 
-                    status_callback(f"Checking: {pack.get('name')}")
-                if progress_callback: 
-                    progress_callback(i / total)
+            if status_callback:
+                status_callback(f"Checking {total} packs ({skipped} recently checked)")
+            
+            def check_one(pack):
+                return pack, self.app.client.get_pack_by_name(pack.get('t_name'))
+            
+            with ThreadPoolExecutor(max_workers=self.CHECK_WORKERS, thread_name_prefix="UpdateCheck") as executor:
+                futures = [executor.submit(check_one, p) for p in due]
                 
-                try:
-                    # Fetch remote metadata
-                    remote = self.app.client.get_pack_by_name(pack.get('t_name'))
+                for future in as_completed(futures):
+                    done += 1
+                    pack = None
+                    try:
+                        pack, remote = future.result()
+                        if not remote:
+                            failed += 1
+                        # Compare identity + emoji per sticker (catches same-count edits and reorders)
+                        elif self._has_remote_changes(pack, remote):
+                            # Queue for delta sync (the worker merges metadata, not this thread, and
+                            # stamps 'last_checked' once it succeeds, so a failed sync is retried next time)
+                            # Already-queued packs only refresh their metadata and aren't counted again
+                            if self.downloader.add_to_queue({"pack": pack, "remote": remote}, "sync"):
+                                updates_found += 1
+                        else:
+                            pack['last_checked'] = time.time() # Up to date: nothing left to sync
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Update check failed: {e}")
                     
-                    # Compare counts (simple heuristic for updates)
-                    if remote and len(remote.get('stickers', [])) != pack.get('count', 0):
-                        # Update metadata immediately
-                        pack['stickers'] = remote['stickers']
-                        pack['count'] = len(remote['stickers'])
-                        
-                        # Queue for file download
-                        self.downloader.add_to_queue(pack, "update")
-                        updates_found += 1
-                except Exception: 
-                    pass
+                    if progress_callback: 
+                        progress_callback(done / total)
+                    if detail_callback:
+                        elapsed = max(time.monotonic() - started, 1e-6)
+                        rate = done / elapsed
+                        eta = (total - done) / rate if rate > 0 else 0
+                        detail_callback(f"{done}/{total} • {rate:.1f} packs/s • ETA {self._format_eta(eta)} • {updates_found} updates")
+                    if status_callback and pack:
+                        status_callback(f"Checking: {pack.get('name')}")
+            
+            # Persist 'last_checked' timestamps
+            self.app.client.save_library(self.app.library_data)
             
             if progress_callback: progress_callback(1.0)
             
             final_msg = f"Queued {updates_found} updates." if updates_found > 0 else "Library is up to date."
+            if failed: final_msg += f" ({failed} failed)"
             if status_callback: status_callback(final_msg)
             
             # Close modal after delay
             self.app.after(1500, finish_callback)
             
-        threading.Thread(target=_check, daemon=True).start()
\ No newline at end of file
+        threading.Thread(target=_check, daemon=True).start()
+
+    @staticmethod
+    def _format_eta(seconds: float) -> str:
+        seconds = int(seconds)
+        if seconds >= 60: return f"{seconds // 60}m {seconds % 60}s"
+        return f"{seconds}s"
+
+    @staticmethod
+    def _has_remote_changes(pack, remote) -> bool:
+        local_sig = [(sticker_key(s), s.get('emoji')) for s in pack.get('stickers', [])]
+        remote_sig = [(sticker_key(s), s.get('emoji')) for s in remote.get('stickers', [])]
+        return local_sig != remote_sig
\ No newline at end of file
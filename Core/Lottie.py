@@ -0,0 +1,74 @@
+import os
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from Core.Transcode import write_atomic
+
+# Optional dependency: TGS stickers stay as placeholders without it (pip install rlottie-python)
+try:
+    from rlottie_python import LottieAnimation
+except ImportError:
+    LottieAnimation = None
+
+# ==============================================================================
+#   TGS PREVIEW SETTINGS
+# ==============================================================================
+# One preview per sticker, rendered at the largest card size; smaller views downscale it.
+PREVIEW_SIZE = 320
+PREVIEW_FPS = 30                 # Telegram renders TGS at 60 fps; half is plenty for previews
+PREVIEW_MAX_FRAMES = 90          # TGS are at most 3 seconds
+PREVIEW_SUFFIX = ".preview.webp" # 'sticker_3.tgs' -> 'sticker_3.preview.webp' (not a sticker extension)
+PREVIEW_QUALITY = {"quality": 80, "method": 4}
+
+def is_available() -> bool:
+    return LottieAnimation is not None
+
+def preview_path(tgs_path: str) -> Path:
+    p = Path(tgs_path)
+    return p.with_name(p.stem + PREVIEW_SUFFIX)
+
+def is_preview_file(path: Path) -> bool:
+    """Rendered previews live beside stickers; folder listings must skip them."""
+    return path.name.lower().endswith(PREVIEW_SUFFIX)
+
+def cached_preview(tgs_path: str) -> Optional[str]:
+    """Existing preview that is newer than its source, or None."""
+    preview = preview_path(tgs_path)
+    try:
+        if preview.stat().st_mtime >= os.stat(tgs_path).st_mtime: return str(preview)
+    except OSError:
+        pass
+    return None
+
+# ==============================================================================
+#   RENDERING (Runs inside the process pool - must stay picklable)
+# ==============================================================================
+
+def render_tgs_preview(tgs_path: str, size: int = PREVIEW_SIZE) -> Dict[str, Any]:
+    """
+    Rasterizes a .tgs (gzipped Lottie JSON) into an animated WebP next to it.
+    Returns {"path": preview path, "frames": frame count, "render_time": seconds}.
+    """
+    if LottieAnimation is None: raise RuntimeError("rlottie-python is not installed")
+
+    start = time.perf_counter()
+    frames = []
+    with LottieAnimation.from_tgs(tgs_path) as anim:
+        total = anim.lottie_animation_get_totalframe()
+        source_fps = anim.lottie_animation_get_framerate() or 60
+        step = max(1, round(source_fps / PREVIEW_FPS))
+        for frame_num in range(0, total, step):
+            if len(frames) >= PREVIEW_MAX_FRAMES: break
+            frames.append(anim.render_pillow_frame(frame_num=frame_num, width=size, height=size))
+
+    if not frames: raise ValueError("TGS has no frames")
+
+    buffer = BytesIO()
+    duration = int(round(1000 * step / source_fps))
+    frames[0].save(buffer, "WEBP", save_all=True, append_images=frames[1:], duration=duration, loop=0, **PREVIEW_QUALITY)
+
+    output = preview_path(tgs_path)
+    write_atomic(output, buffer.getvalue())
+    return {"path": str(output), "frames": len(frames), "render_time": time.perf_counter() - start}
@@ -0,0 +1,184 @@
+import random
+import threading
+import time
+from typing import Optional, Dict, Any, Mapping
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Core.Config import logger
+
+# ==============================================================================
+#   RATE LIMITING
+# ==============================================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    - acquire() blocks the calling thread until a request may be sent.
+    - pause() stalls every caller, used when Telegram answers 429 with 'retry_after'.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate                      # Tokens added per second
+        self.capacity = capacity or rate      # Max burst size
+
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Blocks all callers for 'seconds' and drains the bucket."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._last = self._blocked_until
+            self._tokens = 0
+
+# ==============================================================================
+#   RETRY POLICY & DIAGNOSTICS
+# ==============================================================================
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient failures
+    (connection errors, timeouts, 5xx and 429).
+    Jitter keeps parallel workers from retrying in lockstep.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    SERVER_ERRORS = frozenset({500, 502, 503, 504})
+
+    def __init__(self, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number 'attempt' (0-based). Server hints win."""
+        if retry_after: return min(float(retry_after), self.max_delay * 4)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+def parse_retry_after(headers: Mapping[str, str], body: Any = None) -> Optional[float]:
+    """Reads 'Retry-After' or Telegram's JSON 'parameters.retry_after'."""
+    if isinstance(body, dict):
+        hint = (body.get("parameters") or {}).get("retry_after")
+        if hint: return float(hint)
+    try:
+        return float(headers.get("Retry-After", ""))
+    except (TypeError, ValueError):
+        return None
+
+class HttpStats:
+    """
+    Thread-safe request counters per request kind ("api", "getFile", "file").
+    Exposed for diagnostics: count, failures, retries and latency (incl. retries).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+
+    def record(self, kind: str, latency: float, retries: int, ok: bool):
+        with self._lock:
+            entry = self._data.setdefault(kind, {"count": 0, "failures": 0, "retries": 0, "total_latency": 0.0, "max_latency": 0.0})
+            entry["count"] += 1
+            entry["retries"] += retries
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            if not ok: entry["failures"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for kind, entry in self._data.items():
+                result[kind] = dict(entry)
+                result[kind]["avg_latency"] = entry["total_latency"] / entry["count"] if entry["count"] else 0.0
+            return result
+
+    def summary(self) -> str:
+        parts = []
+        for kind, e in self.snapshot().items():
+            parts.append(f"{kind}: {int(e['count'])} req, {int(e['retries'])} retries, {int(e['failures'])} failed, avg {e['avg_latency'] * 1000:.0f}ms")
+        return " | ".join(parts) or "No requests yet"
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+# ==============================================================================
+#   POOLED HTTP TRANSPORT (Threaded Engine)
+# ==============================================================================
+
+class HttpTransport:
+    """
+    The Networker.
+    One requests.Session with a connection pool sized to the worker count.
+    - Keep-alive: connections are reused across requests (Session default).
+    - Per-host limit: pool_maxsize connections per host, extra callers wait (pool_block)
+      instead of opening throwaway connections ("Connection pool is full" warnings).
+    - Every request goes through RetryPolicy and is recorded in HttpStats.
+    """
+
+    def __init__(self, pool_size: int, policy: Optional[RetryPolicy] = None, stats: Optional[HttpStats] = None):
+        self.pool_size = pool_size
+        self.policy = policy or RetryPolicy()
+        self.stats = stats or HttpStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, kind: str, params: Optional[Dict[str, Any]] = None, timeout: Any = None,
+            retry_statuses: frozenset = RetryPolicy.RETRY_STATUSES) -> requests.Response:
+        """
+        GET with retries. Returns the last response (callers check status as before);
+        raises the last requests.RequestException if every attempt failed to connect.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.get(url, params=params, timeout=timeout)
+                if resp.status_code not in retry_statuses or attempt >= self.policy.max_retries:
+                    self.stats.record(kind, time.monotonic() - start, attempt, resp.ok)
+                    return resp
+                
+                body = None
+                if resp.status_code == 429:
+                    try: body = resp.json()
+                    except ValueError: pass
+                wait = self.policy.delay(attempt, parse_retry_after(resp.headers, body))
+                reason = f"HTTP {resp.status_code}"
+                resp.close()
+
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt >= self.policy.max_retries:
+                    self.stats.record(kind, time.monotonic() - start, attempt, False)
+                    raise
+                wait = self.policy.delay(attempt)
+                reason = type(e).__name__
+
+            attempt += 1
+            logger.debug(f"Retrying {kind} request in {wait:.2f}s ({reason}, attempt {attempt}/{self.policy.max_retries})")
+            time.sleep(wait)
+
+    def close(self):
+        self.session.close()
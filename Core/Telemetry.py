@@ -0,0 +1,217 @@
+import csv
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Deque, Tuple
+
+from Core.Config import logger
+
+# Pipeline stages, in order. 'bytes' is only meaningful for 'transfer' and 'write'.
+STAGES = ["getFile", "transfer", "encode", "write"]
+
+# Which resource a stage waits on (used to name the bottleneck)
+STAGE_BOUND = {"getFile": "API-bound", "transfer": "Network-bound", "encode": "CPU-bound", "write": "Disk-bound"}
+
+class StageStats:
+    """Running aggregate for one stage: count, total/min/max seconds, bytes."""
+
+    __slots__ = ("count", "total", "min", "max", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self.bytes = 0
+
+    def add(self, seconds: float, nbytes: int = 0):
+        self.min = seconds if self.count == 0 else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.count += 1
+        self.total += seconds
+        self.bytes += nbytes
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count, "total_s": self.total,
+            "avg_ms": (self.total / self.count * 1000) if self.count else 0.0,
+            "min_ms": self.min * 1000, "max_ms": self.max * 1000, "bytes": self.bytes
+        }
+
+class PackTelemetry:
+    """Per-pack aggregates plus a rolling window of completions for live rate/ETA."""
+
+    WINDOW_SECONDS = 10.0
+
+    def __init__(self, name: str, total: int):
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.stages: Dict[str, StageStats] = {s: StageStats() for s in STAGES}
+        # Rolling windows for live rates: finished stickers, and (timestamp, bytes) per transfer
+        self._recent_done: Deque[float] = deque()
+        self._recent_bytes: Deque[Tuple[float, int]] = deque()
+
+    def rates(self) -> Tuple[float, float]:
+        """(stickers/sec, bytes/sec) over the rolling window (whole run once finished)."""
+        if self.finished:
+            elapsed = max(self.finished - self.started, 1e-6)
+            return self.done / elapsed, self.stages["transfer"].bytes / elapsed
+
+        now = time.monotonic()
+        while self._recent_done and now - self._recent_done[0] > self.WINDOW_SECONDS:
+            self._recent_done.popleft()
+        while self._recent_bytes and now - self._recent_bytes[0][0] > self.WINDOW_SECONDS:
+            self._recent_bytes.popleft()
+        
+        span = max(min(now - self.started, self.WINDOW_SECONDS), 1e-6)
+        return len(self._recent_done) / span, sum(b for _, b in self._recent_bytes) / span
+
+    def eta(self) -> Optional[float]:
+        rate, _ = self.rates()
+        remaining = self.total - self.done
+        if remaining <= 0: return 0.0
+        return remaining / rate if rate > 0 else None
+
+class DownloadTelemetry:
+    """
+    The Stopwatch.
+    Thread-safe per-stage timing for the download pipeline (getFile, transfer,
+    encode, write), aggregated per pack and for the whole session.
+    Answers "is this import network-, API- or CPU-bound?" and feeds the status bar ETA.
+    """
+
+    MAX_PACKS = 200 # Per-pack history kept for the diagnostics panel / CSV
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.session_started = time.monotonic()
+        self.session: Dict[str, StageStats] = {s: StageStats() for s in STAGES}
+        self.session_stickers = 0
+        self.packs: Dict[str, PackTelemetry] = {}
+
+    # ==========================================================================
+    #   RECORDING (Called from worker threads)
+    # ==========================================================================
+
+    def start_pack(self, pack: str, total: int):
+        with self._lock:
+            self.packs.pop(pack, None) # Re-inserted last = most recent
+            self.packs[pack] = PackTelemetry(pack, total)
+            while len(self.packs) > self.MAX_PACKS:
+                self.packs.pop(next(iter(self.packs)))
+
+    def record(self, pack: str, stage: str, seconds: float, nbytes: int = 0):
+        with self._lock:
+            self.session[stage].add(seconds, nbytes)
+            p = self.packs.get(pack)
+            if p:
+                p.stages[stage].add(seconds, nbytes)
+                if stage == "transfer": p._recent_bytes.append((time.monotonic(), nbytes))
+
+    def record_result(self, pack: str, result: Dict[str, Any]):
+        """Stores the encode/write timings a transcode worker sent back."""
+        if result.get("encode_time"): self.record(pack, "encode", result["encode_time"])
+        self.record(pack, "write", result.get("write_time", 0.0), result.get("size", 0))
+
+    def sticker_done(self, pack: str):
+        """One sticker left the pipeline (saved or failed)."""
+        with self._lock:
+            self.session_stickers += 1
+            p = self.packs.get(pack)
+            if p:
+                p.done += 1
+                p._recent_done.append(time.monotonic())
+
+    def finish_pack(self, pack: str):
+        with self._lock:
+            p = self.packs.get(pack)
+            if p and not p.finished: p.finished = time.monotonic()
+        logger.info(f"Telemetry '{pack}': {self.format_pack_status(pack)} ({self.bottleneck(pack)})")
+
+    # ==========================================================================
+    #   REPORTING
+    # ==========================================================================
+
+    def format_pack_status(self, pack: str) -> str:
+        """Compact live text for the status bar, e.g. '12.5 st/s • 1.3 MB/s • ETA 0:08'."""
+        with self._lock:
+            p = self.packs.get(pack)
+            if not p: return ""
+            rate, bps = p.rates()
+            eta = p.eta()
+
+        parts = [f"{rate:.1f} st/s", f"{format_bytes(bps)}/s"]
+        if not p.finished: parts.append(f"ETA {format_duration(eta)}" if eta is not None else "ETA --")
+        return " • ".join(parts)
+
+    def bottleneck(self, pack: Optional[str] = None) -> str:
+        """Stage with the most accumulated time ('API-bound', 'Network-bound', ...)."""
+        with self._lock:
+            stages = self.packs[pack].stages if pack in self.packs else self.session
+            busiest = max(STAGES, key=lambda s: stages[s].total)
+            if stages[busiest].total == 0: return "No data"
+            return STAGE_BOUND[busiest]
+
+    def session_summary(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self.session_started
+            return {
+                "stickers": self.session_stickers,
+                "bytes": self.session["transfer"].bytes,
+                "elapsed_s": elapsed,
+                "stages": {s: self.session[s].as_dict() for s in STAGES}
+            }
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Flat table (one row per scope+stage) for the diagnostics panel and CSV export."""
+        with self._lock:
+            scopes = [("Session", self.session, self.session_stickers)]
+            scopes += [(p.name, p.stages, p.done) for p in reversed(list(self.packs.values()))]
+            rows = []
+            for scope, stages, done in scopes:
+                for stage in STAGES:
+                    row = {"scope": scope, "stage": stage, "stickers": done}
+                    row.update(stages[stage].as_dict())
+                    rows.append(row)
+            return rows
+
+    def export_csv(self, path: Path) -> bool:
+        rows = self.rows()
+        if not rows: return False
+        try:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                writer.writeheader()
+                writer.writerows(rows)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to export telemetry CSV: {e}")
+            return False
+
+    def reset(self):
+        with self._lock:
+            self.session_started = time.monotonic()
+            self.session = {s: StageStats() for s in STAGES}
+            self.session_stickers = 0
+            self.packs.clear()
+
+# ==============================================================================
+#   FORMATTING HELPERS
+# ==============================================================================
+
+def format_bytes(n: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None: return "--"
+    seconds = int(seconds)
+    if seconds >= 3600: return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
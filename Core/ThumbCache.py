@@ -0,0 +1,371 @@
+import hashlib
+import json
+import math
+import shutil
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Tuple, Iterable, List, Dict, Any
+
+from PIL import Image
+
+from Core.Config import BASE_DIR, LIBRARY_FOLDER, CACHE_FOLDER, logger
+from Core.Lottie import PREVIEW_SUFFIX
+from Core.Transcode import write_atomic
+
+# Optional dependency: video stickers keep a "VIDEO" placeholder without it (pip install opencv-python)
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# ==============================================================================
+#   THUMBNAIL TIERS
+# ==============================================================================
+# Pre-scaled copies of static stickers, so cards decode a small file instead of the
+# 512px original. Tiers follow the card sizes (List / Small / Normal / Large) plus the
+# detail panel; a request uses the smallest tier at least as large as it needs.
+THUMB_TIERS = (48, 180, 240, 320, 400)
+THUMB_DIR = BASE_DIR / CACHE_FOLDER / "thumbs"
+THUMB_FORMAT = {"format": "WEBP", "quality": 90, "method": 4}
+THUMB_SOURCES = (".png", ".webp", ".jpg", ".jpeg") # Static formats only (animations have their own path)
+
+# Atlases: one sprite sheet per pack and small tier, so a gallery page is one read + one decode.
+# Larger tiers would make that single decode heavier than loading a page of separate files.
+ATLAS_TIERS = (48, 180)
+ATLAS_MAX_CELLS = 256          # Bigger folders (e.g. large imports) keep per-file thumbnails
+ATLAS_BLOCK = 16               # Cells are padded to WebP's 16px blocks so lossy edges never bleed
+ATLAS_FORMAT = {"format": "WEBP", "quality": 90, "method": 4}
+
+# Video stickers: one small animated WebP preview + a poster frame per file, rendered once.
+# Both end in PREVIEW_SUFFIX, so they are never thumbnailed themselves.
+VIDEO_SOURCES = (".webm", ".mp4", ".mkv")
+VIDEO_PREVIEW_SIZE = 320
+VIDEO_PREVIEW_MAX_FRAMES = 45   # Sampled evenly across the clip (15 fps for a 3 s sticker)
+VIDEO_SEEK_STRIDE = 8           # Closer samples are reached by grabbing forward (a seek re-decodes from a keyframe)
+VIDEO_PREVIEW_FORMAT = {"quality": 80, "method": 4}
+
+def is_cacheable(path: str) -> bool:
+    p = path.lower()
+    return p.endswith(THUMB_SOURCES) and not p.endswith(PREVIEW_SUFFIX) # TGS previews are animated
+
+def tier_for(size: Tuple[int, int]) -> Optional[int]:
+    """Smallest tier that covers 'size', or None if only the original is big enough."""
+    need = max(size)
+    return next((t for t in THUMB_TIERS if t >= need), None)
+
+def _pack_of(source: Path) -> str:
+    """Cache sub-folder: the pack a library file belongs to, so removing a pack drops its thumbnails."""
+    try:
+        return source.resolve().relative_to((BASE_DIR / LIBRARY_FOLDER).resolve()).parts[0]
+    except (ValueError, IndexError, OSError):
+        return "_other"
+
+def _names(source: Path) -> Optional[Tuple[Path, str, str]]:
+    """(pack folder, path id, version id). Version changes with mtime/size, so edited files re-thumbnail."""
+    try:
+        st = source.stat()
+    except OSError:
+        return None
+    path_id = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:16]
+    return THUMB_DIR / _pack_of(source), path_id, _version(st)
+
+def _version(st) -> str:
+    return hashlib.sha1(f"{st.st_mtime_ns}|{st.st_size}".encode("ascii")).hexdigest()[:8]
+
+# ==============================================================================
+#   LOOKUP & GENERATION
+# ==============================================================================
+
+def cached_thumbnail(path: str, size: Tuple[int, int]) -> Optional[str]:
+    """Existing thumbnail for 'size' (no work done), or None."""
+    tier = tier_for(size)
+    names = _names(Path(path)) if tier and is_cacheable(path) else None
+    if not names: return None
+    folder, path_id, version = names
+    thumb = folder / f"{path_id}_{version}_{tier}.webp"
+    return str(thumb) if thumb.exists() else None
+
+def has_thumbnails(path: str) -> bool:
+    """True if every tier of the file's current version exists (build_thumbnails has nothing to do)."""
+    names = _names(Path(path)) if is_cacheable(path) else None
+    if not names: return False
+    folder, path_id, version = names
+    return all((folder / f"{path_id}_{version}_{tier}.webp").exists() for tier in THUMB_TIERS)
+
+def thumbnail_for(path: str, size: Tuple[int, int]) -> str:
+    """Thumbnail for 'size', generating all tiers on a miss. Falls back to the original file."""
+    cached = cached_thumbnail(path, size)
+    if cached: return cached
+    if tier_for(size) and is_cacheable(path):
+        try:
+            build_thumbnails(path)
+        except Exception as e:
+            logger.warning(f"Thumbnail cache: could not build for {path}: {e}")
+        return cached_thumbnail(path, size) or path
+    return path
+
+def build_thumbnails(path: str) -> int:
+    """
+    Writes every tier (one decode, largest tier first, each smaller tier scaled
+    from the previous one). Replaces older versions of the file.
+    Picklable, so downloads can run it in the process pool. Returns tiers written.
+    """
+    source = Path(path)
+    names = _names(source)
+    if not names or not is_cacheable(path): return 0
+    folder, path_id, version = names
+    if all((folder / f"{path_id}_{version}_{tier}.webp").exists() for tier in THUMB_TIERS):
+        return len(THUMB_TIERS) # Up to date: don't decode the source
+
+    with Image.open(source) as img:
+        if getattr(img, "is_animated", False): return 0
+        img.load()
+        current = img.convert("RGBA") if img.mode not in ("RGB", "RGBA") else img.copy()
+
+    folder.mkdir(parents=True, exist_ok=True)
+    for old in folder.glob(f"{path_id}_*.webp"):
+        if not old.name.startswith(f"{path_id}_{version}_"):
+            try: old.unlink()
+            except OSError: pass
+
+    written = 0
+    for tier in sorted(THUMB_TIERS, reverse=True):
+        current.thumbnail((tier, tier), Image.Resampling.LANCZOS) # Never upscales: small sources are stored as-is
+        out = folder / f"{path_id}_{version}_{tier}.webp"
+        if not out.exists():
+            buffer = BytesIO()
+            current.save(buffer, **THUMB_FORMAT)
+            write_atomic(out, buffer.getvalue())
+        written += 1
+    return written
+
+# ==============================================================================
+#   PACK ATLASES (Sprite Sheets)
+# ==============================================================================
+
+def atlas_tier_for(size: Tuple[int, int]) -> Optional[int]:
+    tier = tier_for(size)
+    return tier if tier in ATLAS_TIERS else None
+
+def atlas_key(path: str, size: Tuple[int, int]) -> Optional[Tuple[str, int]]:
+    """(pack folder name, tier) of the atlas that can serve 'path' at 'size', or None."""
+    tier = atlas_tier_for(size)
+    if not tier or not is_cacheable(path): return None
+    pack = _pack_of(Path(path))
+    library = (BASE_DIR / LIBRARY_FOLDER / pack).resolve()
+    return (pack, tier) if pack != "_other" and Path(path).resolve().parent == library else None
+
+def atlas_paths(pack_tname: str, tier: int) -> Tuple[Path, Path]:
+    """(sheet image, offset index) of a pack's atlas."""
+    folder = THUMB_DIR / pack_tname
+    return folder / f"atlas_{tier}.webp", folder / f"atlas_{tier}.json"
+
+def load_atlas_index(pack_tname: str, tier: int) -> Optional[Dict[str, Any]]:
+    """{"tier", "stride", "cells": {file name: {"x", "y", "w", "h", "v"}}} or None."""
+    _, index_path = atlas_paths(pack_tname, tier)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def atlas_cell(index: Dict[str, Any], source: Path) -> Optional[Dict[str, Any]]:
+    """The source's cell if the atlas holds its current version (mtime/size), else None."""
+    cell = index.get("cells", {}).get(source.name)
+    if not cell: return None
+    try:
+        return cell if cell["v"] == _version(source.stat()) else None
+    except OSError:
+        return None
+
+def build_atlas(pack_folder: str, tier: int) -> Dict[str, int]:
+    """
+    (Re)builds the atlas of one pack folder at 'tier'. Incremental: cells whose source
+    is unchanged are copied from the previous sheet, only new or edited files are decoded.
+    Picklable, for the process pool. Returns {"cells", "decoded"}.
+    """
+    folder = Path(pack_folder)
+    sources = sorted(library_sources(folder))
+    sheet_path, index_path = atlas_paths(folder.name, tier)
+    if not sources or len(sources) > ATLAS_MAX_CELLS:
+        for p in (sheet_path, index_path):
+            try: p.unlink()
+            except OSError: pass
+        return {"cells": 0, "decoded": 0}
+
+    old_index = load_atlas_index(folder.name, tier) or {}
+    old_sheet = None
+    if old_index.get("cells") and sheet_path.exists():
+        try:
+            old_sheet = Image.open(sheet_path)
+            old_sheet.load()
+        except Exception:
+            old_sheet = None
+
+    stride = math.ceil(tier / ATLAS_BLOCK) * ATLAS_BLOCK
+    cols = max(1, math.ceil(math.sqrt(len(sources))))
+    rows = math.ceil(len(sources) / cols)
+    sheet = Image.new("RGBA", (cols * stride, rows * stride), (0, 0, 0, 0))
+    cells, decoded = {}, 0
+
+    for n, src in enumerate(sources):
+        source = Path(src)
+        try:
+            version = _version(source.stat())
+            old = old_index.get("cells", {}).get(source.name)
+            if old_sheet is not None and old and old["v"] == version:
+                tile = old_sheet.crop((old["x"], old["y"], old["x"] + old["w"], old["y"] + old["h"]))
+            else:
+                with Image.open(source) as img:
+                    img.seek(0)
+                    tile = img.convert("RGBA")
+                tile.thumbnail((tier, tier), Image.Resampling.LANCZOS)
+                decoded += 1
+        except Exception as e:
+            logger.warning(f"Atlas: skipping {source.name}: {e}")
+            continue
+
+        x, y = (n % cols) * stride, (n // cols) * stride
+        sheet.paste(tile, (x, y))
+        cells[source.name] = {"x": x, "y": y, "w": tile.width, "h": tile.height, "v": version}
+
+    if old_sheet is not None: old_sheet.close()
+    if not decoded and cells == old_index.get("cells"): return {"cells": len(cells), "decoded": 0} # Nothing changed
+
+    sheet_path.parent.mkdir(parents=True, exist_ok=True)
+    buffer = BytesIO()
+    sheet.save(buffer, **ATLAS_FORMAT)
+    write_atomic(sheet_path, buffer.getvalue())
+    write_atomic(index_path, json.dumps({"tier": tier, "stride": stride, "cells": cells}).encode("utf-8"))
+    return {"cells": len(cells), "decoded": decoded}
+
+# ==============================================================================
+#   VIDEO PREVIEWS (Animated WebP + Poster)
+# ==============================================================================
+
+def is_video(path: str) -> bool:
+    return path.lower().endswith(VIDEO_SOURCES)
+
+def video_preview_available() -> bool:
+    return cv2 is not None
+
+def video_preview_paths(path: str) -> Optional[Tuple[Path, Path]]:
+    """(animated preview, poster) for the current version of a video file, or None if it is missing."""
+    names = _names(Path(path))
+    if not names: return None
+    folder, path_id, version = names
+    return folder / f"{path_id}_{version}_video{PREVIEW_SUFFIX}", folder / f"{path_id}_{version}_poster{PREVIEW_SUFFIX}"
+
+def cached_video_preview(path: str) -> Optional[str]:
+    paths = video_preview_paths(path)
+    return str(paths[0]) if paths and paths[0].exists() and paths[1].exists() else None
+
+def cached_video_poster(path: str) -> Optional[str]:
+    paths = video_preview_paths(path)
+    return str(paths[1]) if paths and paths[1].exists() else None
+
+def _sample_video(cap, size: int) -> Tuple[List[Image.Image], float]:
+    """Evenly spaced frames across the clip, and the clip length in seconds."""
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+
+    def to_pil(frame) -> Image.Image:
+        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        return img
+
+    if total <= 0:
+        # Container without a frame count: read through once, keeping scaled frames, then sample
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret: break
+            frames.append(to_pil(frame))
+        total = len(frames)
+        count = min(total, VIDEO_PREVIEW_MAX_FRAMES)
+        return [frames[i * total // count] for i in range(count)], total / fps
+
+    count = min(total, VIDEO_PREVIEW_MAX_FRAMES)
+    frames, pos = [], 0
+    for target in (i * total // count for i in range(count)):
+        if target - pos > VIDEO_SEEK_STRIDE:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            pos = target
+        while pos < target and cap.grab(): pos += 1 # Decode without the colour conversion
+        ret, frame = cap.read()
+        if not ret: break
+        pos += 1
+        frames.append(to_pil(frame))
+    return frames, total / fps
+
+def render_video_preview(path: str, size: int = VIDEO_PREVIEW_SIZE) -> Dict[str, Any]:
+    """
+    Samples a video sticker into an animated WebP preview plus a poster frame in the
+    thumbnail store, replacing previews of older versions of the file.
+    Picklable, for the process pool. Returns {"path", "poster", "frames", "render_time"}.
+    """
+    if cv2 is None: raise RuntimeError("opencv-python is not installed")
+    paths = video_preview_paths(path)
+    if not paths: raise FileNotFoundError(path)
+    preview, poster = paths
+
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened(): raise ValueError("Cannot open video")
+        frames, seconds = _sample_video(cap, size)
+    finally:
+        cap.release()
+    if not frames: raise ValueError("Video has no frames")
+
+    preview.parent.mkdir(parents=True, exist_ok=True)
+    path_id = preview.name.split("_", 1)[0]
+    for old in preview.parent.glob(f"{path_id}_*{PREVIEW_SUFFIX}"):
+        if old not in paths:
+            try: old.unlink()
+            except OSError: pass
+
+    duration = max(20, int(round(1000 * seconds / len(frames))))
+    buffer = BytesIO()
+    frames[0].save(buffer, "WEBP", save_all=True, append_images=frames[1:], duration=duration, loop=0, **VIDEO_PREVIEW_FORMAT)
+    write_atomic(preview, buffer.getvalue())
+
+    buffer = BytesIO()
+    frames[0].save(buffer, "WEBP", **VIDEO_PREVIEW_FORMAT)
+    write_atomic(poster, buffer.getvalue())
+    return {"path": str(preview), "poster": str(poster), "frames": len(frames), "render_time": time.perf_counter() - start}
+
+def video_sources(pack_folder: Path) -> List[str]:
+    """Video sticker files of a pack folder (what render_video_preview can preview)."""
+    try:
+        return [str(p) for p in pack_folder.iterdir() if p.is_file() and is_video(p.name)]
+    except OSError:
+        return []
+
+# ==============================================================================
+#   GARBAGE COLLECTION
+# ==============================================================================
+
+def drop_pack_thumbnails(pack_tname: str):
+    if not pack_tname: return
+    shutil.rmtree(THUMB_DIR / pack_tname, ignore_errors=True)
+
+def gc_thumbnail_cache(live_packs: Iterable[str]) -> int:
+    """Removes the thumbnails of packs no longer in the library. Returns folders removed."""
+    if not THUMB_DIR.exists(): return 0
+    keep = set(live_packs) | {"_other"}
+    removed = 0
+    for folder in THUMB_DIR.iterdir():
+        if folder.is_dir() and folder.name not in keep:
+            shutil.rmtree(folder, ignore_errors=True)
+            removed += 1
+    if removed: logger.info(f"Thumbnail cache: removed {removed} stale pack folders")
+    return removed
+
+def library_sources(pack_folder: Path) -> List[str]:
+    """Static sticker files of a pack folder (what build_thumbnails can pre-scale)."""
+    try:
+        return [str(p) for p in pack_folder.iterdir() if p.is_file() and is_cacheable(p.name)]
+    except OSError:
+        return []
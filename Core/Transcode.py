@@ -0,0 +1,168 @@
+import os
+import time
+import uuid
+from io import BytesIO
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable
+
+from PIL import Image
+
+from Core.Config import logger, remove_sticker_thumbnail
+
+# ==============================================================================
+#   STORAGE PROFILES
+# ==============================================================================
+# How static stickers are written to disk:
+# - Passthrough: keep Telegram's original bytes when already WebP/PNG (no decode at all).
+# - Fast: re-encode with a cheap WebP method.
+# - Archival: lossless WebP (no generation loss; method 6 costs ~100x for <1% size).
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "Passthrough": {}, # Nothing to encode (falls back to "Fast" when the bytes can't be kept)
+    "Fast": {"quality": 90, "method": 2},
+    "Archival": {"lossless": True, "quality": 80, "method": 4}, # quality = compression effort when lossless
+}
+DEFAULT_STORAGE_PROFILE = "Passthrough"
+
+# Magic bytes -> extension of formats the library can display without conversion
+PASSTHROUGH_FORMATS = {".webp": lambda b: b[:4] == b"RIFF" and b[8:12] == b"WEBP",
+                       ".png": lambda b: b[:8] == b"\x89PNG\r\n\x1a\n",
+                       ".gif": lambda b: b[:6] in (b"GIF87a", b"GIF89a")}
+
+def sniff_passthrough_format(content: bytes) -> Optional[str]:
+    """Returns the extension to store 'content' under unchanged, or None if it needs converting."""
+    for ext, matches in PASSTHROUGH_FORMATS.items():
+        if matches(content): return ext
+    return None
+
+# ==============================================================================
+#   WORKER FUNCTIONS (Run inside the process pool - must stay picklable)
+# ==============================================================================
+
+def part_path(output_path: Path) -> Path:
+    """
+    Temporary name used while a file is being written: '<name>.<writer id>.part', unique per
+    call, so pool processes and UI threads producing the same cache file never share one.
+    """
+    return output_path.with_name(f"{output_path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.part")
+
+def write_atomic(output_path: Path, content: bytes):
+    """Writes to a '.part' file then renames, so a final name always means a complete file."""
+    tmp_path = part_path(output_path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+def detect_animation(content: bytes) -> bool:
+    """True for multi-frame GIF/WebP/PNG (only the header is parsed)."""
+    try:
+        with Image.open(BytesIO(content)) as image:
+            return bool(getattr(image, "is_animated", False))
+    except Exception:
+        return False
+
+def transcode_sticker(content: bytes, remote_file_path: str, output_dir: str, stem: str, is_animated: Optional[bool] = False,
+                      profile: str = DEFAULT_STORAGE_PROFILE) -> Dict[str, Any]:
+    """
+    Decodes/converts one downloaded (or imported) sticker and writes it to the library folder.
+    'remote_file_path' only needs the right extension; is_animated=None detects it from the bytes.
+    Runs in a worker process, so it only returns plain data:
+    {"file": file name, "size": bytes on disk, "tag": "Static" | "Animated", "profile": profile used,
+     "encode_time": seconds decoding/encoding, "write_time": seconds writing to disk}
+    """
+    base_path = Path(output_dir)
+    if profile not in STORAGE_PROFILES: profile = DEFAULT_STORAGE_PROFILE
+
+    def store(data: bytes, ext: str, tag: str, used_profile: str, encode_time: float = 0.0) -> Dict[str, Any]:
+        output_path = base_path / f"{stem}{ext}"
+        start = time.perf_counter()
+        write_atomic(output_path, data)
+        remove_sticker_thumbnail(base_path, stem) # The full file replaces Telegram's preview
+        return {"file": output_path.name, "size": len(data), "tag": tag, "profile": used_profile,
+                "encode_time": encode_time, "write_time": time.perf_counter() - start}
+
+    # --- CRITICAL FIX START: Handle special formats directly ---
+    # 1. TGS (Telegram Animated Sticker - Lottie JSON)
+    if remote_file_path.endswith(".tgs"):
+        return store(content, ".tgs", "Animated", "Passthrough") # PIL cannot open this
+
+    # 2. WebM / MP4 (Video Sticker)
+    if remote_file_path.endswith((".webm", ".mp4")):
+        # CHANGED: Replaced "Video" tag with "Animated" to unify formats
+        return store(content, Path(remote_file_path).suffix, "Animated", "Passthrough") # PIL cannot open this
+    # --- CRITICAL FIX END ---
+
+    if is_animated is None: is_animated = detect_animation(content)
+
+    # 3. Passthrough: Telegram already sent a displayable file, store it byte-for-byte
+    if profile == "Passthrough":
+        ext = sniff_passthrough_format(content)
+        if ext and (ext == ".gif") == bool(is_animated):
+            return store(content, ext, "Animated" if is_animated else "Static", "Passthrough")
+        profile = "Fast" # Needs converting after all
+
+    # 4. Save Standard Images (WebP, JPG, PNG) - encode in memory, then one timed write
+    start = time.perf_counter()
+    buffer = BytesIO()
+    with Image.open(BytesIO(content)) as image:
+        if is_animated:
+            ext, tag = ".gif", "Animated"
+            if image.format != 'GIF':
+                try:
+                    image.save(buffer, "GIF", save_all=True, loop=0)
+                except Exception as e:
+                    # Fallback if conversion fails, log it
+                    logger.warning(f"GIF conversion failed for {stem}, saving raw bytes: {e}")
+                    buffer = BytesIO(content)
+            else:
+                image.save(buffer, "GIF")
+        else:
+            ext, tag = ".webp", "Static"
+            image.save(buffer, "WEBP", **STORAGE_PROFILES[profile])
+
+    return store(buffer.getvalue(), ext, tag, profile, time.perf_counter() - start)
+
+def is_raw_format(remote_file_path: str, profile: str = "") -> bool:
+    """Formats written as-is (no decode), cheap enough to skip the process pool."""
+    if profile == "Passthrough" and remote_file_path.endswith((".webp", ".png")):
+        return True # Final check is done on the bytes, falls back to encoding in-thread if needed
+    return remote_file_path.endswith((".tgs", ".webm", ".mp4"))
+
+# ==============================================================================
+#   PROCESS POOL
+# ==============================================================================
+
+class TranscodePool:
+    """
+    The Encoder.
+    Lazily created process pool (one worker per core) for CPU-heavy decode/encode,
+    so encoding scales across cores instead of sharing the GIL with network threads.
+    Falls back to threads if processes cannot be started on this system.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 4
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable ({e}); encoding on threads instead.")
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="StickerEncode")
+        return self._executor
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self.executor.submit(fn, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
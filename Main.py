@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 
 # ==============================================================================
@@ -36,4 +37,6 @@ def launch_app():
     app.mainloop()
 
 if __name__ == "__main__":
+    # Required for the sticker encode process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     launch_app()
\ No newline at end of file
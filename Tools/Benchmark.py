@@ -0,0 +1,161 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+# ==============================================================================
+#   DOWNLOAD PIPELINE BENCHMARK
+# ==============================================================================
+# Runs StickerClient / DownloadManager against Tools/MockServer.py and reports
+# packs/min and stickers/sec per network profile and download engine.
+#
+#   python Tools/Benchmark.py
+#   python Tools/Benchmark.py --profiles lan,flaky --engines Threaded,Async --packs 5 --stickers 60
+#   python Tools/Benchmark.py --mode manager --kind static --storage Archival --csv results.csv
+#
+# Everything is written to a throwaway folder; the real Library is never touched.
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the sticker download pipeline against a local mock Telegram API.")
+    parser.add_argument("--profiles", default="lan,broadband,flaky", help="Comma list of MockServer PROFILES")
+    parser.add_argument("--engines", default="Threaded,Async", help="Comma list: Threaded, Async")
+    parser.add_argument("--mode", choices=["client", "manager"], default="client",
+                        help="client = StickerClient calls only, manager = full DownloadManager queue (metadata, library save, tagging)")
+    parser.add_argument("--packs", type=int, default=3, help="Packs per run")
+    parser.add_argument("--stickers", type=int, default=40, help="Stickers per pack")
+    parser.add_argument("--kind", choices=["static", "animated", "video", "mixed"], default="mixed")
+    parser.add_argument("--storage", default="Passthrough", help="Storage profile: Passthrough, Fast, Archival")
+    parser.add_argument("--csv", help="Also write results to this CSV file")
+    return parser.parse_args()
+
+# ==============================================================================
+#   HEADLESS APP (What DownloadManager needs from StickerBotApp, without Tk)
+# ==============================================================================
+
+class HeadlessApp:
+    def __init__(self, client):
+        self.client = client
+        self.library_data: List[Dict[str, Any]] = []
+        self.logic = SimpleNamespace(apply_filters=lambda: None)
+
+    def after(self, ms, func=None): return None # UI callbacks are dropped
+    def refresh_view(self): pass
+    def update_status_bar(self, text, progress=None): pass
+
+# ==============================================================================
+#   RUNNERS
+# ==============================================================================
+
+def run_client(client, pack_names: List[str]) -> int:
+    """Metadata + download for each pack, one pack at a time (like the queue worker)."""
+    stickers = 0
+    for name in pack_names:
+        data = client.get_pack_by_name(name)
+        if not data: continue
+        client.download_pack(data["name"], data["stickers"])
+        stickers += sum(1 for s in data["stickers"] if s.get("stored"))
+    return stickers
+
+def run_manager(client, pack_names: List[str]) -> int:
+    """Full DownloadManager path: queue 'new' tasks and wait for the worker to drain."""
+    from Core.Downloader import DownloadManager
+
+    class HeadlessDownloadManager(DownloadManager):
+        def _safe_toast(self, title, msg): pass
+
+    app = HeadlessApp(client)
+    manager = HeadlessDownloadManager(app)
+    for name in pack_names:
+        manager.add_to_queue(name, "new")
+    while manager.is_running or manager.queue:
+        time.sleep(0.05)
+    return sum(1 for p in app.library_data for s in p["stickers"] if s.get("stored"))
+
+# ==============================================================================
+#   MAIN
+# ==============================================================================
+
+def main():
+    args = parse_args()
+
+    # BASE_DIR is taken from the working directory at import time
+    workdir = tempfile.mkdtemp(prefix="sticker_bench_")
+    os.chdir(workdir)
+
+    from Core.Config import logger
+    from Core.Backend import StickerClient
+    from Core.AsyncTransport import AsyncTransport
+    from Tools.MockServer import MockTelegramServer, PROFILES
+
+    logger.setLevel("WARNING") # Keep per-pack INFO lines out of the report
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    for p in profiles:
+        if p not in PROFILES: sys.exit(f"Unknown profile '{p}'. Available: {', '.join(PROFILES)}")
+    if "Async" in engines and not AsyncTransport.is_available():
+        print("NOTE: 'aiohttp' is not installed, skipping the Async engine.")
+        engines = [e for e in engines if e != "Async"]
+
+    print(f"\n{'='*50}")
+    print("STICKER DOWNLOAD BENCHMARK")
+    print(f"{'='*50}")
+    print(f"Mode: {args.mode} | {args.packs} packs x {args.stickers} {args.kind} stickers | Storage: {args.storage}")
+    print(f"Workdir: {workdir}\n")
+
+    results = []
+    run_id = 0
+    for profile in profiles:
+        with MockTelegramServer(profile) as server:
+            for engine in engines:
+                run_id += 1
+                client = StickerClient()
+                client.set_transport(engine)
+                client.set_storage_profile(args.storage)
+                server.attach(client)
+
+                # Unique names per run, so nothing is skipped as 'already on disk'
+                names = [f"bench_{args.kind}_{args.stickers}_r{run_id}p{i}" for i in range(args.packs)]
+                runner = run_manager if args.mode == "manager" else run_client
+
+                start = time.perf_counter()
+                stored = runner(client, names)
+                elapsed = time.perf_counter() - start
+
+                net = client.get_network_stats()
+                result = {
+                    "profile": profile, "engine": engine, "mode": args.mode, "storage": args.storage,
+                    "packs": args.packs, "stickers": stored, "expected": args.packs * args.stickers,
+                    "seconds": round(elapsed, 2),
+                    "packs_per_min": round(args.packs / elapsed * 60, 1),
+                    "stickers_per_sec": round(stored / elapsed, 1),
+                    "retries": int(sum(k["retries"] for k in net.values())),
+                    "failed_requests": int(sum(k["failures"] for k in net.values())),
+                    "bottleneck": client.telemetry.bottleneck()
+                }
+                results.append(result)
+                print(f"{profile:<10} {engine:<9} {stored:>4}/{result['expected']:<4} stickers  {elapsed:>7.2f}s  "
+                      f"{result['packs_per_min']:>7.1f} packs/min  {result['stickers_per_sec']:>7.1f} st/s  "
+                      f"{result['retries']:>4} retries  {result['bottleneck']}")
+
+                client.set_transport("Threaded") # Closes the async loop/session
+                client.transcoder.shutdown()
+
+    if args.csv and results:
+        with open(Path(args.csv) if Path(args.csv).is_absolute() else ROOT / args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"\nResults written to {args.csv}")
+
+if __name__ == "__main__":
+    main()
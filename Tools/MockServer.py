@@ -0,0 +1,271 @@
+import gzip
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image
+
+# Optional dependency: real VP9 fixtures if OpenCV is around, placeholder bytes otherwise.
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+# ==============================================================================
+#   NETWORK PROFILES
+# ==============================================================================
+# latency:     seconds added to every request (+/- 30% jitter)
+# bandwidth:   bytes/sec per connection for file downloads (0 = unlimited)
+# error_rate:  share of requests answered with HTTP 503
+# limit_rate:  share of requests answered with HTTP 429 + retry_after
+PROFILES: Dict[str, Dict[str, float]] = {
+    "lan":       {"latency": 0.002, "bandwidth": 0,           "error_rate": 0.0,  "limit_rate": 0.0},
+    "broadband": {"latency": 0.040, "bandwidth": 2_000_000,   "error_rate": 0.0,  "limit_rate": 0.0},
+    "mobile":    {"latency": 0.150, "bandwidth": 250_000,     "error_rate": 0.01, "limit_rate": 0.0},
+    "flaky":     {"latency": 0.060, "bandwidth": 1_000_000,   "error_rate": 0.08, "limit_rate": 0.03},
+}
+
+# ==============================================================================
+#   SYNTHETIC FIXTURES
+# ==============================================================================
+
+def make_webp(seed: int, size: int = 512) -> bytes:
+    """Static sticker: noisy 512px WebP, roughly the size of a real one."""
+    rng = random.Random(seed)
+    img = Image.effect_noise((size, size), 40 + seed % 30).convert("RGBA")
+    img.paste((rng.randrange(256), rng.randrange(256), rng.randrange(256), 255), (64, 64, size - 64, size - 64))
+    buf = BytesIO()
+    img.save(buf, "WEBP", quality=80)
+    return buf.getvalue()
+
+def make_tgs(seed: int, frames: int = 60) -> bytes:
+    """Animated sticker: gzipped Lottie JSON with one moving shape."""
+    lottie = {
+        "v": "5.5.2", "fr": 60, "ip": 0, "op": frames, "w": 512, "h": 512, "nm": f"bench_{seed}", "ddd": 0, "assets": [],
+        "layers": [{
+            "ddd": 0, "ind": 1, "ty": 4, "nm": "shape", "sr": 1, "ip": 0, "op": frames, "st": 0, "bm": 0,
+            "ks": {"o": {"a": 0, "k": 100}, "r": {"a": 0, "k": 0}, "a": {"a": 0, "k": [0, 0, 0]}, "s": {"a": 0, "k": [100, 100, 100]},
+                   "p": {"a": 1, "k": [{"t": 0, "s": [128, 256, 0]}, {"t": frames, "s": [384, 256, 0]}]}},
+            "shapes": [
+                {"ty": "el", "p": {"a": 0, "k": [0, 0]}, "s": {"a": 0, "k": [160, 160]}},
+                {"ty": "fl", "c": {"a": 0, "k": [(seed % 7) / 7, 0.5, 0.8, 1]}, "o": {"a": 0, "k": 100}}
+            ]
+        }]
+    }
+    return gzip.compress(json.dumps(lottie).encode("utf-8"))
+
+def make_webm(seed: int, frames: int = 30, size: int = 512) -> bytes:
+    """Video sticker: VP9 WebM (Telegram's codec) via OpenCV, or an EBML-headed placeholder of similar size."""
+    if cv2 is not None:
+        fd, path = tempfile.mkstemp(suffix=".webm")
+        os.close(fd)
+        try:
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"VP90"), 30, (size, size))
+            if writer.isOpened():
+                # Flat gradient + moving disc: encodes quickly and lands near real sticker sizes
+                gradient = np.linspace(0, 255, size, dtype=np.uint8)
+                base = np.dstack([np.tile(gradient, (size, 1)), np.full((size, size), (seed * 37) % 256, np.uint8), np.tile(gradient[:, None], (1, size))])
+                for i in range(frames):
+                    frame = base.copy()
+                    cv2.circle(frame, (40 + i * (size - 80) // frames, size // 2), 60, (0, 200, 255), -1)
+                    writer.write(frame)
+                writer.release()
+                with open(path, "rb") as f: data = f.read()
+                if data: return data
+        except Exception:
+            pass
+        finally:
+            try: os.remove(path)
+            except OSError: pass
+
+    return b"\x1a\x45\xdf\xa3" + random.Random(seed).randbytes(120_000)
+
+_FIXTURE_CACHE: Dict[str, List[bytes]] = {}
+_FIXTURE_LOCK = threading.Lock()
+
+def load_fixtures(variants: int) -> Dict[str, List[bytes]]:
+    """Generates the fixture set once per process (encoding WebM/WebP is slow-ish)."""
+    with _FIXTURE_LOCK:
+        if len(_FIXTURE_CACHE.get("webp", [])) < variants:
+            _FIXTURE_CACHE["webp"] = [make_webp(i) for i in range(variants)]
+            _FIXTURE_CACHE["tgs"] = [make_tgs(i) for i in range(variants)]
+            _FIXTURE_CACHE["webm"] = [make_webm(i) for i in range(variants)]
+            _FIXTURE_CACHE["thumb"] = [make_webp(i, 128) for i in range(variants)] # Telegram's ~128px previews
+        return {fmt: files[:variants] for fmt, files in _FIXTURE_CACHE.items()}
+
+# ==============================================================================
+#   SERVER
+# ==============================================================================
+
+class MockTelegramServer:
+    """
+    The Stand-In.
+    Local replacement for the three Telegram Bot API endpoints the app uses
+    (getStickerSet, getFile, /file/bot<token>/...), for tests and benchmarks
+    without a real token or network.
+
+    Pack contents are derived from the requested name:
+        bench_<kind>_<count>[_<anything>]   kind = static | animated | video | mixed
+    e.g. 'bench_mixed_40_7' -> 40 stickers, cycling WebP / TGS / WebM.
+    Unknown names answer 400 "STICKERSET_INVALID", like Telegram.
+    """
+
+    PACK_PATTERN = re.compile(r"^bench_(static|animated|video|mixed)_(\d+)(?:_\w+)?$")
+    FIXTURE_VARIANTS = 8 # Distinct files per format (generated once, reused by index)
+
+    def __init__(self, profile: str = "lan", seed: int = 0, **overrides):
+        self.settings = dict(PROFILES[profile], **overrides)
+        self.profile = profile
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+        self.fixtures = load_fixtures(self.FIXTURE_VARIANTS)
+
+        self.counters_lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+
+    # --- Lifecycle ---
+    def start(self) -> "MockTelegramServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+            def log_message(self, *args): pass
+            def do_GET(self): server._handle(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="MockTelegram").start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+    @property
+    def root(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def attach(self, client, token: str = "BENCH"):
+        """Points a StickerClient at this server (call again after client.set_token)."""
+        client.token = token
+        client.base_url = f"{self.root}/bot{token}"
+        client.file_base_url = f"{self.root}/file/bot{token}"
+
+    # --- Pack model ---
+    @classmethod
+    def pack_spec(cls, name: str) -> Optional[tuple]:
+        m = cls.PACK_PATTERN.match(name)
+        return (m.group(1), int(m.group(2))) if m else None
+
+    @staticmethod
+    def _format_for(kind: str, index: int) -> str:
+        if kind == "mixed": return ["webp", "webp", "tgs", "webm"][index % 4]
+        return {"static": "webp", "animated": "tgs", "video": "webm"}[kind]
+
+    def sticker_set(self, name: str) -> Optional[Dict[str, Any]]:
+        spec = self.pack_spec(name)
+        if not spec: return None
+        kind, count = spec
+        stickers = []
+        for i in range(count):
+            fmt = self._format_for(kind, i)
+            file_id = f"{name}:{i}:{fmt}"
+            stickers.append({
+                "file_id": file_id, "file_unique_id": f"u_{name}_{i}",
+                "emoji": "😀", "type": "regular",
+                "is_animated": fmt == "tgs", "is_video": fmt == "webm",
+                "width": 512, "height": 512,
+                "file_size": len(self.fixtures[fmt][i % self.FIXTURE_VARIANTS]),
+                "thumbnail": {"file_id": f"{name}:{i}:thumb", "file_unique_id": f"t_{name}_{i}", "width": 128, "height": 128,
+                              "file_size": len(self.fixtures["thumb"][i % self.FIXTURE_VARIANTS])}
+            })
+        return {"name": name, "title": f"Benchmark {kind} x{count}", "sticker_type": "regular", "stickers": stickers}
+
+    # --- Request handling ---
+    def _count(self, key: str):
+        with self.counters_lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def _roll(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _handle(self, req: BaseHTTPRequestHandler):
+        url = urlparse(req.path)
+        query = parse_qs(url.query)
+        s = self.settings
+
+        latency = s["latency"]
+        if latency: time.sleep(latency * (0.7 + 0.6 * self._roll()))
+
+        roll = self._roll()
+        if roll < s["error_rate"]:
+            self._count("503")
+            return self._send_json(req, 503, {"ok": False, "error_code": 503, "description": "Service Unavailable"})
+        if roll < s["error_rate"] + s["limit_rate"]:
+            self._count("429")
+            return self._send_json(req, 429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                                             "parameters": {"retry_after": 1}})
+
+        if url.path.endswith("/getStickerSet"):
+            self._count("getStickerSet")
+            data = self.sticker_set((query.get("name") or [""])[0])
+            if data is None:
+                return self._send_json(req, 400, {"ok": False, "error_code": 400, "description": "Bad Request: STICKERSET_INVALID"})
+            return self._send_json(req, 200, {"ok": True, "result": data})
+
+        if url.path.endswith("/getFile"):
+            self._count("getFile")
+            file_id = (query.get("file_id") or [""])[0]
+            parts = file_id.rsplit(":", 2)
+            if len(parts) != 3 or parts[2] not in self.fixtures:
+                return self._send_json(req, 400, {"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"})
+            name, index, fmt = parts
+            if fmt == "thumb":
+                return self._send_json(req, 200, {"ok": True, "result": {"file_id": file_id, "file_path": f"thumbnails/{name}_{index}_thumb.webp"}})
+            folder = "stickers" if fmt != "webm" else "videos"
+            return self._send_json(req, 200, {"ok": True, "result": {"file_id": file_id, "file_path": f"{folder}/{name}_{index}.{fmt}"}})
+
+        if url.path.startswith("/file/"):
+            self._count("file")
+            m = re.search(r"_(\d+)(_thumb)?\.(webp|tgs|webm)$", url.path)
+            if not m: return self._send_json(req, 404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            body = self.fixtures["thumb" if m.group(2) else m.group(3)][int(m.group(1)) % self.FIXTURE_VARIANTS]
+            return self._send_body(req, 200, body, "application/octet-stream", s["bandwidth"])
+
+        self._send_json(req, 404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def _send_json(self, req, status: int, payload: Dict[str, Any]):
+        self._send_body(req, status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    @staticmethod
+    def _send_body(req, status: int, body: bytes, content_type: str, bandwidth: float = 0):
+        req.send_response(status)
+        req.send_header("Content-Type", content_type)
+        req.send_header("Content-Length", str(len(body)))
+        req.end_headers()
+        if not bandwidth:
+            req.wfile.write(body)
+            return
+
+        # Throttle in 16 KB chunks to emulate a per-connection bandwidth cap
+        chunk = 16 * 1024
+        for start in range(0, len(body), chunk):
+            req.wfile.write(body[start:start + chunk])
+            time.sleep(min(chunk, len(body) - start) / bandwidth)
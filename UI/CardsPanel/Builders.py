@@ -3,7 +3,7 @@ import random
 from pathlib import Path
 from typing import Dict, Any
 
-from Core.Config import BASE_DIR, LIBRARY_FOLDER
+from Core.Config import find_sticker_file, find_sticker_thumbnail
 from UI.ViewUtils import COLORS
 from Resources.Icons import (
     ICON_ADD, ICON_LIBRARY, ICON_FOLDER, ICON_PLAY, ICON_FAV_ON,
@@ -83,13 +83,10 @@ def create_all_stickers_card(app, utils, index: int):
                 count = pack.get('count', 0)
                 if count > 0:
                     ridx = random.randint(0, count - 1)
-                    tname = pack['t_name']
-                    base = BASE_DIR / LIBRARY_FOLDER / tname
-                    for ext in ['.png', '.gif', '.webp', '.webm', '.mp4']:
-                        p = base / f"sticker_{ridx}{ext}"
-                        if p.exists():
-                            thumb_path = str(p)
-                            break
+                    stickers = pack.get('stickers', [])
+                    sticker = stickers[ridx] if ridx < len(stickers) else {}
+                    p = find_sticker_file(pack['t_name'], sticker, ridx, ['.png', '.gif', '.webp', '.webm', '.mp4', '.tgs'])
+                    if p: thumb_path = str(p)
                 if thumb_path: break
         except: pass
 
@@ -206,13 +203,10 @@ def create_all_stickers_in_collection_card(app, utils, index: int):
                 p_count = pack.get('count', 0)
                 if p_count > 0:
                     ridx = random.randint(0, p_count - 1)
-                    tname = pack['t_name']
-                    base = BASE_DIR / LIBRARY_FOLDER / tname
-                    for ext in ['.png', '.gif', '.webp', '.webm', '.mp4']:
-                        p = base / f"sticker_{ridx}{ext}"
-                        if p.exists():
-                            thumb_path = str(p)
-                            break
+                    stickers = pack.get('stickers', [])
+                    sticker = stickers[ridx] if ridx < len(stickers) else {}
+                    p = find_sticker_file(pack['t_name'], sticker, ridx, ['.png', '.gif', '.webp', '.webm', '.mp4', '.tgs'])
+                    if p: thumb_path = str(p)
                 if thumb_path: break
         except: pass
 
@@ -320,16 +314,13 @@ def create_folder_card(app, utils, index: int, folder_data: Dict[str, Any]):
         packs = folder_data.get('packs', [])
         if packs:
             cand_pack = random.choice(packs[:5]) 
-            tname = cand_pack['t_name']
             count = cand_pack.get('count', 0)
             if count > 0:
                 ridx = random.randint(0, count - 1)
-                base = BASE_DIR / LIBRARY_FOLDER / tname
-                for ext in ['.png', '.gif', '.webp', '.webm', '.mp4']:
-                    p = base / f"sticker_{ridx}{ext}"
-                    if p.exists(): 
-                        thumb = str(p)
-                        break
+                stickers = cand_pack.get('stickers', [])
+                sticker = stickers[ridx] if ridx < len(stickers) else {}
+                p = find_sticker_file(cand_pack['t_name'], sticker, ridx, ['.png', '.gif', '.webp', '.webm', '.mp4', '.tgs'])
+                if p: thumb = str(p)
 
     if app.current_layout_mode == "Large": target_size = SIZE_LARGE
     elif app.current_layout_mode == "Small": target_size = SIZE_SMALL
@@ -425,13 +416,10 @@ def create_pack_card(app, utils, index: int, pack_data: Dict[str, Any]):
         count = pack_data.get('count', 0)
         if count > 0:
             ridx = random.randint(0, count - 1)
-            tname = pack_data['t_name']
-            base = BASE_DIR / LIBRARY_FOLDER / tname
-            for ext in ['.png', '.gif', '.webp', '.webm', '.mp4']:
-                p = base / f"sticker_{ridx}{ext}"
-                if p.exists():
-                    thumb_path = str(p)
-                    break
+            stickers = pack_data.get('stickers', [])
+            sticker = stickers[ridx] if ridx < len(stickers) else {}
+            p = find_sticker_file(pack_data['t_name'], sticker, ridx, ['.png', '.gif', '.webp', '.webm', '.mp4', '.tgs']) or find_sticker_thumbnail(pack_data['t_name'], sticker, ridx)
+            if p: thumb_path = str(p)
     
     is_nsfw = not app.logic.nsfw_enabled and "NSFW" in pack_data.get('tags', [])
     if is_nsfw: thumb_path = None
@@ -526,24 +514,30 @@ def create_pack_card(app, utils, index: int, pack_data: Dict[str, Any]):
 def create_sticker_card(app, utils, index: int, sticker_data: Dict[str, Any], pack_tname: str, idx_in_pack: int):
     card = utils.create_base_frame(index)
     card.sticker_data = sticker_data 
+    card.sticker_ref = (pack_tname, idx_in_pack) # Lets a finished download find this card again
     
-    base_path = BASE_DIR / LIBRARY_FOLDER / pack_tname
-    final_path = None
-    for ext in ['.png', '.gif', '.webp', '.webm', '.mp4']:
-        p = base_path / f"sticker_{idx_in_pack}{ext}"
-        if p.exists(): final_path = str(p); break
+    p = find_sticker_file(pack_tname, sticker_data, idx_in_pack, ['.png', '.gif', '.webp', '.webm', '.mp4', '.tgs'])
+    final_path = str(p) if p else None
+    card.file_path = final_path
     
     display_name = sticker_data.get('custom_name', "") or f"Sticker {idx_in_pack+1}"
-    cmd = lambda e: app.logic.on_sticker_click(sticker_data, idx_in_pack, final_path, pack_tname, e)
+    cmd = lambda e: app.logic.on_sticker_click(sticker_data, idx_in_pack, card.file_path, pack_tname, e)
 
     is_nsfw = "NSFW" in sticker_data.get('tags', [])
     show_image = not (is_nsfw and not app.logic.nsfw_enabled)
     txt = "NSFW" if not show_image else "FILE"
     load_path = final_path if show_image else None
     
+    # Full file still downloading: show Telegram's thumbnail (static) until it lands
+    if show_image and not load_path:
+        thumb = find_sticker_thumbnail(pack_tname, sticker_data, idx_in_pack)
+        if thumb:
+            load_path = str(thumb)
+            card.is_preview = True
+    
     # Check Animation
-    is_anim = "Animated" in sticker_data.get('tags', []) or "Video" in sticker_data.get('tags', [])
-    if not is_anim and load_path:
+    is_anim = not card.is_preview and ("Animated" in sticker_data.get('tags', []) or "Video" in sticker_data.get('tags', []))
+    if not is_anim and load_path and not card.is_preview:
         is_anim = utils.is_file_animated(load_path)
 
     card.is_animated_content = is_anim
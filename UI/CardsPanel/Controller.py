@@ -28,10 +28,29 @@ class CardManager:
         """Updates border colors based on selection state."""
         self.utils.highlight_selected_cards()
 
+    def begin_page(self):
+        """Called by MainWindow before rendering a page of cards (animations wait for end_page)."""
+        self.utils.begin_page()
+
+    def end_page(self):
+        """Starts the page's animations at a quality planned for all of them."""
+        self.utils.end_page()
+
     def update_card_image(self, card, new_size):
         """Called by MainWindow during resize events."""
         self.utils.update_card_image(card, new_size)
 
+    def on_sticker_downloaded(self, sticker_data: Dict[str, Any]):
+        """Called by the DownloadManager (main thread) as each file lands during a download."""
+        path = self.utils.swap_in_downloaded_file(sticker_data)
+        logic = self.app.logic
+        if path and logic.current_sticker_data is sticker_data and len(logic.selected_stickers) == 1:
+            # The selected sticker was showing its thumbnail: refresh the detail panel too
+            data, idx, _, pack_tname = logic.selected_stickers[0]
+            logic.selected_stickers[0] = (data, idx, path, pack_tname)
+            logic.current_sticker_path = path
+            self.app.details_manager.update_details_panel()
+
     # ==========================================================================
     #   BUILDER ROUTING
     #   (MainWindow calls these -> Controller routes to Builders.py)
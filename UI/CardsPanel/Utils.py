@@ -1,11 +1,13 @@
 import customtkinter as ctk
 import threading
-import cv2
-from typing import Tuple, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Optional, Callable, Dict
 from pathlib import Path
-from PIL import Image, ImageSequence, ImageDraw
+from PIL import Image, ImageDraw
 
-from UI.ViewUtils import COLORS, AsyncImageLoader
+from Core.Config import find_sticker_file
+from Core.ThumbCache import cached_thumbnail, cached_video_poster
+from UI.ViewUtils import COLORS, AsyncImageLoader, TgsPreviewLoader, VideoPreviewLoader, FRAME_CACHE, FrameSequence, VIDEO_EXTENSIONS
 from Resources.Icons import CARD_PADDING
 
 # Constants for render sizes
@@ -13,6 +15,37 @@ SIZE_LARGE = (320, 320)
 SIZE_SMALL = (180, 180)
 SIZE_LIST  = (48, 48)
 
+# Frames decoded per card animation (the detail panel decodes more)
+CARD_MAX_FRAMES = 41
+
+# ==============================================================================
+#   ANIMATION QUALITY (Per Layout Mode)
+# ==============================================================================
+ANIMATION_QUALITY_MODES = ["Full", "Balanced", "Saver", "Hover Only", "Off"]
+DEFAULT_ANIMATION_QUALITY = {"Large": "Balanced", "Normal": "Balanced", "Small": "Balanced", "List": "Balanced"}
+# Playback levels, best first: (fps cap or None for the source rate, frame cap, resolution scale)
+ANIMATION_LEVELS = [(None, CARD_MAX_FRAMES, 1.0), (15, 24, 1.0), (10, 16, 0.75)]
+ANIMATION_PAGE_BUDGET = 128 * 1024 * 1024 # Decoded frames of one page's animated cards (PIL + Tk copies)
+ANIMATION_SECONDS = 3                     # Stickers last at most 3 s: bounds the frame estimate at an fps cap
+POPUP_ANIMATION_LEVEL = ANIMATION_LEVELS[1] # Pop-up grids (cover picker) have no page budget
+
+def plan_animation(mode: str, count: int, size: Tuple[int, int]) -> Tuple[Tuple[Optional[int], int, float], bool]:
+    """
+    (level, hover_only) for 'count' animated cards of 'size' under a quality mode.
+    Balanced takes the best level whose frames fit ANIMATION_PAGE_BUDGET and otherwise
+    falls back to the lowest level, animated on hover only. Off keeps a single frame.
+    """
+    if mode == "Off": return (None, 1, 1.0), False
+    if mode == "Full": return ANIMATION_LEVELS[0], False
+    if mode == "Saver": return ANIMATION_LEVELS[-1], False
+    if mode == "Hover Only": return ANIMATION_LEVELS[1], True
+    for level in ANIMATION_LEVELS:
+        fps, frames, scale = level
+        estimate = min(frames, fps * ANIMATION_SECONDS) if fps else frames
+        if count * estimate * (size[0] * scale) * (size[1] * scale) * 4 * 2 <= ANIMATION_PAGE_BUDGET:
+            return level, False
+    return ANIMATION_LEVELS[-1], True
+
 class CardUtils:
     """
     Shared mechanics for all card types:
@@ -20,9 +53,17 @@ class CardUtils:
     - Hover/Click Binding
     - Animation & Image Loading Engine
     """
+    _animator = ThreadPoolExecutor(max_workers=2, thread_name_prefix="CardAnimator") # Shared by every card grid
+    _stills = ThreadPoolExecutor(max_workers=2, thread_name_prefix="CardStill") # First frames, ahead of the full decodes
+    animation_quality: Dict[str, str] = dict(DEFAULT_ANIMATION_QUALITY) # "Animation Quality" setting
+
     def __init__(self, app):
         self.app = app
         self.refresh_theme_colors()
+        
+        # Page planning: animations are collected while a page renders, then started together
+        self._page_queue = None
+        self._page_animated = 0
 
     def refresh_theme_colors(self):
         self.COL_BG = COLORS["card_bg"] 
@@ -69,8 +110,11 @@ class CardUtils:
         card.image_path = None
         card.placeholder_text = ""
         card.last_size_request = None 
-        card.anim_loop = None 
+        card.anim_loop = None # AnimationClock handle
+        card.anim_cancel = None # Set to stop a streaming decode (see animate_card)
+        card.anim_on_hover = None # (path, size, label) of a hover-only animation
         card.is_animated_content = False 
+        card.is_preview = False # Showing a Telegram thumbnail while the full file downloads
         
         if self.app.current_layout_mode == "List":
             # List Layout
@@ -93,6 +137,9 @@ class CardUtils:
         """Attaches hover/click events to card and children."""
         def on_enter(e):
             if not card_frame.winfo_exists(): return
+            card_frame.anim_hovered = True
+            if getattr(card_frame, 'anim_on_hover', None) and not getattr(card_frame, 'anim_hover_started', False):
+                self.animate_card(card_frame, *card_frame.anim_on_hover, hovered=True)
             is_selected = False
             if hasattr(card_frame, 'sticker_data'):
                 sel_list = getattr(self.app.logic, 'selected_stickers', [])
@@ -104,6 +151,7 @@ class CardUtils:
 
         def on_leave(e):
             if not card_frame.winfo_exists(): return
+            card_frame.anim_hovered = False # Hover-only animations hold their frame
             is_selected = False
             if hasattr(card_frame, 'sticker_data'):
                 sel_list = getattr(self.app.logic, 'selected_stickers', [])
@@ -164,6 +212,21 @@ class CardUtils:
         
         return pil_img
 
+    def _resolve_preview(self, label_widget: ctk.CTkLabel, path: str, on_preview: Callable[[str], None]):
+        """
+        Shows a 'TGS' / 'VIDEO' placeholder while the cached preview renders, then hands the
+        animated WebP to on_preview (main thread). Cards never decode TGS or video directly.
+        """
+        is_tgs = path.lower().endswith('.tgs')
+        if label_widget.winfo_exists():
+            try: label_widget.configure(image=None, text="TGS" if is_tgs else "VIDEO", text_color=COLORS["text_sub"])
+            except: pass
+
+        def on_ready(preview_path):
+            if not preview_path: return # Renderer missing or render failed: keep the placeholder
+            self.app.after(0, lambda: on_preview(preview_path) if label_widget.winfo_exists() else None)
+        (TgsPreviewLoader if is_tgs else VideoPreviewLoader).request(path, on_ready)
+
     def load_image_to_label(self, label_widget: ctk.CTkLabel, image_path: Optional[str], size: Tuple[int, int], placeholder_text: str = "", add_overlay: bool = False):
         if not image_path:
             if placeholder_text and label_widget.winfo_exists(): 
@@ -174,12 +237,17 @@ class CardUtils:
                     except: pass
             return
 
-        if image_path.lower().endswith(('.webm', '.mp4', '.mkv')):
-             if label_widget.winfo_exists(): 
-                 try:
-                    label_widget.configure(image=None, text="VIDEO", text_color=COLORS["text_sub"])
-                 except: pass
-             return
+        if image_path.lower().endswith(VIDEO_EXTENSIONS):
+            # Static view of a video: its poster frame (rendered with the preview)
+            def on_video_preview(p):
+                poster = cached_video_poster(image_path)
+                if poster: self.load_image_to_label(label_widget, poster, size, placeholder_text, add_overlay)
+            self._resolve_preview(label_widget, image_path, on_video_preview)
+            return
+
+        if image_path.lower().endswith('.tgs'):
+            self._resolve_preview(label_widget, image_path, lambda p: self.load_image_to_label(label_widget, p, size, placeholder_text, add_overlay))
+            return
 
         if add_overlay:
             threading.Thread(target=self._load_image_with_overlay_thread, args=(label_widget, image_path, size), daemon=True).start()
@@ -194,89 +262,143 @@ class CardUtils:
                 except: pass
             AsyncImageLoader.load(image_path, size, on_ready)
 
-    def _load_image_with_overlay_thread(self, label_widget, path, size):
+    def _load_image_with_overlay_thread(self, label_widget, path, size, still_wanted: Optional[Callable[[], bool]] = None):
+        """'still_wanted' (main thread) lets a later image, e.g. a started animation, win over this one."""
+        def wanted():
+            return label_widget.winfo_exists() and (still_wanted is None or still_wanted())
         try:
             # 1. Background: Heavy PIL Operations (Safe)
-            pil_img = Image.open(path)
+            with Image.open(cached_thumbnail(path, size) or path) as img: # Overlay images are animations: no tiers to build
+                pil_img = img.convert("RGBA") # Decoded copy: the file handle closes here
             pil_img.thumbnail(size, Image.Resampling.LANCZOS)
             pil_img = self._apply_play_overlay(pil_img)
             
             # 2. Main Thread: Create CTkImage and Update UI (Safe)
             def on_main_thread():
-                if label_widget.winfo_exists():
+                if wanted():
                     ctk_img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=size)
                     label_widget.configure(image=ctk_img, text="")
 
             self.app.after(0, on_main_thread)
             
         except Exception:
-            self.app.after(0, lambda: label_widget.configure(image=None, text="⚠️", text_color=COLORS["btn_negative"]) if label_widget.winfo_exists() else None)
+            self.app.after(0, lambda: label_widget.configure(image=None, text="⚠️", text_color=COLORS["btn_negative"]) if wanted() else None)
+
+    def begin_page(self):
+        """Collects the grid's animations while a page renders, so their quality is planned for all of them."""
+        self._page_queue = []
+
+    def end_page(self):
+        queue, self._page_queue = self._page_queue or [], None
+        self._page_animated = len(queue)
+        for card, path, size, label in queue:
+            if card.winfo_exists(): self.animate_card(card, path, size, label)
 
-    def animate_card(self, card: ctk.CTkFrame, path: str, size: Tuple[int, int], label: ctk.CTkLabel):
-        """Dispatches animation task."""
-        if path.lower().endswith(('.webm', '.mp4', '.mkv')):
-            threading.Thread(target=self._load_video_frames, args=(card, path, size, label), daemon=True).start()
+    def animate_card(self, card: ctk.CTkFrame, path: str, size: Tuple[int, int], label: ctk.CTkLabel, hovered: bool = False):
+        """
+        Streams the animation from the animator pool: a still of the first frame is painted
+        right away (the pool may be busy decoding other cards) and the animation takes over
+        once its first frame is decoded, the rest filling in while it plays. Destroying the
+        card (or re-animating it at another size) cancels the decode. Grid cards follow the layout's Animation Quality
+        (frame rate, frame count and resolution, or hover-only playback).
+        """
+        if path.lower().endswith(('.tgs',) + VIDEO_EXTENSIONS):
+            self._resolve_preview(label, path, lambda p: self.animate_card(card, p, size, label, hovered) if card.winfo_exists() else None)
             return
 
-        try:
-            frames = []
-            duration = 100
-            with Image.open(path) as im:
-                is_anim = getattr(im, "is_animated", False) or im.format == "GIF"
-                if not is_anim: raise ValueError("Not animated")
-                duration = im.info.get('duration', 100) or 100
-                if duration < 20: duration = 100
-
-                iterator = ImageSequence.Iterator(im)
-                for i, frame in enumerate(iterator):
-                    if i > 40: break 
-                    f = frame.copy()
-                    f.thumbnail(size, Image.Resampling.LANCZOS)
-                    f = self._apply_play_overlay(f)
-                    frames.append(ctk.CTkImage(light_image=f, size=size))
-            
-            if not frames: raise ValueError("No frames")
-            self._start_animation_loop(card, frames, duration, label)
-        except:
+        in_canvas = card.master is getattr(self.app, 'content_area', None)
+        if in_canvas and self._page_queue is not None:
+            self._page_queue.append((card, path, size, label))
+            return
+
+        self.stop_card_animation(card)
+        if in_canvas:
+            mode = self.animation_quality.get(self.app.current_layout_mode, "Balanced")
+            (max_fps, max_frames, scale), hover_only = plan_animation(mode, max(1, self._page_animated), size)
+        else:
+            (max_fps, max_frames, scale), hover_only = POPUP_ANIMATION_LEVEL, False
+        card.anim_on_hover = (path, size, label) if hover_only else None
+        card.anim_hover_started = hovered
+        if hover_only and not hovered: max_fps, max_frames = None, 1 # Poster frame until hovered
+
+        decode_size = (max(1, int(size[0] * scale)), max(1, int(size[1] * scale))) # Shown at 'size' (upscaled)
+        active = (lambda: getattr(card, 'anim_hovered', False)) if hover_only else None
+
+        cached = FRAME_CACHE.peek(path, decode_size, max_frames, max_fps)
+        if cached:
+            self._start_animation_loop(card, cached, size, label, active)
+            return
+
+        cancel = threading.Event()
+        card.anim_cancel = cancel
+        if not getattr(card, 'anim_destroy_bound', False):
+            card.bind("<Destroy>", lambda e: self.stop_card_animation(card), add="+")
+            card.anim_destroy_bound = True
+
+        # Still first frame from its own pool, so it never waits behind the queued full decodes
+        first_frame_wanted = lambda: getattr(card, 'anim_cancel', None) is cancel and not getattr(card, 'anim_loop', None)
+        self._stills.submit(self._load_image_with_overlay_thread, label, path, size, first_frame_wanted)
+
+        def on_start(seq):
+            # Worker thread: CTkImages are created lazily by the loop, on the main thread
+            self.app.after(0, lambda: self._on_frames_ready(card, seq, path, size, label, cancel, active))
+        self._animator.submit(FRAME_CACHE.stream, path, decode_size, max_frames, on_start, cancel, max_fps)
+
+    def _on_frames_ready(self, card, seq, path, size, label, cancel, active):
+        if cancel.is_set() or getattr(card, 'anim_cancel', None) is not cancel or not card.winfo_exists(): return
+        if seq:
+            self._start_animation_loop(card, seq, size, label, active)
+        else:
             self.load_image_to_label(label, path, size, add_overlay=True)
 
-    def _load_video_frames(self, card, path, size, label):
-        pil_frames = [] # Use raw PIL images in thread
+    def stop_card_animation(self, card):
+        """Stops the card's loop and withdraws it from any decode still running for it."""
+        if getattr(card, 'anim_loop', None):
+            self.app.animation_clock.stop(card.anim_loop)
+            card.anim_loop = None
+        cancel = getattr(card, 'anim_cancel', None)
+        if cancel:
+            cancel.set()
+            card.anim_cancel = None
+
+    def _start_animation_loop(self, card, seq: FrameSequence, size, label, active=None):
+        """Hands the sequence to the app's animation clock; grid cards only advance while on screen (and 'active')."""
+        clock = self.app.animation_clock
+        clock.stop(getattr(card, 'anim_loop', None))
+        in_canvas = card.master is getattr(self.app, 'content_area', None)
+
+        def render(idx):
+            label.configure(image=seq.ctk_image(idx, size, self._apply_play_overlay), text="")
         try:
-            cap = cv2.VideoCapture(path)
-            i = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret or i > 30: break 
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(rgb)
-                pil_img.thumbnail(size, Image.Resampling.LANCZOS)
-                pil_img = self._apply_play_overlay(pil_img)
-                pil_frames.append(pil_img)
-                i += 1
-            cap.release()
-        except: pass
-
-        if pil_frames:
-            # Transfer to Main Thread for CTkImage creation
-            def on_main_thread():
-                if not card.winfo_exists(): return
-                # Create CTkImages safely on main thread
-                ctk_frames = [ctk.CTkImage(light_image=f, size=size) for f in pil_frames]
-                self._start_animation_loop(card, ctk_frames, 50, label)
+            card.anim_loop = clock.play(seq, render, card, card if in_canvas else None, active)
+        except Exception:
+            card.anim_loop = None
 
-            self.app.after(0, on_main_thread)
-        else:
-            self.app.after(0, lambda: label.configure(image=None, text="⚠️", text_color=COLORS["btn_negative"]))
+    def swap_in_downloaded_file(self, sticker_data: dict) -> Optional[str]:
+        """
+        Replaces the Telegram thumbnail (or placeholder) of a sticker's card with its freshly
+        downloaded file, in place. Returns the file path, or None if the sticker has no card.
+        """
+        card = next((c for c in self.app.cards if getattr(c, 'sticker_data', None) is sticker_data and c.winfo_exists()), None)
+        if card is None or getattr(card, 'file_path', None): return None
 
-    def _start_animation_loop(self, card, frames, duration, label):
-        def loop(idx):
-            if not card.winfo_exists(): return
-            try:
-                label.configure(image=frames[idx], text="")
-                card.anim_loop = card.after(duration, lambda: loop((idx + 1) % len(frames)))
-            except: pass
-        loop(0)
+        pack_tname, idx_in_pack = card.sticker_ref
+        p = find_sticker_file(pack_tname, sticker_data, idx_in_pack)
+        if p is None: return None
+        card.file_path = str(p)
+        if card.placeholder_text == "NSFW": return card.file_path # Hidden anyway
+
+        card.is_preview = False
+        card.image_path = card.file_path
+        card.is_animated_content = "Animated" in sticker_data.get('tags', []) or self.is_file_animated(card.image_path)
+        self.stop_card_animation(card)
+
+        size = card.last_size_request or (SIZE_LIST if self.app.current_layout_mode == "List" else SIZE_SMALL)
+        if card.is_animated_content:
+            self.animate_card(card, card.image_path, size, card.image_label)
+        else:
+            self.load_image_to_label(card.image_label, card.image_path, size, card.placeholder_text)
+        return card.file_path
 
     def update_card_image(self, card: ctk.CTkFrame, new_size: Tuple[int, int]):
         """Refreshes content on resize."""
@@ -291,7 +413,6 @@ class CardUtils:
         card.last_size_request = new_size
         
         if getattr(card, 'is_animated_content', False):
-            if card.anim_loop: card.after_cancel(card.anim_loop)
             self.animate_card(card, card.image_path, new_size, card.image_label)
         else:
             is_anim_flag = getattr(card, 'is_animated_content', False)
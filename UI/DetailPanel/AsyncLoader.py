@@ -1,12 +1,14 @@
 import customtkinter as ctk
-import cv2
 import threading
-from PIL import Image, ImageSequence
+from PIL import Image
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Tuple, Any
 
 from Core.Config import logger
-from UI.ViewUtils import load_ctk_image
+from Core.ThumbCache import cached_video_poster
+from UI.ViewUtils import load_ctk_image, TgsPreviewLoader, VideoPreviewLoader, FRAME_CACHE, FrameSequence, VIDEO_EXTENSIONS
+
+DETAIL_MAX_FRAMES = 61 # Frames decoded for the detail preview (cards use fewer)
 
 class AsyncLoader:
     """
@@ -29,11 +31,14 @@ class AsyncLoader:
         # State Management
         self._current_load_id: int = 0
         self._debounce_job: Optional[str] = None
-        self._anim_loop_id: Optional[str] = None
+        self._anim_loop_id: Optional[int] = None # AnimationClock handle
+        self._cancel_event = threading.Event() # Stops the frame decode of the previous request
 
     def get_new_load_id(self) -> int:
         """Invalidates all previous pending requests."""
         self._current_load_id += 1
+        self._cancel_event.set()
+        self._cancel_event = threading.Event()
         return self._current_load_id
 
     def request_image_load(self, path: str, label_widget: ctk.CTkLabel, width: int, req_id: int):
@@ -47,7 +52,7 @@ class AsyncLoader:
             self._debounce_job = None
             
         if self._anim_loop_id:
-            self.app.after_cancel(self._anim_loop_id)
+            self.app.animation_clock.stop(self._anim_loop_id)
             self._anim_loop_id = None
             
         # 2. Immediate UI Feedback
@@ -77,9 +82,9 @@ class AsyncLoader:
         size_tuple = (new_size, new_size)
         
         # Define callback wrapper to ensure thread safety
-        def on_frames_ready(frames, duration):
+        def on_frames_ready(seq):
             if self._current_load_id == req_id:
-                self._play_frames(frames, duration, label_widget, req_id)
+                self._play_frames(seq, label_widget, req_id)
 
         # Clear any existing image on the foreground label so the background "Loading..." shows through
         # We use try/except to be crash-proof during rapid switching
@@ -89,10 +94,28 @@ class AsyncLoader:
         except Exception:
             pass
 
+        # 0. Lottie (TGS) -> Rendered once to a cached animated WebP, then loaded like one
+        if path.lower().endswith('.tgs'):
+            def on_preview(preview_path):
+                if preview_path:
+                    self.app.after(0, lambda: self._start_loading(preview_path, label_widget, width, req_id))
+                else:
+                    self.app.after(0, lambda: label_widget.configure(image=None, text="TGS") if self._current_load_id == req_id and label_widget.winfo_exists() else None)
+            TgsPreviewLoader.request(path, on_preview)
+            return
+
         # A. Video Files (WebM, MP4) -> Heavy -> Thread
-        if path.lower().endswith(('.webm', '.mp4', '.mkv')):
+        # The cached poster paints at once; the panel still decodes the original, since it
+        # shows the sticker larger (and with more frames) than the card preview holds.
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            poster = cached_video_poster(path)
+            if poster:
+                img = load_ctk_image(poster, size_tuple)
+                if img and label_widget.winfo_exists(): label_widget.configure(image=img, text="")
+            else:
+                VideoPreviewLoader.request(path, lambda p: None) # Ready for the cards next time
             self.executor.submit(
-                self._background_load_video, path, size_tuple, on_frames_ready, req_id
+                self._background_load_frames, path, size_tuple, on_frames_ready, req_id, self._cancel_event
             )
             return
 
@@ -110,7 +133,7 @@ class AsyncLoader:
 
         if is_anim:
             self.executor.submit(
-                self._background_load_gif, path, size_tuple, on_frames_ready, req_id
+                self._background_load_frames, path, size_tuple, on_frames_ready, req_id, self._cancel_event
             )
             return
 
@@ -133,91 +156,33 @@ class AsyncLoader:
     #   WORKERS (Run in Background Threads)
     # ==========================================================================
 
-    def _background_load_video(self, path, size, callback, req_id):
-        if self._current_load_id != req_id: return
-        
-        pil_frames = []
-        cap = None
-        try:
-            cap = cv2.VideoCapture(path)
-            i = 0
-            while True:
-                if self._current_load_id != req_id: break
-                
-                ret, frame = cap.read()
-                if not ret or i > 60: break # Hard cap frames
-                
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(rgb_frame)
-                pil_img.thumbnail(size, Image.Resampling.LANCZOS)
-                pil_frames.append(pil_img)
-                i += 1
-        except Exception as e:
-            logger.error(f"Video load error: {e}")
-        finally:
-            if cap: cap.release()
-            
-        if pil_frames and self._current_load_id == req_id:
-            # Convert PIL to CTkImage on main thread via callback
-            self.app.after(0, lambda: self._finalize_frames(pil_frames, 50, callback))
-
-    def _background_load_gif(self, path, size, callback, req_id):
+    def _background_load_frames(self, path, size, callback, req_id, cancel):
+        """
+        Shared frame cache: reselecting a sticker replays the frames decoded last time.
+        Otherwise playback starts with the first decoded frame while the rest stream in.
+        """
         if self._current_load_id != req_id: return
-        
-        pil_frames = []
-        duration = 100
-        try:
-            with Image.open(path) as im:
-                duration = im.info.get('duration', 100) or 100
-                if duration < 20: duration = 100
-                
-                iterator = ImageSequence.Iterator(im)
-                for i, frame in enumerate(iterator):
-                    if self._current_load_id != req_id: return
-                    if i > 60: break
-                    
-                    f = frame.copy()
-                    f.thumbnail(size, Image.Resampling.LANCZOS)
-                    pil_frames.append(f)
-        except Exception as e:
-             logger.error(f"GIF load error ({path}): {e}")
-
-        if pil_frames and self._current_load_id == req_id:
-            self.app.after(0, lambda: self._finalize_frames(pil_frames, duration, callback))
 
-    def _finalize_frames(self, pil_frames, duration, callback):
-        """Converts PIL to CTkImage on Main Thread."""
-        try:
-            final_frames = []
-            for p in pil_frames:
-                w, h = p.size
-                final_frames.append(ctk.CTkImage(light_image=p, dark_image=p, size=(w, h)))
-            callback(final_frames, duration)
-        except Exception as e:
-            logger.error(f"Frame finalization error: {e}")
+        def on_start(seq):
+            if seq and self._current_load_id == req_id:
+                # CTkImages are created lazily by the loop, on the main thread
+                self.app.after(0, lambda: callback(seq))
+        FRAME_CACHE.stream(path, size, DETAIL_MAX_FRAMES, on_start, cancel)
 
     # ==========================================================================
     #   ANIMATION LOOP
     # ==========================================================================
 
-    def _play_frames(self, frames, duration, label, req_id):
-        """Recursive animation loop."""
-        if not frames: return
+    def _play_frames(self, seq: FrameSequence, label, req_id):
+        """Plays the sequence on the app's animation clock (full frame rate: the panel is always on screen)."""
+        if not seq: return
         if self._current_load_id != req_id: return
+        if not label.winfo_exists(): return
 
-        def animate(idx):
-            if self._current_load_id != req_id: return
-            if not label.winfo_exists(): return
-            
-            try:
-                label.configure(image=frames[idx], text="")
-                self._anim_loop_id = self.app.after(
-                    duration, 
-                    lambda: animate((idx + 1) % len(frames))
-                )
-            except Exception as e:
-                # Common if widget is destroyed mid-update during rapid clicking
-                # Just ignore the error and stop the loop
-                pass
-            
-        animate(0)
\ No newline at end of file
+        clock = self.app.animation_clock
+        clock.stop(self._anim_loop_id)
+        
+        def render(idx):
+            # Common to fail if widget is destroyed mid-update during rapid clicking; the clock drops the player
+            label.configure(image=seq.ctk_image(idx), text="")
+        self._anim_loop_id = clock.play(seq, render, label)
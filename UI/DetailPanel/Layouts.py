@@ -3,7 +3,7 @@ import random
 from pathlib import Path
 from typing import Dict, Any, Optional
 
-from Core.Config import BASE_DIR, LIBRARY_FOLDER
+from Core.Config import BASE_DIR, LIBRARY_FOLDER, find_sticker_file
 from UI.ViewUtils import COLORS, open_file_location, ToastNotification, Tooltip
 from Resources.Icons import (
     FONT_HEADER, FONT_DISPLAY, FONT_TITLE, FONT_NORMAL, FONT_SMALL,
@@ -11,7 +11,7 @@ from Resources.Icons import (
     ICON_ADD, ICON_SETTINGS, ICON_LINK, ICON_FILE,
     ICON_FMT_ANIM, ICON_FMT_STATIC, ICON_FMT_MIXED,
     ICON_STATS, ICON_CLEAR, ICON_OPEN, ICON_SHOW, ICON_GO, ICON_BATCH,
-    ICON_ACTION
+    ICON_ACTION, ICON_SAVE
 )
 
 # Imported Components (Atoms & Molecules)
@@ -285,6 +285,10 @@ class PackLayout(BaseLayout):
                                            self.app.logic.trigger_redownload)
         self.tooltip_dl = Tooltip(self.btn_dl, "Download stickers") # Initial text
         
+        self.btn_export = create_action_button(self.actions_frame, f"{ICON_SAVE} Export", COLORS["btn_neutral"], COLORS["text_on_neutral"], 
+                                               lambda: self.app.logic.export_stickers("pack"))
+        self.tooltip_export = Tooltip(self.btn_export, "Save stickers + manifest to a zip/tar")
+        
         # -- UPDATED: Toast removed here, moved to Library Logic (after confirmation) --
         self.btn_remove = create_action_button(self.actions_frame, f"{ICON_REMOVE} Remove Pack", COLORS["btn_negative"], COLORS["text_on_negative"], 
                              self.app.logic.confirm_remove_pack)
@@ -302,14 +306,12 @@ class PackLayout(BaseLayout):
         thumb = data.get('thumbnail_path') or data.get('temp_thumbnail')
         if not thumb and data.get('count', 0) > 0:
              try:
-                 tname = data['t_name']
-                 base = BASE_DIR / LIBRARY_FOLDER / tname
+                 ridx = random.randint(0, data['count']-1)
+                 stickers = data.get('stickers', [])
+                 sticker = stickers[ridx] if ridx < len(stickers) else {}
                  # PRIORITIZE GIF/WebM
-                 for ext in [".gif", ".webm", ".webp", ".png"]:
-                    p = base / f"sticker_{random.randint(0, data['count']-1)}{ext}"
-                    if p.exists():
-                        thumb = str(p)
-                        break
+                 p = find_sticker_file(data['t_name'], sticker, ridx, [".gif", ".webm", ".webp", ".png"])
+                 if p: thumb = str(p)
              except: pass
         
         self.current_img_path = thumb
@@ -410,6 +412,7 @@ class PackLayout(BaseLayout):
         
         # REMOVED: self.btn_open_file.pack(...)
         self.btn_show_file.pack(fill="x", pady=5, padx=30)
+        self.btn_export.pack(fill="x", pady=5, padx=30)
         
         if not is_virtual:
             self.btn_dl.pack(fill="x", pady=5, padx=30)
@@ -535,6 +538,10 @@ class CollectionLayout(BaseLayout):
         
         # REMOVED: btn_show_file definition (Requested)
 
+        self.btn_export = create_action_button(self.actions_frame, f"{ICON_SAVE} Export", COLORS["btn_neutral"], COLORS["text_on_neutral"], 
+                             lambda: self.app.logic.export_stickers("collection"))
+        self.tooltip_export = Tooltip(self.btn_export, "Save all packs + manifest to a zip/tar")
+
         # -- UPDATED: Toast removed here, moved to Library Logic --
         self.btn_disband = create_action_button(self.actions_frame, f"{ICON_REMOVE} Disband", COLORS["btn_negative"], COLORS["text_on_negative"], 
                              self.app.logic.disband_collection)
@@ -555,11 +562,11 @@ class CollectionLayout(BaseLayout):
                  valid_packs = [p for p in data['packs'] if p.get('count', 0) > 0]
                  if valid_packs:
                      rp = random.choice(valid_packs)
-                     base = BASE_DIR / LIBRARY_FOLDER / rp['t_name']
-                     for ext in [".gif", ".webm", ".webp", ".png"]:
-                        p = base / f"sticker_{random.randint(0, rp['count']-1)}{ext}"
-                        if p.exists():
-                            thumb = str(p); break
+                     ridx = random.randint(0, rp['count']-1)
+                     stickers = rp.get('stickers', [])
+                     sticker = stickers[ridx] if ridx < len(stickers) else {}
+                     p = find_sticker_file(rp['t_name'], sticker, ridx, [".gif", ".webm", ".webp", ".png"])
+                     if p: thumb = str(p)
              except: pass
 
         self.current_img_path = thumb
@@ -602,6 +609,7 @@ class CollectionLayout(BaseLayout):
         self.btn_open_view.pack(fill="x", pady=5, padx=30)
         
         # REMOVED: btn_show_file packing (Requested)
+        self.btn_export.pack(fill="x", pady=5, padx=30)
         
         self.btn_disband.pack(fill="x", pady=5, padx=30)
         
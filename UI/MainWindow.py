@@ -9,19 +9,20 @@ from typing import Optional
 from Core.Backend import StickerClient
 from Core.Logic.Controller import AppLogic
 from Core.Config import initialize_system_files, logger, BASE_DIR
+from Core.ThumbCache import gc_thumbnail_cache
 
 # Resource Imports
 from Resources.Icons import (
     FONT_BIG_HEADER, FONT_NORMAL, FONT_SMALL, FONT_TITLE,
     ICON_LEFT, ICON_RIGHT, ICON_SETTINGS, 
     ICON_UPDATE, ICON_CLEAR, ICON_HISTORY,
-    ICON_RANDOM, ICON_STATS,
+    ICON_RANDOM, ICON_STATS, ICON_SAVE,
     CARD_PADDING
 )
 from Resources.Themes import THEME_PALETTES
 
 # UI Component Imports
-from UI.ViewUtils import COLORS, set_window_icon
+from UI.ViewUtils import COLORS, set_window_icon, pin_visible_images, AnimationClock
 from UI.CardsPanel.Controller import CardManager
 from UI.Filters import FilterManager
 from UI.PopUpPanel.Controller import PopUpManager
@@ -73,6 +74,7 @@ class StickerBotApp(ctk.CTk):
         self.last_width = 0
 
         # --- MANAGERS ---
+        self.animation_clock = AnimationClock(self) # One timer for every animated card and preview
         self.popup_manager = PopUpManager(self)
         self.card_manager = CardManager(self)
         
@@ -96,6 +98,8 @@ class StickerBotApp(ctk.CTk):
         def load_task():
             # Heavy IO operation
             self.logic.load_library_data()
+            gc_thumbnail_cache(p.get('t_name') for p in self.library_data)
+            self.logic.prewarm_clipboard() # Favorites + most used: repeat copies skip the conversion
             # Once done, schedule UI update on main thread
             self.after(0, self._on_loading_complete)
             
@@ -110,6 +114,9 @@ class StickerBotApp(ctk.CTk):
         
         if not self.client.token:
             self.after(500, lambda: self.popup_manager.open_settings_modal())
+        else:
+            # Pick up packs that were still downloading when the app last closed
+            self.after(1000, self.logic.resume_incomplete_downloads)
             
         # Use existing mode if set, otherwise default.
         target_mode = self.current_layout_mode if self.current_layout_mode else "Normal"
@@ -182,6 +189,8 @@ class StickerBotApp(ctk.CTk):
         ctk.CTkButton(self.header_actions, text=ICON_SETTINGS, width=35, height=35, fg_color=COLORS["card_bg"], hover_color=COLORS["card_hover"], text_color=COLORS["text_main"], command=self.popup_manager.open_settings_modal).pack(side="right", padx=5)
         ctk.CTkButton(self.header_actions, text=ICON_RANDOM, width=35, height=35, fg_color=COLORS["card_bg"], hover_color=COLORS["card_hover"], text_color=COLORS["text_main"], command=self.logic.select_random_sticker).pack(side="right", padx=5)
         ctk.CTkButton(self.header_actions, text=ICON_STATS, width=35, height=35, fg_color=COLORS["card_bg"], hover_color=COLORS["card_hover"], text_color=COLORS["text_main"], command=self.logic.open_usage_stats).pack(side="right", padx=5)
+        # Export whatever the grid currently shows (filters applied)
+        ctk.CTkButton(self.header_actions, text=ICON_SAVE, width=35, height=35, fg_color=COLORS["card_bg"], hover_color=COLORS["card_hover"], text_color=COLORS["text_main"], command=lambda: self.logic.export_stickers("view")).pack(side="right", padx=5)
 
 
         # --- ROW 2: CONTEXT TITLE (Middle Bar) ---
@@ -255,8 +264,9 @@ class StickerBotApp(ctk.CTk):
         self.status_bar.grid(row=4, column=0, sticky="ew", pady=(5, 0))
         self.status_bar.grid_columnconfigure(1, weight=1)
 
-        self.status_label = ctk.CTkLabel(self.status_bar, text="Ready", font=FONT_SMALL, text_color=COLORS["text_sub"])
+        self.status_label = ctk.CTkLabel(self.status_bar, text="Ready", font=FONT_SMALL, text_color=COLORS["text_sub"], cursor="hand2")
         self.status_label.grid(row=0, column=0, padx=15, sticky="w")
+        self.status_label.bind("<Button-1>", lambda e: self.logic.open_queue()) # Click to manage the download queue
         self.status_prog = ctk.CTkProgressBar(self.status_bar, width=150, height=10, progress_color=COLORS["accent"])
         self.status_prog.grid(row=0, column=2, padx=15, sticky="e")
         self.status_prog.grid_remove() 
@@ -350,6 +360,7 @@ class StickerBotApp(ctk.CTk):
         self.header_subtitle_label.configure(text=f"{self.logic.total_items} Items")
 
         items = self.logic.get_current_page_items()
+        self.card_manager.begin_page()
         
         # --- RENDER STRATEGY ---
         if self.view_mode in ["library", "collection"]:
@@ -379,6 +390,14 @@ class StickerBotApp(ctk.CTk):
             for idx, item in enumerate(items):
                 # item = (sticker_data, pack_tname, index_in_pack)
                 self.card_manager.create_sticker_card(idx, item[0], item[1], item[2])
+            
+            # Stickers on this page download first if their pack is still in progress
+            self.logic.update_download_priority()
+        
+        self.card_manager.end_page()
+        
+        # Keep this page's images cached, let the previous view's go
+        pin_visible_images(getattr(card, 'image_path', None) for card in self.cards)
 
         self.canvas.yview_moveto(0.0)
         self.update_idletasks()
@@ -47,6 +47,12 @@ class PopUpManager:
     def open_usage_stats_modal(self):
         self.main_popup.open_usage_stats_modal()
 
+    def open_diagnostics_modal(self):
+        self.main_popup.open_diagnostics_modal()
+
+    def open_queue_modal(self, downloader):
+        self.main_popup.open_queue_modal(downloader)
+
     # ==========================================================================
     #   ROUTE TO: DetailPopUp (Right Sidebar Actions)
     # ==========================================================================
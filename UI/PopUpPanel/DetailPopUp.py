@@ -3,13 +3,12 @@ import customtkinter as ctk
 from typing import Optional, Callable, Any
 from pathlib import Path
 import math
-import cv2  # Needed for video thumbnails
-from PIL import Image
 
 from UI.PopUpPanel.Base import BasePopUp
 from UI.ViewUtils import COLORS, load_ctk_image, Tooltip
 from UI.CardsPanel.Utils import CardUtils
 from Core.Config import BASE_DIR, LIBRARY_FOLDER
+from Core import Lottie
 from Resources.Icons import (
     FONT_HEADER, FONT_TITLE, FONT_NORMAL, FONT_SMALL,
     ICON_ADD, ICON_REMOVE, ICON_RANDOM, ICON_FOLDER, ICON_SEARCH, ICON_LEFT
@@ -324,7 +323,7 @@ class DetailPopUp(BasePopUp):
             all_files = sorted(list(base_path.iterdir()), key=lambda x: x.name)
             query = query.lower()
             for f in all_files:
-                if f.suffix.lower() in {'.png', '.webp', '.gif', '.webm', '.mp4'}:
+                if f.suffix.lower() in {'.png', '.webp', '.gif', '.webm', '.mp4', '.tgs'} and not Lottie.is_preview_file(f):
                     if query and query not in f.name.lower(): continue
                     self.popup_items.append(str(f))
         
@@ -413,7 +412,7 @@ class DetailPopUp(BasePopUp):
                     found = False
                     # Quick search for a valid thumbnail
                     for f in base.iterdir():
-                        if f.suffix.lower() in {'.png', '.webp', '.gif', '.webm', '.mp4'}:
+                        if f.suffix.lower() in {'.png', '.webp', '.gif', '.webm', '.mp4'} and not Lottie.is_preview_file(f):
                             thumb_path = str(f); found = True; break
                     if not found: # Fallback specific check
                         for ext in ['.png', '.webp', '.gif', '.webm', '.mp4']: 
@@ -429,11 +428,7 @@ class DetailPopUp(BasePopUp):
                 card.is_animated_content = is_anim
                 card.image_path = thumb_path
                 
-                if thumb_path.lower().endswith(('.webm', '.mp4', '.mkv')):
-                    vid_thumb = self._generate_video_thumbnail(thumb_path, (80, 80))
-                    if vid_thumb: img_lbl.configure(image=vid_thumb, text="")
-                else:
-                    self.utils.load_image_to_label(img_lbl, thumb_path, (80, 80), ICON_FOLDER, add_overlay=False)
+                self.utils.load_image_to_label(img_lbl, thumb_path, (80, 80), ICON_FOLDER, add_overlay=False) # Videos show their cached poster
                 
                 if is_anim:
                     # Staggered animation start
@@ -486,12 +481,7 @@ class DetailPopUp(BasePopUp):
             frame.is_animated_content = is_anim
             frame.image_path = path
             
-            if path.lower().endswith(('.webm', '.mp4', '.mkv')):
-                vid_thumb = self._generate_video_thumbnail(path, (120, 120)) # UPDATED: 120x120
-                if vid_thumb: img_lbl.configure(image=vid_thumb, text="")
-                else: img_lbl.configure(text="VID")
-            else:
-                self.utils.load_image_to_label(img_lbl, path, (120, 120), "", add_overlay=False) # UPDATED: 120x120
+            self.utils.load_image_to_label(img_lbl, path, (120, 120), "", add_overlay=False) # UPDATED: 120x120 (videos: cached poster)
 
             if is_anim:
                 def start_anim(c=frame, p=path, l=img_lbl):
@@ -514,22 +504,7 @@ class DetailPopUp(BasePopUp):
         for widget in self.scroll_frame.winfo_children():
             if isinstance(widget, ctk.CTkFrame): # The grid wrapper
                  for card in widget.winfo_children(): # The cards
-                    if hasattr(card, 'anim_loop') and card.anim_loop:
-                        card.after_cancel(card.anim_loop)
-                        card.anim_loop = None
-
-    def _generate_video_thumbnail(self, path, size):
-        try:
-            cap = cv2.VideoCapture(path)
-            ret, frame = cap.read()
-            cap.release()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(frame)
-                pil_img.thumbnail(size, Image.Resampling.LANCZOS)
-                return ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=size)
-        except: pass
-        return None
+                    if hasattr(card, 'anim_loop'): self.utils.stop_card_animation(card)
 
     # ==========================================================================
     #   COLLECTION MANAGEMENT
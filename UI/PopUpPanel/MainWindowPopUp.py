@@ -1,15 +1,18 @@
 import customtkinter as ctk
 import webbrowser
-from tkinter import colorchooser
+from tkinter import colorchooser, filedialog
 from typing import Optional, Callable, List
 from pathlib import Path
 
 from UI.PopUpPanel.Base import BasePopUp
-from UI.ViewUtils import COLORS, ToastNotification, load_ctk_image
+from UI.ViewUtils import COLORS, ToastNotification, load_ctk_image, image_cache_summary, frame_cache_summary, AtlasLoader
+from UI.CardsPanel.Utils import CardUtils, ANIMATION_QUALITY_MODES
 from Core.Config import SETTINGS_FILE, save_json, load_json, BASE_DIR, LIBRARY_FOLDER
+from Core.Telemetry import format_bytes, format_duration
+from Core.AnimEncoder import ANIMATED_FORMATS
 from Resources.Icons import (
     FONT_HEADER, FONT_TITLE, FONT_NORMAL, FONT_SMALL, FONT_CAPTION,
-    ICON_CHECK, ICON_SAVE, ICON_ADD, ICON_SEARCH
+    ICON_CHECK, ICON_SAVE, ICON_ADD, ICON_SEARCH, ICON_CLEAR, ICON_UPDATE
 )
 from Resources.Themes import THEME_PALETTES
 
@@ -123,6 +126,138 @@ class MainWindowPopUp(BasePopUp):
             hover_color=COLORS["accent_hover"], command=save_token
         ).pack(side="left", padx=5)
         
+        # Download Engine Section
+        ctk.CTkLabel(scroll, text="Download Engine", font=FONT_TITLE, text_color=COLORS["text_sub"]).pack(pady=(20, 5), anchor="center")
+        
+        def on_engine_select(engine):
+            self.app.client.set_transport(engine)
+            self.app.logic.save_settings()
+            if self.app.client.transport_name != engine:
+                engine_menu.set(self.app.client.transport_name)
+                ToastNotification(self.settings_win, "Unavailable", "Async engine requires 'aiohttp'.")
+            else:
+                ToastNotification(self.settings_win, "Saved", f"Download engine: {engine}")
+        
+        engine_menu = ctk.CTkOptionMenu(
+            scroll, 
+            values=["Threaded", "Async"], 
+            command=on_engine_select,
+            fg_color=COLORS["dropdown_bg"], button_color=COLORS["accent"], 
+            button_hover_color=COLORS["accent_hover"], text_color=COLORS["dropdown_text"]
+        )
+        engine_menu.set(self.app.client.transport_name)
+        engine_menu.pack(fill="x", pady=5, padx=20)
+        
+        # Storage Profile Section
+        ctk.CTkLabel(scroll, text="Storage Profile", font=FONT_TITLE, text_color=COLORS["text_sub"]).pack(pady=(20, 5), anchor="center")
+        
+        def on_profile_select(profile):
+            self.app.client.set_storage_profile(profile)
+            self.app.logic.save_settings()
+            ToastNotification(self.settings_win, "Saved", f"Storage profile: {profile}")
+        
+        profile_menu = ctk.CTkOptionMenu(
+            scroll, 
+            values=["Passthrough", "Fast", "Archival"], 
+            command=on_profile_select,
+            fg_color=COLORS["dropdown_bg"], button_color=COLORS["accent"], 
+            button_hover_color=COLORS["accent_hover"], text_color=COLORS["dropdown_text"]
+        )
+        profile_menu.set(self.app.client.storage_profile)
+        profile_menu.pack(fill="x", pady=5, padx=20)
+        
+        ctk.CTkLabel(
+            scroll, text="Passthrough keeps Telegram's original files (fastest).\nArchival re-encodes losslessly. Applies to new downloads.", 
+            font=FONT_SMALL, text_color=COLORS["text_sub"]
+        ).pack(pady=(0, 5))
+        
+        # Card Images Section
+        ctk.CTkLabel(scroll, text="Card Images", font=FONT_TITLE, text_color=COLORS["text_sub"]).pack(pady=(20, 5), anchor="center")
+        
+        def on_card_images_select(mode):
+            AtlasLoader.enabled = mode == "Pack Atlases"
+            self.app.logic.save_settings()
+            ToastNotification(self.settings_win, "Saved", f"Card images: {mode}")
+        
+        atlas_menu = ctk.CTkOptionMenu(
+            scroll, 
+            values=["Pack Atlases", "Per-File Thumbnails"], 
+            command=on_card_images_select,
+            fg_color=COLORS["dropdown_bg"], button_color=COLORS["accent"], 
+            button_hover_color=COLORS["accent_hover"], text_color=COLORS["dropdown_text"]
+        )
+        atlas_menu.set("Pack Atlases" if AtlasLoader.enabled else "Per-File Thumbnails")
+        atlas_menu.pack(fill="x", pady=5, padx=20)
+        
+        ctk.CTkLabel(
+            scroll, text="Pack Atlases load a whole page of small cards from one image per pack.\nTurn off to load every card from its own file.", 
+            font=FONT_SMALL, text_color=COLORS["text_sub"]
+        ).pack(pady=(0, 5))
+        
+        # Animation Quality Section
+        ctk.CTkLabel(scroll, text="Animation Quality", font=FONT_TITLE, text_color=COLORS["text_sub"]).pack(pady=(20, 5), anchor="center")
+        
+        def on_quality_select(layout, quality):
+            CardUtils.animation_quality[layout] = quality
+            self.app.logic.save_settings()
+            if self.app.current_layout_mode == layout: self.app.refresh_view()
+            ToastNotification(self.settings_win, "Saved", f"{layout} layout: {quality}")
+        
+        for layout in ["Large", "Normal", "Small", "List"]:
+            row = ctk.CTkFrame(scroll, fg_color=COLORS["transparent"])
+            row.pack(fill="x", pady=2, padx=20)
+            ctk.CTkLabel(row, text=layout, width=70, anchor="w", font=FONT_NORMAL, text_color=COLORS["text_main"]).pack(side="left")
+            quality_menu = ctk.CTkOptionMenu(
+                row, 
+                values=ANIMATION_QUALITY_MODES, 
+                command=lambda q, l=layout: on_quality_select(l, q),
+                fg_color=COLORS["dropdown_bg"], button_color=COLORS["accent"], 
+                button_hover_color=COLORS["accent_hover"], text_color=COLORS["dropdown_text"]
+            )
+            quality_menu.set(CardUtils.animation_quality.get(layout, "Balanced"))
+            quality_menu.pack(side="left", fill="x", expand=True)
+        
+        ctk.CTkLabel(
+            scroll, text="Balanced lowers frame rate, frame count and resolution when a page has\nmany animated stickers. The detail panel always plays at full quality.", 
+            font=FONT_SMALL, text_color=COLORS["text_sub"]
+        ).pack(pady=(0, 5))
+        
+        # Clipboard Animations Section
+        ctk.CTkLabel(scroll, text="Clipboard Animations", font=FONT_TITLE, text_color=COLORS["text_sub"]).pack(pady=(20, 5), anchor="center")
+        
+        def on_clipboard_format_select(fmt):
+            self.app.logic.actions.clipboard_format = fmt
+            self.app.logic.save_settings()
+            ToastNotification(self.settings_win, "Saved", f"Animated stickers copy as {fmt}")
+        
+        clipboard_menu = ctk.CTkOptionMenu(
+            scroll, 
+            values=list(ANIMATED_FORMATS), 
+            command=on_clipboard_format_select,
+            fg_color=COLORS["dropdown_bg"], button_color=COLORS["accent"], 
+            button_hover_color=COLORS["accent_hover"], text_color=COLORS["dropdown_text"]
+        )
+        clipboard_menu.set(self.app.logic.actions.clipboard_format)
+        clipboard_menu.pack(fill="x", pady=5, padx=20)
+        
+        ctk.CTkLabel(
+            scroll, text="GIF pastes everywhere. WebP and APNG keep full colour and soft edges,\nbut not every app accepts them.", 
+            font=FONT_SMALL, text_color=COLORS["text_sub"]
+        ).pack(pady=(0, 5))
+        
+        # Diagnostics Section
+        ctk.CTkLabel(scroll, text="Diagnostics", font=FONT_TITLE, text_color=COLORS["text_sub"]).pack(pady=(20, 5), anchor="center")
+        ctk.CTkButton(
+            scroll, text="Download Diagnostics", 
+            fg_color=COLORS["card_bg"], text_color=COLORS["text_main"], 
+            hover_color=COLORS["card_hover"], command=self.open_diagnostics_modal
+        ).pack(fill="x", pady=5, padx=20)
+        ctk.CTkButton(
+            scroll, text="Download Queue", 
+            fg_color=COLORS["card_bg"], text_color=COLORS["text_main"], 
+            hover_color=COLORS["card_hover"], command=self.app.logic.open_queue
+        ).pack(fill="x", pady=5, padx=20)
+        
         # --- TAB 2: THEME CREATOR ---
         self._build_theme_creator(tab_custom)
 
@@ -211,7 +346,7 @@ class MainWindowPopUp(BasePopUp):
     # ==========================================================================
 
     def open_add_pack_modal(self):
-        win = self._create_base_window("Add Packs", 450, 320)
+        win = self._create_base_window("Add Packs", 450, 380)
         ctk.CTkLabel(win, text="Add New Packs", font=FONT_HEADER, text_color=COLORS["text_main"]).pack(pady=(20, 5))
         ctk.CTkLabel(win, text="Paste Telegram Sticker URLs (One per line)", font=FONT_NORMAL, text_color=COLORS["text_sub"]).pack()
         
@@ -235,21 +370,173 @@ class MainWindowPopUp(BasePopUp):
         btn_row.pack(pady=10)
         ctk.CTkButton(btn_row, text="Cancel", width=100, fg_color=COLORS["card_bg"], text_color=COLORS["text_main"], command=win.destroy).pack(side="left", padx=10)
         ctk.CTkButton(btn_row, text=f"{ICON_ADD} Queue Packs", width=100, fg_color=COLORS["btn_positive"], text_color=COLORS["text_on_positive"], command=confirm).pack(side="left", padx=10)
+        
+        # Local Import (folders or zip/tar archives, no Telegram needed)
+        def import_folder():
+            path = filedialog.askdirectory(parent=win, title="Import Sticker Folder")
+            if path:
+                if win.winfo_exists(): win.destroy()
+                self.app.logic.import_local([path])
+        
+        def import_archives():
+            paths = filedialog.askopenfilenames(
+                parent=win, title="Import Sticker Archives",
+                filetypes=[("Archives", "*.zip *.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz"), ("All Files", "*.*")]
+            )
+            if paths:
+                if win.winfo_exists(): win.destroy()
+                self.app.logic.import_local(list(paths))
+        
+        import_row = ctk.CTkFrame(win, fg_color=COLORS["transparent"])
+        import_row.pack(pady=(0, 10))
+        ctk.CTkLabel(import_row, text="Or import from disk:", font=FONT_SMALL, text_color=COLORS["text_sub"]).pack(side="left", padx=5)
+        ctk.CTkButton(import_row, text="Folder", width=80, fg_color=COLORS["card_bg"], text_color=COLORS["text_main"], hover_color=COLORS["card_hover"], command=import_folder).pack(side="left", padx=5)
+        ctk.CTkButton(import_row, text="Archive", width=80, fg_color=COLORS["card_bg"], text_color=COLORS["text_main"], hover_color=COLORS["card_hover"], command=import_archives).pack(side="left", padx=5)
 
     def open_update_modal(self, run_func: Callable):
-        win = self._create_base_window("Updating Library", 400, 180)
+        win = self._create_base_window("Updating Library", 400, 210)
         lbl = ctk.CTkLabel(win, text="Checking Updates...", font=FONT_HEADER, text_color=COLORS["text_main"])
         lbl.pack(pady=(30, 10))
         prog = ctk.CTkProgressBar(win, width=320, progress_color=COLORS["btn_positive"])
         prog.pack(pady=15)
         prog.set(0)
         
+        # Live throughput / ETA line
+        detail_lbl = ctk.CTkLabel(win, text="", font=FONT_SMALL, text_color=COLORS["text_sub"])
+        detail_lbl.pack()
+        
         run_func(
             lambda v: prog.set(v) if win.winfo_exists() else None,
             lambda t: lbl.configure(text=t) if win.winfo_exists() else None,
-            lambda: win.destroy() if win.winfo_exists() else None
+            lambda: win.destroy() if win.winfo_exists() else None,
+            lambda t: detail_lbl.configure(text=t) if win.winfo_exists() else None
         )
         
+    def open_queue_modal(self, downloader):
+        """Live view of the persistent download queue: reorder / cancel pending items, retry failed ones."""
+        win = self._create_base_window("Download Queue", 560, 520)
+        ctk.CTkLabel(win, text="Download Queue", font=FONT_HEADER, text_color=COLORS["text_main"]).pack(pady=(15, 5))
+        summary_lbl = ctk.CTkLabel(win, text="", font=FONT_SMALL, text_color=COLORS["text_sub"])
+        summary_lbl.pack()
+        
+        scroll = ctk.CTkScrollableFrame(win, fg_color=COLORS["transparent"])
+        scroll.pack(fill="both", expand=True, padx=15, pady=10)
+        
+        queue = downloader.queue
+        state_colors = {"pending": COLORS["text_sub"], "metadata": COLORS["accent"], "downloading": COLORS["accent"],
+                        "done": COLORS["btn_positive"], "failed": COLORS["btn_negative"]}
+        last_signature = [None]
+        
+        def act(fn, *args):
+            fn(*args)
+            render(force=True)
+        
+        def retry(item_id):
+            if queue.retry(item_id): downloader.start_worker()
+        
+        def small_btn(parent, text, cmd):
+            ctk.CTkButton(parent, text=text, width=28, height=26, fg_color=COLORS["card_bg"], text_color=COLORS["text_main"],
+                          hover_color=COLORS["card_hover"], command=cmd).pack(side="right", padx=2)
+        
+        def add_row(item):
+            row = ctk.CTkFrame(scroll, fg_color=COLORS["card_bg"], corner_radius=8)
+            row.pack(fill="x", pady=3)
+            
+            info = ctk.CTkFrame(row, fg_color="transparent")
+            info.pack(side="left", fill="x", expand=True, padx=10, pady=5)
+            ctk.CTkLabel(info, text=item["label"], font=FONT_NORMAL, text_color=COLORS["text_main"], anchor="w").pack(fill="x")
+            detail = f"{item['type']} • {item['state']}" + (f" • {item['error']}" if item.get("error") else "")
+            ctk.CTkLabel(info, text=detail, font=FONT_CAPTION, text_color=state_colors.get(item["state"], COLORS["text_sub"]), anchor="w").pack(fill="x")
+            
+            if item["state"] == "pending":
+                small_btn(row, ICON_CLEAR, lambda i=item["id"]: act(queue.cancel, i))
+                small_btn(row, "▼", lambda i=item["id"]: act(queue.move, i, 1))
+                small_btn(row, "▲", lambda i=item["id"]: act(queue.move, i, -1))
+                small_btn(row, "⤒", lambda i=item["id"]: act(queue.move, i, -len(queue)))
+            elif item["state"] == "failed":
+                small_btn(row, ICON_UPDATE, lambda i=item["id"]: act(retry, i))
+        
+        def render(force=False):
+            if not win.winfo_exists(): return
+            snap = queue.snapshot()
+            signature = [(i["id"], i["state"], i.get("error")) for i in snap["items"] + snap["history"]]
+            if force or signature != last_signature[0]:
+                last_signature[0] = signature
+                for child in scroll.winfo_children(): child.destroy()
+                if not signature:
+                    ctk.CTkLabel(scroll, text="Queue is empty.", text_color=COLORS["text_sub"]).pack(pady=50)
+                for item in snap["items"] + snap["history"]:
+                    add_row(item)
+            
+            pending = sum(1 for i in snap["items"] if i["state"] == "pending")
+            failed = sum(1 for i in snap["history"] if i["state"] == "failed")
+            summary_lbl.configure(text=f"{len(snap['items']) - pending} running • {pending} pending • {failed} failed")
+        
+        def poll():
+            if not win.winfo_exists(): return
+            render()
+            win.after(800, poll)
+        
+        btn_row = ctk.CTkFrame(win, fg_color=COLORS["transparent"])
+        btn_row.pack(pady=(0, 15))
+        ctk.CTkButton(btn_row, text="Clear Finished", width=120, fg_color=COLORS["card_bg"], text_color=COLORS["text_main"],
+                      hover_color=COLORS["card_hover"], command=lambda: act(queue.clear_history)).pack(side="left", padx=10)
+        
+        poll()
+
+    def open_diagnostics_modal(self):
+        """Per-stage download timings (session + recent packs), HTTP counters and CSV export."""
+        win = self._create_base_window("Download Diagnostics", 620, 520)
+        ctk.CTkLabel(win, text="Download Diagnostics", font=FONT_HEADER, text_color=COLORS["text_main"]).pack(pady=(15, 5))
+        
+        summary_lbl = ctk.CTkLabel(win, text="", font=FONT_NORMAL, text_color=COLORS["text_sub"], justify="left")
+        summary_lbl.pack(pady=5)
+        
+        table = ctk.CTkTextbox(
+            win, font=("Consolas", 12), wrap="none",
+            fg_color=COLORS["entry_bg"], border_color=COLORS["entry_border"], text_color=COLORS["entry_text"]
+        )
+        table.pack(fill="both", expand=True, padx=15, pady=10)
+        
+        def refresh():
+            if not win.winfo_exists(): return
+            telemetry = self.app.client.telemetry
+            session = telemetry.session_summary()
+            summary_lbl.configure(text=(
+                f"Session: {session['stickers']} stickers • {format_bytes(session['bytes'])} in {format_duration(session['elapsed_s'])} "
+                f"• {telemetry.bottleneck()}\n{self.app.client.http.stats.summary()}\n{image_cache_summary()}\n{frame_cache_summary()}\n{self.app.animation_clock.summary()}"
+            ))
+            
+            lines = [f"{'Scope':<24}{'Stage':<10}{'Count':>7}{'Avg ms':>9}{'Max ms':>9}{'Total s':>9}{'Bytes':>11}"]
+            for r in telemetry.rows():
+                scope = r['scope'] if len(r['scope']) <= 22 else r['scope'][:21] + "…"
+                lines.append(
+                    f"{scope:<24}{r['stage']:<10}{r['count']:>7}{r['avg_ms']:>9.1f}{r['max_ms']:>9.1f}"
+                    f"{r['total_s']:>9.2f}{format_bytes(r['bytes']) if r['bytes'] else '-':>11}"
+                )
+            table.configure(state="normal")
+            table.delete("1.0", "end")
+            table.insert("1.0", "\n".join(lines))
+            table.configure(state="disabled")
+        
+        def export_csv():
+            path = filedialog.asksaveasfilename(
+                parent=win, title="Export Diagnostics", defaultextension=".csv",
+                initialfile="download_telemetry.csv", filetypes=[("CSV", "*.csv")]
+            )
+            if not path: return
+            if self.app.client.telemetry.export_csv(Path(path)):
+                ToastNotification(win, "Exported", Path(path).name)
+            else:
+                ToastNotification(win, "Failed", "Nothing to export or file not writable.")
+        
+        btn_row = ctk.CTkFrame(win, fg_color=COLORS["transparent"])
+        btn_row.pack(pady=(0, 15))
+        ctk.CTkButton(btn_row, text="Refresh", width=100, fg_color=COLORS["card_bg"], text_color=COLORS["text_main"], command=refresh).pack(side="left", padx=10)
+        ctk.CTkButton(btn_row, text=f"{ICON_SAVE} Export CSV", width=120, fg_color=COLORS["accent"], text_color=COLORS["text_on_accent"], hover_color=COLORS["accent_hover"], command=export_csv).pack(side="left", padx=10)
+        
+        refresh()
+
     def show_search_history(self, history_list: List[str]):
         win = self._create_base_window("History", 300, 400)
         ctk.CTkLabel(win, text="Recent Searches", font=FONT_HEADER, text_color=COLORS["text_main"]).pack(pady=15)
@@ -3,14 +3,21 @@ import os
 import subprocess
 import unicodedata
 import time
+import threading
 import cv2  # ADDED: OpenCV for video decoding
+from collections import OrderedDict
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageSequence
 from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Dict, Optional, Tuple, Union, Callable, List
 
 # --- NEW IMPORTS FROM REFACTORED MODULES ---
-from Core.Config import logger, TEMP_FOLDER, SETTINGS_FILE, BASE_DIR, load_json
+from Core.Config import logger, SETTINGS_FILE, BASE_DIR, load_json
+from Core import Lottie
+from Core.Transcode import TranscodePool
+from Core import ThumbCache
+from Core.ClipboardCache import convert_for_clipboard
+from Core.ThumbCache import thumbnail_for, cached_thumbnail, atlas_key, atlas_paths, load_atlas_index, atlas_cell, build_atlas, ATLAS_TIERS
 from Resources.Themes import THEME_PALETTES
 
 # ==============================================================================
@@ -59,7 +66,206 @@ def apply_theme_palette(theme_name: str) -> str:
 #   IMAGE & VIDEO HANDLING (Visuals)
 # ==============================================================================
 
-_IMAGE_CACHE: Dict[Tuple[str, Tuple[int, int]], ctk.CTkImage] = {}
+# Decoded card images are kept within this budget (PIL pixels + Tk's copy of them)
+IMAGE_CACHE_BUDGET = 192 * 1024 * 1024
+# On a view change, unpinned entries are trimmed down to this share of the budget
+IMAGE_CACHE_VIEW_TRIM = 0.5
+# Cache keys round requested sizes to this step, so resize steps a few pixels apart share one
+# entry. Images are still shown at the requested size.
+IMAGE_SIZE_QUANTUM = 16
+
+def quantize_size(size: Tuple[int, int]) -> Tuple[int, int]:
+    q = IMAGE_SIZE_QUANTUM
+    return tuple(max(q, int(round(v / q)) * q) for v in size)
+
+class ImageCache:
+    """
+    The Vault.
+    Byte-budgeted LRU of decoded PIL images keyed by (path, quantized size), shared by
+    AsyncImageLoader and load_ctk_image, which wrap them in a CTkImage at the requested size. Entries whose path is pinned (cards on
+    screen) are never evicted. Thread-safe: loader callbacks run on worker threads.
+    """
+
+    def __init__(self, budget: int = IMAGE_CACHE_BUDGET):
+        self.budget = budget
+        self._entries: "OrderedDict[Tuple[str, Tuple[int, int]], Tuple[Image.Image, int]]" = OrderedDict()
+        self._pinned: set = set()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def estimate_bytes(pil_img: Image.Image) -> int:
+        """Pixels held twice: the PIL copy inside CTkImage and the Tk PhotoImage made from it."""
+        return pil_img.width * pil_img.height * len(pil_img.getbands()) * 2
+
+    def get(self, key) -> Optional[Image.Image]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, img: Image.Image, nbytes: int):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old: self.bytes -= old[1]
+            self._entries[key] = (img, nbytes)
+            self.bytes += nbytes
+            self._evict(self.budget)
+
+    def set_pinned(self, paths):
+        """Replaces the set of on-screen paths (all sizes of a pinned path are kept)."""
+        with self._lock:
+            self._pinned = {p for p in paths if p}
+
+    def trim(self, fraction: float = IMAGE_CACHE_VIEW_TRIM):
+        """Drops least recently used unpinned entries until under 'fraction' of the budget."""
+        with self._lock:
+            self._evict(int(self.budget * fraction))
+
+    def _evict(self, target: int):
+        if self.bytes <= target: return
+        for key in list(self._entries):
+            if self.bytes <= target: break
+            if key[0] in self._pinned: continue
+            self.bytes -= self._entries.pop(key)[1]
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "budget": self.budget, "pinned": len(self._pinned),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def summary(self) -> str:
+        st = self.stats()
+        lookups = st["hits"] + st["misses"]
+        hit_rate = f"{st['hits'] / lookups:.0%}" if lookups else "-"
+        return (f"Image cache: {st['entries']} images, {st['bytes'] / 1048576:.1f}/{st['budget'] / 1048576:.0f} MB "
+                f"• hit rate {hit_rate} • {st['evictions']} evicted")
+
+_IMAGE_CACHE = ImageCache()
+
+def pin_visible_images(paths):
+    """Called after a view is rendered: keeps on-screen images and trims the rest."""
+    _IMAGE_CACHE.set_pinned(paths)
+    _IMAGE_CACHE.trim()
+
+def image_cache_summary() -> str:
+    return _IMAGE_CACHE.summary()
+
+class AtlasLoader:
+    """
+    The Sprite Sheet.
+    Serves small card images as crops of their pack's atlas (see Core.ThumbCache), so a
+    gallery page costs one read + one decode per pack instead of one per card.
+    The last few decoded sheets stay in memory. Stale or missing atlases are rebuilt
+    in the background (incrementally, once per session: downloads rebuild their own pack);
+    until then cards fall back to per-file thumbnails.
+    """
+    enabled = True                  # "Thumbnail Atlases" setting
+    MEMORY_SHEETS = 3               # Decoded sheets kept (a 16x16 sheet at 180px is ~37 MB of RGBA)
+    _pool = TranscodePool(workers=1)
+    _sheets: "OrderedDict[Tuple[str, int], Tuple[dict, Image.Image, int]]" = OrderedDict()
+    _key_locks: Dict[Tuple[str, int], threading.Lock] = {}
+    _rebuilt: set = set()           # Keys already rebuilt (or being rebuilt) from the UI
+    _lock = threading.Lock()
+
+    @classmethod
+    def crop(cls, path: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+        """The card image cut from its pack atlas, or None (caller loads the file). Worker threads only."""
+        key = atlas_key(path, size) if cls.enabled else None
+        if not key: return None
+
+        sheet = cls._sheet(key)
+        cell = atlas_cell(sheet[0], Path(path)) if sheet else None
+        if cell is None:
+            cls.rebuild(str(Path(path).parent), key[1])
+            return None
+        return sheet[1].crop((cell["x"], cell["y"], cell["x"] + cell["w"], cell["y"] + cell["h"]))
+
+    @classmethod
+    def _sheet(cls, key: Tuple[str, int]) -> Optional[Tuple[dict, Image.Image, int]]:
+        sheet_path, index_path = atlas_paths(*key)
+        try:
+            version = index_path.stat().st_mtime_ns # Written after the sheet: a new index means a new sheet
+        except OSError:
+            return None
+
+        with cls._lock:
+            cached = cls._sheets.get(key)
+            if cached and cached[2] == version:
+                cls._sheets.move_to_end(key)
+                return cached
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+
+        # One decode per sheet: concurrent cards of the same pack wait for it instead of decoding again
+        with key_lock:
+            with cls._lock:
+                cached = cls._sheets.get(key)
+                if cached and cached[2] == version: return cached
+            index = load_atlas_index(*key)
+            if not index: return None
+            try:
+                with Image.open(sheet_path) as img:
+                    img.load()
+                    sheet = (index, img.copy(), version)
+            except Exception as e:
+                logger.warning(f"Atlas load failed ({key[0]}): {e}")
+                return None
+            with cls._lock:
+                cls._sheets[key] = sheet
+                while len(cls._sheets) > cls.MEMORY_SHEETS: cls._sheets.popitem(last=False)
+            return sheet
+
+    @classmethod
+    def rebuild(cls, pack_folder: str, tier: int):
+        """Schedules an incremental rebuild; the cached sheet is dropped once the new one is written."""
+        key = (Path(pack_folder).name, tier)
+        with cls._lock:
+            if key in cls._rebuilt: return
+            cls._rebuilt.add(key)
+
+        def _done(future: Future):
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Atlas build failed ({key[0]}@{tier}): {e}")
+
+        cls._pool.submit(build_atlas, pack_folder, tier).add_done_callback(_done)
+
+    @classmethod
+    def invalidate(cls, pack_tname: str):
+        """Forgets a pack's sheets (pack removed or rewritten) and allows another rebuild."""
+        with cls._lock:
+            for tier in ATLAS_TIERS:
+                cls._sheets.pop((pack_tname, tier), None)
+                cls._rebuilt.discard((pack_tname, tier))
+
+def _load_scaled(path: str, size: Tuple[int, int], build: bool = True) -> Image.Image:
+    """
+    Decodes from the pack atlas or the on-disk thumbnail tier when there is one
+    (atlas crops and thumbnail generation only when 'build': never on the UI thread).
+    """
+    pil_copy = AtlasLoader.crop(path, size) if build else None
+    if pil_copy is None:
+        source = thumbnail_for(path, size) if build else (cached_thumbnail(path, size) or path)
+        with Image.open(source) as pil_img:
+            pil_img.load()
+            pil_copy = pil_img.copy()
+    # High quality downsampling for static images
+    pil_copy.thumbnail(size, Image.Resampling.LANCZOS)
+    return pil_copy
 
 class AsyncImageLoader:
     """
@@ -73,19 +279,17 @@ class AsyncImageLoader:
             callback_on_complete(None)
             return
 
-        cache_key = (path, size)
-        if cache_key in _IMAGE_CACHE:
-            callback_on_complete(_IMAGE_CACHE[cache_key])
+        cache_key = (path, quantize_size(size))
+        cached = _IMAGE_CACHE.get(cache_key)
+        if cached:
+            callback_on_complete(ctk.CTkImage(light_image=cached, size=size))
             return
 
         def _load_task() -> Optional[ctk.CTkImage]:
             try:
-                with Image.open(path) as pil_img:
-                    pil_img.load()
-                    pil_copy = pil_img.copy()
-                    # High quality downsampling for static images
-                    pil_copy.thumbnail(size, Image.Resampling.LANCZOS)
-                    return ctk.CTkImage(light_image=pil_copy, size=size)
+                pil_img = _load_scaled(path, size)
+                _IMAGE_CACHE.put(cache_key, pil_img, ImageCache.estimate_bytes(pil_img))
+                return ctk.CTkImage(light_image=pil_img, size=size)
             except Exception as e:
                 logger.error(f"Image load error ({path}): {e}")
                 return None
@@ -93,7 +297,6 @@ class AsyncImageLoader:
         def _done_callback(future: Future):
             try:
                 img = future.result()
-                if img: _IMAGE_CACHE[cache_key] = img
                 callback_on_complete(img)
             except Exception as e:
                 logger.error(f"Async load callback error: {e}")
@@ -102,202 +305,502 @@ class AsyncImageLoader:
         future = cls._executor.submit(_load_task)
         future.add_done_callback(_done_callback)
 
+class PreviewLoader:
+    """
+    The Animator.
+    Renders stickers that cannot be shown directly (TGS, video) to a cached animated WebP
+    in background processes. Callbacks receive the preview path (or None) on a worker thread;
+    callers hop to Tk with app.after. Concurrent requests for the same file share one render.
+    Subclasses set KIND, MISSING_HINT, _pending and the three callables below
+    (as staticmethods): cached(path), available() and render(path) (picklable, returns {"path"}).
+    """
+    _pool = TranscodePool(workers=max(1, (os.cpu_count() or 2) // 2)) # Leave cores for downloads and the UI
+    _lock = threading.Lock()
+    _pending: Dict[str, List[Callable[[Optional[str]], None]]]
+    _warned = False
+    KIND: str
+    MISSING_HINT: str
+    cached: Callable[[str], Optional[str]]
+    available: Callable[[], bool]
+    render: Callable[[str], Dict]
+
+    @classmethod
+    def request(cls, path: str, callback: Callable[[Optional[str]], None]):
+        cached = cls.cached(path)
+        if cached or not cls.available():
+            if not cached and not cls._warned:
+                cls._warned = True
+                logger.warning(f"{cls.KIND} previews disabled: {cls.MISSING_HINT}")
+            callback(cached)
+            return
+
+        with cls._lock:
+            if path in cls._pending:
+                cls._pending[path].append(callback)
+                return
+            cls._pending[path] = [callback]
+
+        def _done(future: Future):
+            try:
+                result = future.result().get("path")
+            except Exception as e:
+                logger.error(f"{cls.KIND} render error ({path}): {e}")
+                result = None
+            with cls._lock:
+                callbacks = cls._pending.pop(path, [])
+            for cb in callbacks:
+                try: cb(result)
+                except Exception as e: logger.error(f"{cls.KIND} preview callback error: {e}")
+
+        cls._pool.submit(cls.render, path).add_done_callback(_done)
+
+class TgsPreviewLoader(PreviewLoader):
+    """Lottie stickers: one WebP beside the .tgs (see Core.Lottie)."""
+    _pending = {}
+    KIND = "TGS"
+    MISSING_HINT = "install 'rlottie-python' to render animated stickers."
+    cached = staticmethod(Lottie.cached_preview)
+    available = staticmethod(Lottie.is_available)
+    render = staticmethod(Lottie.render_tgs_preview)
+
+class VideoPreviewLoader(PreviewLoader):
+    """
+    Video stickers: a small evenly sampled WebP plus a poster frame in the thumbnail store
+    (see Core.ThumbCache), so cards never open the video container itself.
+    """
+    _pending = {}
+    KIND = "Video"
+    MISSING_HINT = "install 'opencv-python' to preview video stickers."
+    cached = staticmethod(ThumbCache.cached_video_preview)
+    available = staticmethod(ThumbCache.video_preview_available)
+    render = staticmethod(ThumbCache.render_video_preview)
+
 def load_ctk_image(path: str, size: Tuple[int, int]) -> Optional[ctk.CTkImage]:
     """Synchronous image loader (blocks UI, use sparingly)."""
     if not path or not os.path.exists(path): return None
     
-    cache_key = (path, size)
-    if cache_key in _IMAGE_CACHE: return _IMAGE_CACHE[cache_key]
+    cache_key = (path, quantize_size(size))
+    cached = _IMAGE_CACHE.get(cache_key)
+    if cached: return ctk.CTkImage(light_image=cached, size=size)
     
     try:
-        with Image.open(path) as pil_img:
-            pil_img.load()
-            pil_copy = pil_img.copy()
-            # High quality downsampling for static images
-            pil_copy.thumbnail(size, Image.Resampling.LANCZOS)
-            ctk_img = ctk.CTkImage(light_image=pil_copy, size=size)
-            _IMAGE_CACHE[cache_key] = ctk_img
-            return ctk_img
+        pil_img = _load_scaled(path, size, build=False) # Don't encode thumbnails on the UI thread
+        _IMAGE_CACHE.put(cache_key, pil_img, ImageCache.estimate_bytes(pil_img))
+        return ctk.CTkImage(light_image=pil_img, size=size)
     except Exception as e:
         logger.error(f"Sync load error ({path}): {e}")
         return None
 
-def load_video_frames(path: str, size: Tuple[int, int], max_frames: int = 120) -> List[ctk.CTkImage]:
+# ==============================================================================
+#   ANIMATION FRAMES (Shared Decode Cache)
+# ==============================================================================
+
+# Decoded animation frames (GIF / animated WebP / video) are kept within this budget
+FRAME_CACHE_BUDGET = 256 * 1024 * 1024
+VIDEO_EXTENSIONS = ('.webm', '.mp4', '.mkv')
+MIN_FRAME_DURATION = 20 # Shorter GIF delays play at 100 ms, as in browsers
+
+class FrameSequence:
     """
-    ADDED: Decodes video files (WebM, MP4) into a list of CTkImages using OpenCV.
-    This creates a pre-buffered list of frames for smooth playback.
+    Decoded frames of one (path, size, frame cap) with per-frame durations in ms.
+    Filled progressively by the decoder: players may start once the first frame exists
+    and should step with next_index(). CTkImages are created on first display (main thread).
     """
-    if not path or not os.path.exists(path): return []
-    
-    frames = []
-    try:
-        # Open video file
-        cap = cv2.VideoCapture(path)
-        if not cap.isOpened(): return []
-        
-        count = 0
-        target_w, target_h = size
-
-        while True:
-            ret, frame = cap.read()
-            # Stop if no frame or limit reached (prevent memory overflow)
-            if not ret or count >= max_frames: 
-                break
-                
-            # 1. Resize Frame (OpenCV uses width, height)
-            # Smart Interpolation Selection
-            h, w = frame.shape[:2]
-            
-            # If target is larger than source, use LANCZOS4 (best for upscaling)
-            if target_w > w or target_h > h:
-                interpolation = cv2.INTER_LANCZOS4
-            # If target is smaller, use AREA (best for downscaling/shrinking)
-            else:
-                interpolation = cv2.INTER_AREA
-
-            frame = cv2.resize(frame, size, interpolation=interpolation)
-            
-            # 2. Color Convert (OpenCV is BGR, we need RGB)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # 3. Convert to Pillow -> CTkImage
-            pil_img = Image.fromarray(frame)
-            ctk_img = ctk.CTkImage(light_image=pil_img, size=size)
-            
-            frames.append(ctk_img)
-            count += 1
-            
-        cap.release()
-        
-    except Exception as e:
-        logger.error(f"Video decode error ({path}): {e}")
-        return []
-        
-    return frames
 
-def resize_image_to_temp(path: str, size_name: str) -> Optional[str]:
-    """Resizes image/converts WebP/WebM for clipboard usage. Handles GIFs and Videos correctly."""
-    if not path or not os.path.exists(path): return None
-    
-    size_map = {"Large": 1024, "Big": 512, "Normal": 256, "Small": 128, "Tiny": 64}
-    target_dim = size_map.get(size_name.split(" ")[0])
-    
-    path_lower = path.lower()
-    is_webp = path_lower.endswith(".webp")
-    is_webm = path_lower.endswith(".webm")
-    
-    # If it's a static file and no resize needed, and not WebP/WebM, return as is.
-    if not target_dim and not is_webp and not is_webm: return path
-    
-    timestamp = int(time.time() * 1000)
+    def __init__(self, frames: Optional[List[Image.Image]] = None, durations: Optional[List[int]] = None):
+        self.frames = frames or []
+        self.durations = durations or []
+        self.complete = frames is not None
+        self.nbytes = sum(ImageCache.estimate_bytes(f) for f in self.frames)
+        self._wrapped: Dict[tuple, ctk.CTkImage] = {}
+        # Streaming state (guarded by the FrameCache lock)
+        self._interest: List[threading.Event] = []
+        self._waiting: List[Callable[[Optional["FrameSequence"]], None]] = []
+        self._started = False
+        self._done = threading.Event()
+        if self.complete: self._done.set()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def append(self, frame: Optional[Image.Image], duration: int):
+        """Adds a frame, or with frame=None extends the last one (a frame dropped by decimation)."""
+        if frame is None:
+            if self.durations: self.durations[-1] += duration
+            return
+        self.durations.append(duration) # Duration first: a player that sees the frame can read its delay
+        self.frames.append(frame)
+        self.nbytes += ImageCache.estimate_bytes(frame)
+
+    def next_index(self, idx: int) -> int:
+        """Next frame to show. While still decoding, holds on the newest frame instead of wrapping."""
+        if idx + 1 < len(self.frames): return idx + 1
+        return 0 if self.complete else idx
+
+    def is_static(self) -> bool:
+        return self.complete and len(self.frames) == 1
+
+    def wanted(self) -> bool:
+        """False once every consumer has cancelled (cards destroyed, selection changed)."""
+        return any(not e.is_set() for e in self._interest)
 
-    # --- VIDEO (WEBM) HANDLING ---
-    if is_webm:
+    def ctk_image(self, idx: int, size: Optional[Tuple[int, int]] = None, decorate: Optional[Callable[[Image.Image], Image.Image]] = None) -> ctk.CTkImage:
+        """Frame 'idx' as a CTkImage shown at 'size' (default: its own), optionally drawn on by 'decorate'."""
+        key = (idx, size, decorate)
+        img = self._wrapped.get(key)
+        if img is None:
+            pil_img = decorate(self.frames[idx].copy()) if decorate else self.frames[idx]
+            img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=size or pil_img.size)
+            self._wrapped[key] = img
+        return img
+
+def _iter_frames(path: str, size: Tuple[int, int], max_frames: int, max_fps: Optional[int] = None):
+    """
+    Yields (frame, duration ms) scaled to fit 'size', up to 'max_frames' (worker threads).
+    With 'max_fps', frames shown sooner than 1/max_fps after the last kept one are dropped
+    and yielded as (None, duration): their time is added to the kept frame, so playback
+    keeps the original timing. Dropped frames skip the resize (and the decode, for video).
+    """
+    min_delay = 1000 / max_fps if max_fps else 0
+    count, held = 0, 0.0
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        cap = cv2.VideoCapture(path)
         try:
-            temp_path = os.path.join(TEMP_FOLDER, f"temp_{timestamp}_{os.path.basename(path).split('.')[0]}.gif")
-            
-            cap = cv2.VideoCapture(path)
-            if not cap.isOpened(): return None
-            
-            frames = []
             fps = cap.get(cv2.CAP_PROP_FPS) or 30
-            
-            while True:
+            duration = max(MIN_FRAME_DURATION, int(round(1000 / fps)))
+            while count < max_frames:
+                if count and held < min_delay:
+                    if not cap.grab(): break
+                    held += duration
+                    yield None, duration
+                    continue
                 ret, frame = cap.read()
                 if not ret: break
-                
-                # Convert BGR (OpenCV) to RGB (Pillow)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(frame)
-                
-                # Resize if needed
-                if target_dim:
-                    ratio = min(target_dim / pil_img.width, target_dim / pil_img.height)
-                    new_w = int(pil_img.width * ratio)
-                    new_h = int(pil_img.height * ratio)
-                    pil_img = pil_img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                
-                frames.append(pil_img)
-            
+                pil_img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                pil_img.thumbnail(size, Image.Resampling.LANCZOS)
+                count, held = count + 1, duration
+                yield pil_img, duration
+        finally:
             cap.release()
-            
-            if frames:
-                # Calculate duration per frame in ms
-                duration = int(1000 / fps)
-                frames[0].save(
-                    temp_path, 
-                    save_all=True, 
-                    append_images=frames[1:], 
-                    loop=0, 
-                    duration=duration, 
-                    disposal=2
-                )
-                return temp_path
+    else:
+        with Image.open(path) as im:
+            for frame in ImageSequence.Iterator(im):
+                if count >= max_frames: break
+                if count and held < min_delay:
+                    frame.load() # WebP fills in 'duration' when the frame is decoded
+                    duration = frame.info.get('duration', 100) or 100
+                    duration = duration if duration >= MIN_FRAME_DURATION else 100
+                    held += duration
+                    yield None, duration
+                    continue
+                f = frame.convert("RGBA") # Load first: WebP fills in 'duration' when the frame is decoded
+                duration = frame.info.get('duration', 100) or 100
+                duration = duration if duration >= MIN_FRAME_DURATION else 100
+                f.thumbnail(size, Image.Resampling.LANCZOS)
+                count, held = count + 1, duration
+                yield f, duration
+
+class FrameCache:
+    """
+    The Reel.
+    Byte-budgeted LRU of decoded FrameSequences keyed by (path, quantized size, frame cap, fps cap),
+    shared by card animations, the detail panel and pop-ups, so reselecting a sticker or
+    returning to a page does not decode it again. Entries are dropped when their file changes.
+
+    Decoding streams: consumers get the sequence as soon as its first frame exists and it
+    keeps filling while they play. Concurrent requests for the same key share one decode,
+    which stops early once every consumer has cancelled (and is then not cached).
+    """
+
+    def __init__(self, budget: int = FRAME_CACHE_BUDGET):
+        self.budget = budget
+        self._entries: "OrderedDict[tuple, Tuple[FrameSequence, int]]" = OrderedDict()
+        self._inflight: Dict[tuple, FrameSequence] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cancelled = 0
+
+    def peek(self, path: str, size: Tuple[int, int], max_frames: int, max_fps: Optional[int] = None) -> Optional[FrameSequence]:
+        """Cached complete sequence or None, without decoding (safe on the UI thread)."""
+        key = (path, quantize_size(size), max_frames, max_fps)
+        try:
+            version = os.stat(path).st_mtime_ns
+        except OSError:
             return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != version: return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def stream(self, path: str, size: Tuple[int, int], max_frames: int,
+               on_start: Callable[[Optional[FrameSequence]], None], cancel: Optional[threading.Event] = None,
+               max_fps: Optional[int] = None):
+        """
+        Calls on_start(seq) once the first frame is decoded (immediately on a hit), or
+        on_start(None) if the file cannot be decoded. Blocks only if this call does the
+        decoding, so run it on a worker thread. 'cancel' withdraws this consumer's interest.
+        'max_fps' decimates (see _iter_frames); None keeps every frame.
+        """
+        cached = self.peek(path, size, max_frames, max_fps)
+        if cached:
+            on_start(cached)
+            return
+
+        key = (path, quantize_size(size), max_frames, max_fps)
+        with self._lock:
+            seq = self._inflight.get(key)
+            owner = seq is None
+            if owner:
+                seq = self._inflight[key] = FrameSequence()
+            seq._interest.append(cancel or threading.Event())
+            started = seq._started
+            if not started: seq._waiting.append(on_start)
+        if not owner:
+            if started: on_start(seq if seq.frames else None)
+            return
+        self._decode(key, seq)
+
+    def load(self, path: str, size: Tuple[int, int], max_frames: int, max_fps: Optional[int] = None) -> Optional[FrameSequence]:
+        """Complete sequence (cached, shared or freshly decoded), None if the file has no frames (worker threads)."""
+        result = []
+        self.stream(path, size, max_frames, result.append, max_fps=max_fps)
+        seq = result[0] if result else None
+        if seq is not None: seq._done.wait()
+        return seq if seq is not None and seq.complete else None
+
+    def _decode(self, key, seq: FrameSequence):
+        path, size, max_frames, max_fps = key
+        version = None
+        try:
+            version = os.stat(path).st_mtime_ns
+            for frame, duration in _iter_frames(path, size, max_frames, max_fps):
+                seq.append(frame, duration)
+                if frame is not None and len(seq) == 1: self._start(seq)
+                with self._lock:
+                    if not seq.wanted(): # Nobody left to watch: stop, and don't cache a partial sequence
+                        self._inflight.pop(key, None)
+                        self.cancelled += 1
+                        seq._done.set()
+                        return
         except Exception as e:
-            logger.error(f"WebM conversion error: {e}")
-            return path # Fallback
+            logger.error(f"Frame decode error ({path}): {e}")
+
+        seq.complete = True
+        with self._lock:
+            self._inflight.pop(key, None)
+            self.misses += 1
+            if seq.frames and version is not None: self._put(key, seq, version)
+        seq._done.set()
+        if not seq.frames: self._start(seq)
+
+    def _start(self, seq: FrameSequence):
+        with self._lock:
+            seq._started = True
+            waiting, seq._waiting = seq._waiting, []
+        for cb in waiting:
+            try: cb(seq if seq.frames else None)
+            except Exception as e: logger.error(f"Frame stream callback error: {e}")
+
+    def _put(self, key, seq: FrameSequence, version: int):
+        old = self._entries.pop(key, None)
+        if old: self.bytes -= old[0].nbytes
+        self._entries[key] = (seq, version)
+        self.bytes += seq.nbytes
+        # Playing cards keep their own reference, so eviction only releases memory once they stop
+        while self.bytes > self.budget and len(self._entries) > 1:
+            self.bytes -= self._entries.popitem(last=False)[1][0].nbytes
+            self.evictions += 1
 
-    # --- IMAGE/GIF HANDLING ---
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def summary(self) -> str:
+        with self._lock:
+            lookups = self.hits + self.misses
+            hit_rate = f"{self.hits / lookups:.0%}" if lookups else "-"
+            return (f"Frame cache: {len(self._entries)} animations, {self.bytes / 1048576:.1f}/{self.budget / 1048576:.0f} MB "
+                    f"• hit rate {hit_rate} • {self.evictions} evicted • {self.cancelled} decodes cancelled")
+
+FRAME_CACHE = FrameCache()
+
+def frame_cache_summary() -> str:
+    return FRAME_CACHE.summary()
+
+# ==============================================================================
+#   ANIMATION CLOCK (One Timer For Every Animation)
+# ==============================================================================
+
+ANIMATION_FPS_CAP = 30          # Ticks per second at most, however short the frame delays
+ANIMATION_IDLE_POLL = 250       # ms between checks while paused (unfocused / minimized)
+
+class _Player:
+    __slots__ = ("seq", "render", "owner", "scroll_item", "active", "idx", "due")
+
+    def __init__(self, seq, render, owner, scroll_item, active):
+        self.seq = seq
+        self.render = render
+        self.owner = owner
+        self.scroll_item = scroll_item
+        self.active = active
+        self.idx = 0
+        self.due = 0.0
+
+class AnimationClock:
+    """
+    The Metronome.
+    Drives every animation (cards, detail panel, pop-ups) from one Tk timer instead of
+    one 'after' loop per widget. Each tick advances only the players whose frame is due;
+    cards scrolled out of the canvas viewport hold their frame, and everything pauses
+    while the app is unfocused or minimized. The timer stops when nothing is playing.
+    """
+
+    def __init__(self, app, fps_cap: int = ANIMATION_FPS_CAP):
+        self.app = app
+        self.fps_cap = fps_cap
+        self._players: Dict[int, _Player] = {}
+        self._ids = 0
+        self._job = None
+        self.paused = False
+        # Load counters (see summary / reset_stats)
+        self._started = time.monotonic()
+        self.ticks = 0
+        self.frames_shown = 0
+        self.frames_held = 0 # Due, but off screen
+        self.busy = 0.0      # Seconds spent inside ticks
+
+    # --- Registration (Main thread) ---
+
+    def play(self, seq: "FrameSequence", render: Callable[[int], None], owner, scroll_item=None,
+             active: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Shows frame 0 now and keeps advancing 'seq' until stop() or until 'owner' is destroyed.
+        render(idx) displays a frame. 'scroll_item' is a widget inside the main canvas whose
+        visibility gates playback (None: always considered visible); 'active' is an extra
+        gate (e.g. hover-only cards), checked before every frame.
+        """
+        self._ids += 1
+        player = _Player(seq, render, owner, scroll_item, active)
+        render(0)
+        if seq.is_static(): return self._ids # Nothing to advance
+        player.due = time.monotonic() + seq.durations[0] / 1000
+        self._players[self._ids] = player
+        self._schedule(0)
+        return self._ids
+
+    def stop(self, handle: Optional[int]):
+        if handle: self._players.pop(handle, None)
+
+    # --- Ticking ---
+
+    def _schedule(self, delay_ms: int):
+        if self._job is None:
+            self._job = self.app.after(max(1, int(delay_ms)), self._tick)
+
+    def _is_active(self) -> bool:
+        try:
+            if self.app.state() == "iconic": return False
+            return self.app.focus_get() is not None # None while another application has focus
+        except Exception:
+            return True # focus_get can fail on transient widgets (e.g. open dropdowns)
+
+    def _viewport(self) -> Optional[Tuple[int, int]]:
+        canvas = getattr(self.app, 'canvas', None)
+        if canvas is None: return None
+        top = int(canvas.canvasy(0))
+        return top, top + canvas.winfo_height()
+
+    @staticmethod
+    def _on_screen(widget, view: Optional[Tuple[int, int]]) -> bool:
+        if view is None: return True
+        y = widget.winfo_y()
+        return y + widget.winfo_height() > view[0] and y < view[1]
+
+    def _tick(self):
+        self._job = None
+        if not self._players: return
+        if not self._is_active():
+            self.paused = True
+            self._schedule(ANIMATION_IDLE_POLL)
+            return
+        self.paused = False
+
+        start = time.perf_counter()
+        now = time.monotonic()
+        view = self._viewport()
+        next_due = now + ANIMATION_IDLE_POLL / 1000
+
+        for handle, p in list(self._players.items()):
+            try:
+                if not p.owner.winfo_exists():
+                    del self._players[handle]
+                    continue
+                if now >= p.due:
+                    delay = p.seq.durations[p.idx] / 1000
+                    if (p.active is not None and not p.active()) or (p.scroll_item is not None and not self._on_screen(p.scroll_item, view)):
+                        self.frames_held += 1 # Hold the frame; resume from here when scrolled back / hovered
+                    else:
+                        p.idx = p.seq.next_index(p.idx)
+                        p.render(p.idx)
+                        self.frames_shown += 1
+                        delay = p.seq.durations[p.idx] / 1000
+                    # Late ticks don't bunch up frames: re-anchor when more than a frame behind
+                    p.due = p.due + delay if now - p.due < delay else now + delay
+                next_due = min(next_due, p.due)
+            except Exception:
+                self._players.pop(handle, None) # Widget went away mid-tick
+
+        self.ticks += 1
+        self.busy += time.perf_counter() - start
+        if self._players:
+            self._schedule(max(1000 / self.fps_cap, (next_due - time.monotonic()) * 1000))
+
+    # --- Diagnostics ---
+
+    def summary(self) -> str:
+        """Load since the previous call (the diagnostics window polls it), then starts a new window."""
+        elapsed = max(1e-6, time.monotonic() - self._started)
+        load = self.busy / elapsed
+        per_tick = (self.busy / self.ticks * 1000) if self.ticks else 0.0
+        state = " • paused" if self.paused else ""
+        text = (f"Animation clock: {len(self._players)} playing • {self.ticks / elapsed:.1f} ticks/s "
+                f"• {self.frames_shown / elapsed:.0f} frames/s ({self.frames_held / elapsed:.0f}/s held off screen or idle) "
+                f"• {per_tick:.2f} ms/tick, {load:.1%} of the UI thread{state}")
+        self.reset_stats()
+        return text
+
+    def reset_stats(self):
+        self._started = time.monotonic()
+        self.ticks = self.frames_shown = self.frames_held = 0
+        self.busy = 0.0
+
+def load_video_frames(path: str, size: Tuple[int, int], max_frames: int = 120) -> List[ctk.CTkImage]:
+    """
+    Decodes video files (WebM, MP4) into a list of CTkImages through the frame cache.
+    This creates a pre-buffered list of frames for smooth playback.
+    """
+    if not path or not os.path.exists(path): return []
+    seq = FRAME_CACHE.load(path, size, max_frames)
+    return [seq.ctk_image(i) for i in range(len(seq))] if seq else []
+
+def resize_image_to_temp(path: str, size_name: str, animated_format: str = "GIF") -> Optional[str]:
+    """
+    Resizes image/converts WebP/WebM for clipboard usage. Handles GIFs and Videos correctly.
+    Conversions are cached by (path, mtime, size, format), so repeat copies skip the encode.
+    Animations are streamed into 'animated_format' ("GIF", "WebP" or "APNG").
+    """
+    if not path or not os.path.exists(path): return None
     try:
-        with Image.open(path) as img:
-            
-            # --- ANIMATED GIF HANDLING ---
-            # Check if it's animated. Note: Some single-frame GIFs might return False for is_animated.
-            is_animated = getattr(img, "is_animated", False)
-            
-            if is_animated:
-                ext = ".gif"
-                temp_path = os.path.join(TEMP_FOLDER, f"temp_{timestamp}_{os.path.basename(path).split('.')[0]}{ext}")
-                
-                frames = []
-                duration = img.info.get('duration', 100)
-                
-                # Iterate over all frames
-                for i in range(img.n_frames):
-                    img.seek(i)
-                    # Convert to RGBA for high-quality resize
-                    frame = img.copy().convert("RGBA")
-                    
-                    if target_dim:
-                        ratio = min(target_dim / img.width, target_dim / img.height)
-                        new_w = int(img.width * ratio)
-                        new_h = int(img.height * ratio)
-                        frame = frame.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                    
-                    frames.append(frame)
-
-                # Save frames as GIF
-                if frames:
-                    frames[0].save(
-                        temp_path, 
-                        save_all=True, 
-                        append_images=frames[1:], 
-                        loop=0, 
-                        duration=duration, 
-                        disposal=2
-                    )
-                return temp_path
-
-            # --- STATIC IMAGE HANDLING ---
-            # Determine new size if scaling needed
-            if target_dim:
-                ratio = min(target_dim / img.width, target_dim / img.height)
-                new_w = int(img.width * ratio)
-                new_h = int(img.height * ratio)
-                # LANCZOS is the high-quality setting for both up/downscaling in Pillow
-                img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                
-            # Convert if necessary (WebP -> PNG for better compatibility)
-            ext = ".png"
-            temp_path = os.path.join(TEMP_FOLDER, f"temp_{timestamp}_{os.path.basename(path).split('.')[0]}{ext}")
-            
-            img.save(temp_path)
-            return temp_path
-            
+        return convert_for_clipboard(path, size_name, animated_format)
     except Exception as e:
-        logger.error(f"Resize error: {e}")
-        return path
+        logger.error(f"Clipboard conversion error ({path}): {e}")
+        return path # Fallback
 
 # ==============================================================================
 #   WINDOW & OS HELPERS